@@ -0,0 +1,56 @@
+"""
+Production serving: gunicorn master + uvicorn workers with the app preloaded.
+
+    gunicorn -c src/api/gunicorn_conf.py src.api.main:app
+
+With preload_app the master imports src.api.main once - embedding model, item
+catalogue/embeddings (memory-mapped), interaction history, customer index - and
+loads the churn model before forking, so workers start with those pages shared
+copy-on-write. The garbage collector is disabled while loading and everything
+allocated so far is moved to the permanent generation with gc.freeze(), so
+collections in the workers never write to (and thereby copy) the shared objects.
+
+The rolling feature store is also bootstrapped from the raw data and every
+customer scored in the master; only the consumer and inference threads start
+per worker (threads do not survive fork).
+
+One worker by default. Everything the app changes after startup is
+per-process: catalogue upserts/deletes, ingested events and the live scores,
+rolling features, interaction history and popularity counts they feed, the
+customer index risk cache and its version, drift sketches, and the explainer
+and inference stats. With WEB_CONCURRENCY > 1, PUT/DELETE /items and POST
+/events/ingest answer 409 (ALLOW_PER_WORKER_STATE=1 accepts them anyway) and
+the read endpoints report the state of whichever worker served the request,
+so only raise it for read-only scoring/recommendation traffic.
+"""
+import gc
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = os.environ.get('PRELOAD_APP', '1') == '1'
+timeout = int(os.environ.get('WORKER_TIMEOUT', 120))
+keepalive = 5
+accesslog = os.environ.get('ACCESS_LOG')  # off unless set; logging every request costs throughput
+
+# Objects created while importing the app are long-lived; don't spend collections on them
+gc.disable()
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app import, before any worker forks
+    if not server.cfg.preload_app:
+        gc.enable()
+        return
+    from src.api import main
+    if main.churn_model is None:
+        main.load_churn_model()
+    main.build_event_service()
+    gc.freeze()
+    server.log.info(f"Preloaded app; {gc.get_freeze_count()} objects frozen before fork")
+
+
+def post_fork(server, worker):
+    # Young objects created per request still need collecting in the workers
+    gc.enable()
@@ -1,24 +1,46 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import pandas as pd
 import joblib
+import asyncio
 import numpy as np
 import os
-from typing import List, Optional, Any
+import queue
+import threading
+from datetime import datetime
+from typing import List, Optional, Any, Literal
 
 # Database
+from sqlalchemy import select, func, desc
 from sqlalchemy.orm import Session
-from src.data.database import get_db, engine, Base
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.data.database import engine, SessionLocal, get_read_db, get_async_db
+from src.data.migrations import upgrade as upgrade_db
 from src.data.models import Customer, MarketingInteraction
 
 # AI Services
 from src.services.gemini_service import GeminiRetentionService
+from src.services.offline_campaign import record_campaigns
 from src.models.personalization import PersonalizationEngine
+from src.data.customer_index import CustomerIndex, RISK_LEVELS, risk_segments_for
+from src.api.serialization import NumpyORJSONResponse, sse_event
+from src.api.request_memo import RequestMemo
+from src.features.feature_transformer import ChurnFeatureTransformer
+from src.models.churn_explainer import ChurnExplainer
+from src.services.drift_monitor import DriftMonitor, DriftReference, reference_path_for
+from src.services.inference_executor import InferenceExecutor, ExecutorOverloaded
 
-# Init DB Tables if not exist
-Base.metadata.create_all(bind=engine)
+# Streaming features
+from src.features.build_features import load_data
+from src.features.streaming_features import RollingFeatureStore
+from src.services.event_ingestion import EventIngestionService
 
-app = FastAPI(title="GrowthAI Churn & Personalization API")
+# Init DB Tables if not exist, and add indexes/columns missing from older databases
+upgrade_db(engine)
+
+# orjson for every response; NumPy scalars/arrays are serialized without conversion passes
+app = FastAPI(title="GrowthAI Churn & Personalization API", default_response_class=NumpyORJSONResponse)
 
 # Initialize Services
 gemini = GeminiRetentionService()
@@ -26,21 +48,128 @@ gemini = GeminiRetentionService()
 # Global RecSys Engine
 recsys_engine = PersonalizationEngine()
 
+# Sorted customer index for paging/search in the dashboard
+customer_index = CustomerIndex(recsys_engine.customers)
+
 # Load Models (Lazy loading or global)
 churn_model = None
+# Column order and country vocabulary the model was trained with (saved next to the model)
+feature_transformer = None
+# TreeSHAP explainer for the loaded model version (built on first /explain request)
+churn_explainer = None
+_explainer_lock = threading.Lock()
+# Live feature distribution vs the model's training reference (None without a reference)
+drift_monitor = None
+
+# Bounded pool that runs model calls off the event loop (threads started per worker process)
+inference = InferenceExecutor(
+    workers=int(os.getenv('INFERENCE_WORKERS', 0)) or None,
+    max_queue=int(os.getenv('INFERENCE_QUEUE_SIZE', 64)),
+    max_queue_wait=float(os.getenv('INFERENCE_MAX_WAIT_MS', 2000)) / 1000,
+)
 
 def load_churn_model():
-    global churn_model
+    global churn_model, feature_transformer, churn_explainer, drift_monitor
+    churn_explainer = None
     try:
         model_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models', 'churn_model.pkl')
         if os.path.exists(model_path):
-            churn_model = joblib.load(model_path)
-            print("Churn model loaded.")
+            model = inference.budget_xgboost(joblib.load(model_path))
+            feature_transformer = ChurnFeatureTransformer.load_for_model(model_path, model)
+            churn_model = model
+            print(f"Churn model loaded ({len(feature_transformer)} features).")
+            reference_path = reference_path_for(model_path)
+            if os.path.exists(reference_path):
+                drift_monitor = DriftMonitor(DriftReference.load(reference_path))
+            else:
+                print("No drift reference next to the model; drift monitoring disabled.")
         else:
             print("Churn model not found. API running without ML model.")
     except Exception as e:
         print(f"Error loading model: {e}")
         churn_model = None
+        feature_transformer = None
+
+def risk_segment_for(prob):
+    if prob > 0.7:
+        return "HIGH"
+    elif prob > 0.4:
+        return "MEDIUM"
+    return "LOW"
+
+def get_churn_explainer():
+    global churn_explainer
+    if churn_model is None:
+        raise HTTPException(status_code=503, detail="Churn model not loaded")
+    with _explainer_lock:
+        if churn_explainer is None:
+            churn_explainer = ChurnExplainer(churn_model, feature_transformer)
+        return churn_explainer
+
+async def run_inference(kind, fn, *args, **kwargs):
+    """Runs a model call on the inference executor; 503 when it is saturated."""
+    try:
+        return await inference.run(kind, fn, *args, **kwargs)
+    except ExecutorOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+def explain_rows(rows, top_n=None):
+    return get_churn_explainer().explain(rows, top_n)
+
+def invalidate_explanations(scores):
+    """Score listener: rescored customers have new features, drop their cached explanations."""
+    if churn_explainer is not None:
+        churn_explainer.invalidate([s['customer_id'] for s in scores])
+
+def update_drift(rows):
+    """Feature listener: folds recomputed feature rows into the drift sketches."""
+    if drift_monitor is not None:
+        drift_monitor.update(rows)
+
+def score_feature_rows(rows):
+    """Scores a list of feature dicts in one predict_proba call."""
+    if not churn_model:
+        return np.full(len(rows), 0.45)
+    return churn_model.predict_proba(feature_transformer.encode(rows))[:, 1]
+
+# Gunicorn worker processes. Catalogue edits, ingested events, live scores, cohort
+# caches and drift sketches live in each process, so writes are refused when
+# there is more than one worker unless ALLOW_PER_WORKER_STATE=1 (see gunicorn_conf.py)
+WEB_WORKERS = int(os.getenv('WEB_CONCURRENCY', 1))
+ALLOW_PER_WORKER_STATE = os.getenv('ALLOW_PER_WORKER_STATE', '0') == '1'
+
+def single_process_state():
+    """Dependency for endpoints that change process-local state."""
+    if WEB_WORKERS > 1 and not ALLOW_PER_WORKER_STATE:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Not supported with {WEB_WORKERS} workers: the change would only reach one of them. "
+                   "Run with WEB_CONCURRENCY=1 or set ALLOW_PER_WORKER_STATE=1.")
+
+# Real-time event ingestion (populated on startup, or in the gunicorn master before fork)
+event_service = None
+
+def build_event_service():
+    """Bootstraps the rolling feature store from raw data and scores every customer (no threads started)."""
+    global event_service
+    try:
+        customers, transactions, events = load_data()
+        store = RollingFeatureStore.from_frames(customers, transactions, events)
+    except Exception as e:
+        print(f"Could not bootstrap feature store from raw data: {e}")
+        store = RollingFeatureStore()
+    event_service = EventIngestionService(store, score_feature_rows, risk_segment_for)
+    event_service.add_score_listener(customer_index.update_risk)
+    event_service.add_score_listener(invalidate_explanations)
+    event_service.add_feature_listener(update_drift)
+    event_service.add_interaction_listener(recsys_engine.record_interactions)
+    event_service.rescore()
+
+def start_event_ingestion():
+    if event_service is None:
+        build_event_service()
+    event_service.start()
+    print("Event ingestion consumer started.")
 
 # Input Schemas
 class ChurnInput(BaseModel):
@@ -59,6 +188,15 @@ class ChurnResponse(BaseModel):
     churn_probability: float
     risk_segment: str
 
+class ChurnBatchInput(BaseModel):
+    customers: List[ChurnInput]
+
+class ChurnBatchResponse(BaseModel):
+    """Columnar batch result: churn_probability[i] belongs to customer_ids[i]"""
+    customer_ids: List[str]
+    churn_probability: List[float]
+    risk_segment: List[str]
+
 # Recommendation Schemas
 class RecRequest(BaseModel):
     customer_id: str
@@ -77,15 +215,86 @@ class GenerateCampaignRequest(BaseModel):
     customer_id: str
     risk_segment: str
     churn_probability: float
+    # Already known to the caller (e.g. from /customer360); looked up when omitted
+    customer_name: Optional[str] = None
+    recommended_titles: Optional[List[str]] = None
 
 class CampaignResponse(BaseModel):
     subject_line: str
     email_body: str
     strategy: str
+    # Set when the precompiled fallback template was used (A/B variant and offer code)
+    template_variant: Optional[str] = None
+    discount_code: Optional[str] = None
+
+# Catalogue Schemas
+class ItemUpsert(BaseModel):
+    item_id: str
+    type: Literal["Product", "Content"] = "Product"
+    title: str
+    category: str
+    description: str = ""
+    price: float = 0.0
+    kind: Optional[str] = None # Content format, e.g. Movie/Podcast/Article
+
+class ItemUpsertBatch(BaseModel):
+    items: List[ItemUpsert]
+
+# Event Ingestion Schemas
+class CustomerEvent(BaseModel):
+    customer_id: str
+    event_type: Literal["transaction", "login", "interaction"]
+    timestamp: datetime
+    amount: Optional[float] = None
+    category: Optional[str] = None
+    item_id: Optional[str] = None
+    action: Optional[str] = None
+
+class EventBatch(BaseModel):
+    events: List[CustomerEvent]
+
+# --- Request-scoped building blocks shared by composite endpoints ---
+
+def memo_details(memo, customer_id):
+    return memo.get('details', lambda: run_inference('details', recsys_engine.get_customer_details, customer_id))
+
+def memo_features(memo, customer_id):
+    async def compute():
+        if event_service is None:
+            return None
+        # feature_row takes the store lock the consumer holds while applying a batch
+        return await run_in_threadpool(event_service.feature_store.feature_row, customer_id)
+    return memo.get('features', compute)
+
+def memo_user_context(memo, customer_id):
+    async def compute():
+        if recsys_engine.model is None:
+            return None
+        return await run_inference('recommend', recsys_engine.user_context, customer_id)
+    return memo.get('user_context', compute)
+
+def memo_recommendations(memo, customer_id, top_k):
+    async def compute():
+        context = await memo_user_context(memo, customer_id)
+        if context is None:
+            return []
+        return await run_inference('recommend', recsys_engine.recommend_for_user, customer_id,
+                                   top_k=top_k, context=context)
+    return memo.get(('recommendations', top_k), compute)
 
 @app.on_event("startup")
 def startup_event():
-    load_churn_model()
+    # Already loaded in the gunicorn master when serving with preload (see gunicorn_conf.py)
+    if churn_model is None:
+        load_churn_model()
+    inference.start()
+    start_event_ingestion()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    if event_service:
+        event_service.stop()
+    inference.stop()
 
 @app.get("/")
 def read_root():
@@ -93,12 +302,44 @@ def read_root():
 
 # --- Data Endpoints for UI ---
 @app.get("/data/customers")
-def get_customers():
-    """Returns list of all customer IDs"""
-    try:
-        return recsys_engine.get_all_customers()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def get_customers(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000),
+    q: Optional[str] = Query(None, description="Customer ID prefix"),
+    segment: Optional[str] = None,
+    country: Optional[str] = None,
+    risk: Optional[str] = Query(None, description="Cached risk segment (LOW/MEDIUM/HIGH)"),
+):
+    """Returns one page of customers. Pass `next_cursor` back as `cursor` for the next page."""
+    if risk and risk not in RISK_LEVELS[1:]:
+        raise HTTPException(status_code=422, detail=f"risk must be one of {RISK_LEVELS[1:]}")
+    rows, next_cursor = customer_index.page(cursor=cursor, limit=limit, prefix=q,
+                                            segment=segment, country=country, risk=risk)
+    return NumpyORJSONResponse({"items": rows, "next_cursor": next_cursor})
+
+@app.get("/data/customers/facets")
+def get_customer_facets():
+    """Distinct filter values for the customer list"""
+    return NumpyORJSONResponse(customer_index.facets())
+
+@app.get("/data/cohort/version")
+def get_cohort_version():
+    """Changes whenever cached scores change; clients key their caches on it."""
+    return {"version": customer_index.version}
+
+@app.get("/data/cohort/summary")
+def get_cohort_summary(segment: Optional[str] = None, country: Optional[str] = None):
+    """Risk distribution, probability histogram and segment/country breakdowns from cached scores."""
+    return NumpyORJSONResponse(customer_index.cohort_summary(segment=segment, country=country))
+
+@app.get("/data/cohort/top-risk")
+def get_cohort_top_risk(
+    limit: int = Query(20, ge=1, le=1000),
+    segment: Optional[str] = None,
+    country: Optional[str] = None,
+):
+    """Customers with the highest cached churn probability."""
+    return NumpyORJSONResponse(customer_index.top_risk(limit=limit, segment=segment, country=country))
 
 @app.get("/data/customer/{customer_id}")
 def get_customer_details(customer_id: str):
@@ -106,12 +347,13 @@ def get_customer_details(customer_id: str):
     details = recsys_engine.get_customer_details(customer_id)
     if not details:
         raise HTTPException(status_code=404, detail="Customer not found")
-    return details
+    # Row comes straight from pandas (np.int64 etc.) - serialize without jsonable_encoder
+    return NumpyORJSONResponse(details)
     
 # --- ML / AI Endpoints ---
 
 @app.post("/predict/churn", response_model=ChurnResponse)
-def predict_churn(data: ChurnInput, db: Session = Depends(get_db)):
+async def predict_churn(data: ChurnInput):
     # Mock prediction if model missing
     if not churn_model:
         return {
@@ -120,39 +362,8 @@ def predict_churn(data: ChurnInput, db: Session = Depends(get_db)):
             "risk_segment": "MEDIUM" # Default fallback
         }
     
-    # Build feature vector matching model training schema
-    # Model expects: age, recency_days, frequency_total, frequency_30d, avg_order_value,
-    #                category_diversity, login_count_14d, country_Canada, country_France,
-    #                country_Germany, country_India, country_UK, country_US
-    
-    countries = ['Canada', 'France', 'Germany', 'India', 'UK', 'US']
-    country_features = {f'country_{c}': 1 if data.country == c else 0 for c in countries}
-    
-    feature_row = {
-        'age': data.age,
-        'recency_days': data.recency_days,
-        'frequency_total': data.frequency_total,
-        'frequency_30d': data.frequency_30d,
-        'avg_order_value': data.avg_order_value,
-        'category_diversity': data.category_diversity,
-        'login_count_14d': data.login_count_14d,
-        **country_features
-    }
-    
-    # Create DataFrame with correct column order
-    feature_cols = ['age', 'recency_days', 'frequency_total', 'frequency_30d', 'avg_order_value',
-                    'category_diversity', 'login_count_14d', 'country_Canada', 'country_France',
-                    'country_Germany', 'country_India', 'country_UK', 'country_US']
-    
-    X = pd.DataFrame([feature_row])[feature_cols]
-    
-    prob = churn_model.predict_proba(X)[0][1]
-    
-    risk_segment = "LOW"
-    if prob > 0.7:
-        risk_segment = "HIGH"
-    elif prob > 0.4:
-        risk_segment = "MEDIUM"
+    prob = (await run_inference('churn', score_feature_rows, [data.dict()]))[0]
+    risk_segment = risk_segment_for(prob)
         
     return {
         "customer_id": data.customer_id,
@@ -160,35 +371,305 @@ def predict_churn(data: ChurnInput, db: Session = Depends(get_db)):
         "risk_segment": risk_segment
     }
 
-@app.post("/recommend", response_model=List[RecItem])
-def recommend(data: RecRequest):
+@app.post("/predict/churn/batch", response_model=ChurnBatchResponse)
+async def predict_churn_batch(data: ChurnBatchInput):
     """
-    Get personalized recommendations based on interaction history.
+    Scores many customers in one model call. The probability column is returned
+    as a NumPy array and serialized directly by orjson.
     """
-    recs = recsys_engine.recommend_for_user(data.customer_id, top_k=6)
-    return recs
+    rows = [c.dict() for c in data.customers]
+    probs = np.asarray(await run_inference('churn_batch', score_feature_rows, rows), dtype=np.float64) if rows else np.empty(0)
+    return NumpyORJSONResponse({
+        "customer_ids": [r['customer_id'] for r in rows],
+        "churn_probability": probs,
+        "risk_segment": risk_segments_for(probs).tolist(),
+    })
 
-@app.post("/campaign/generate", response_model=CampaignResponse)
-async def generate_campaign(data: GenerateCampaignRequest):
+@app.post("/recommend", response_model=List[RecItem])
+async def recommend(data: RecRequest):
     """
-    Generates a personalized retention email using Gemini.
+    Get personalized recommendations based on interaction history.
     """
-    # Create a simple profile text
-    # In a real app we would fetch name, past purchases etc. here
-    
-    # Check if we have customer details in our RecSys engine to augment context
-    cust_details = recsys_engine.get_customer_details(data.customer_id)
-    cust_name = cust_details.get('name', 'Valued Customer')
-    
-    # Get recommendations to include in the email
-    recs = recsys_engine.recommend_for_user(data.customer_id, top_k=2)
-    rec_text = "Recommanded for you: " + ", ".join([r['title'] for r in recs]) if recs else ""
+    recs = await run_inference('recommend', recsys_engine.recommend_for_user, data.customer_id, top_k=6)
+    # Engine output already matches RecItem; skip per-item Pydantic validation
+    return NumpyORJSONResponse(recs)
+
+async def campaign_context(data: GenerateCampaignRequest):
+    """Customer name and recommended titles for the email (prompt and fallback template)."""
+    # Name and recommended titles come from the caller when it already has them
+    # (/customer360 returns both); only the missing pieces are looked up, concurrently
+    memo = RequestMemo()
+    pending = {}
+    if data.customer_name is None:
+        pending['details'] = memo_details(memo, data.customer_id)
+    if data.recommended_titles is None:
+        pending['recs'] = memo_recommendations(memo, data.customer_id, top_k=2)
+    found = dict(zip(pending, await asyncio.gather(*pending.values())))
+
+    titles = data.recommended_titles
+    if titles is None:
+        titles = [r['title'] for r in found['recs']]
+    return {
+        "customer_id": data.customer_id,
+        "customer_name": data.customer_name or found.get('details', {}).get('name', 'Valued Customer'),
+        "recommended_titles": titles,
+    }
+
+def campaign_prompt(data: GenerateCampaignRequest, context):
+    """Retention email prompt: customer name, risk and recommended titles."""
+    titles = context['recommended_titles']
+    rec_text = "Recommended for you: " + ", ".join(titles) if titles else ""
     
     prompt = f"""
-    Write a retention email for customer {cust_name}.
+    Write a retention email for customer {context['customer_name']}.
     Risk Level: {data.risk_segment} (Churn Prob: {data.churn_probability:.2f}).
     Context: {rec_text}
     Goal: Prevent them from leaving. Offer them something relevant.
     """
-    
-    return gemini.generate_retention_content(data.risk_segment, prompt)
+    return prompt
+
+def log_campaign(data: GenerateCampaignRequest, result):
+    """Records the generated email (and its template variant) in MarketingInteraction."""
+    db = SessionLocal()
+    try:
+        record_campaigns(db, [{
+            "customer_id": data.customer_id,
+            "risk_level_at_time": data.risk_segment,
+            "ai_generated_subject": result["subject_line"],
+            "ai_generated_body": result["email_body"],
+            "ai_explanation_reasoning": result["strategy"],
+            "template_variant": result.get("template_variant"),
+            "discount_code": result.get("discount_code"),
+        }])
+    except Exception as e:
+        # Logging the send must not fail the campaign response
+        db.rollback()
+        print(f"Failed to record campaign for {data.customer_id}: {e}")
+    finally:
+        db.close()
+
+@app.post("/campaign/generate", response_model=CampaignResponse)
+async def generate_campaign(data: GenerateCampaignRequest):
+    """
+    Generates a personalized retention email using Gemini.
+    """
+    context = await campaign_context(data)
+    # Blocking network call: keep it off the event loop
+    result = await run_in_threadpool(gemini.generate_retention_content, data.risk_segment,
+                                     campaign_prompt(data, context), **context)
+    await run_in_threadpool(log_campaign, data, result)
+    return result
+
+@app.post("/campaign/generate/stream")
+async def generate_campaign_stream(data: GenerateCampaignRequest):
+    """
+    Server-sent events variant of /campaign/generate. `token` events carry email
+    body text as the LLM produces it; the final `done` event carries the parsed
+    subject_line, email_body and strategy (preceded by `error` if generation
+    failed and the fallback template was used).
+    """
+    context = await campaign_context(data)
+    prompt = campaign_prompt(data, context)
+
+    def events():
+        # Sync generator: Starlette iterates it in the threadpool
+        for event, payload in gemini.stream_retention_content(data.risk_segment, prompt, **context):
+            yield sse_event(event, {"text": payload} if event in ("token", "error") else payload)
+            if event == "done":
+                log_campaign(data, payload)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/campaign/history/{customer_id}")
+async def get_campaign_history(customer_id: str, limit: int = Query(20, ge=1, le=200),
+                               db: AsyncSession = Depends(get_async_db)):
+    """Campaigns sent to a customer, newest first (served by the (customer_id, created_at) index)."""
+    rows = (await db.execute(
+        select(MarketingInteraction)
+        .where(MarketingInteraction.customer_id == customer_id)
+        .order_by(desc(MarketingInteraction.created_at))
+        .limit(limit)
+    )).scalars().all()
+    return [{
+        "created_at": r.created_at,
+        "risk_level": r.risk_level_at_time,
+        "subject_line": r.ai_generated_subject,
+        "template_variant": r.template_variant,
+        "discount_code": r.discount_code,
+    } for r in rows]
+
+@app.get("/campaign/variants")
+def get_campaign_variants(db: Session = Depends(get_read_db)):
+    """
+    Emails sent per fallback template variant and risk level (A/B test readout).
+    LLM-written emails have no variant. Read-only connection.
+    """
+    rows = db.execute(
+        select(MarketingInteraction.template_variant, MarketingInteraction.risk_level_at_time,
+               func.count(MarketingInteraction.id))
+        .group_by(MarketingInteraction.template_variant, MarketingInteraction.risk_level_at_time)
+    ).all()
+    return [{"template_variant": variant, "risk_level": risk, "sent": sent} for variant, risk, sent in rows]
+
+@app.get("/customer360/{customer_id}")
+async def get_customer360(customer_id: str, top_k: int = Query(6, ge=1, le=50),
+                          top_drivers: int = Query(3, ge=0, le=20)):
+    """
+    Everything the dashboard shows for one customer in a single round trip:
+    profile, churn score on the live features (with top SHAP drivers when a
+    model is loaded), the feature row it was computed on (`churn_features`),
+    recommendations and the campaign context. The branches
+    run concurrently and share intermediates (feature row, user context)
+    through a request-scoped memo.
+    """
+    memo = RequestMemo()
+
+    async def churn():
+        row = await memo_features(memo, customer_id)
+        if row is None:
+            return None
+        explain = top_drivers and churn_model is not None
+        prob, explanation = await asyncio.gather(
+            run_inference('churn', score_feature_rows, [row]),
+            run_inference('explain', explain_rows, [row], top_drivers) if explain else asyncio.sleep(0),
+        )
+        prob = float(prob[0])
+        return {
+            "churn_probability": prob,
+            "risk_segment": risk_segment_for(prob),
+            "drivers": explanation[0]['drivers'] if explanation else [],
+        }
+
+    details, churn_result, recs, context = await asyncio.gather(
+        memo_details(memo, customer_id), churn(),
+        memo_recommendations(memo, customer_id, top_k), memo_user_context(memo, customer_id),
+    )
+    if not details and churn_result is None:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    return NumpyORJSONResponse({
+        "customer_id": customer_id,
+        "details": details,
+        "churn": churn_result,
+        # Model inputs from the streaming feature store (customers.csv plus events); the
+        # profile above comes from customers_enhanced.csv and may differ in age/country
+        "churn_features": await memo_features(memo, customer_id),
+        "recommendations": recs,
+        "history_items": len(context['history_ids']) if context else 0,
+        "campaign_context": {
+            "customer_name": details.get('name', 'Valued Customer'),
+            "recommended_titles": [r['title'] for r in recs[:2]],
+        },
+    })
+
+# --- Catalogue Updates ---
+
+@app.put("/items", dependencies=[Depends(single_process_state)])
+def upsert_items(batch: ItemUpsertBatch):
+    """
+    Adds or replaces catalogue items. Only the submitted items are embedded;
+    in-flight recommendation requests keep using the snapshot they started with.
+    """
+    if recsys_engine.store is None:
+        raise HTTPException(status_code=503, detail="Embedding model not loaded")
+    snapshot = recsys_engine.upsert_items([item.dict() for item in batch.items])
+    return {"upserted": len(batch.items), "catalogue_version": snapshot.version}
+
+@app.delete("/items/{item_id}", dependencies=[Depends(single_process_state)])
+def delete_item(item_id: str):
+    if recsys_engine.store is None:
+        raise HTTPException(status_code=503, detail="Embedding model not loaded")
+    if not recsys_engine.delete_items([item_id]):
+        raise HTTPException(status_code=404, detail="Item not found")
+    return {"deleted": item_id, "catalogue_version": recsys_engine.store.snapshot.version}
+
+@app.get("/items/stats")
+def get_catalogue_stats():
+    return recsys_engine.store.stats() if recsys_engine.store else {}
+
+# --- Real-time Event Ingestion ---
+
+@app.post("/events/ingest", status_code=202, dependencies=[Depends(single_process_state)])
+def ingest_events(batch: EventBatch):
+    """
+    Accepts transaction, login and interaction events.
+    Rolling features are updated by the background consumer and only the
+    affected customers are re-scored.
+    """
+    if event_service is None:
+        raise HTTPException(status_code=503, detail="Event ingestion not ready")
+    try:
+        event_service.submit([e.dict() for e in batch.events])
+    except queue.Full:
+        raise HTTPException(status_code=503, detail="Event queue full, retry later")
+    return {"accepted": len(batch.events), "queue_depth": event_service.queue.qsize()}
+
+@app.get("/events/score/{customer_id}", response_model=ChurnResponse)
+def get_live_score(customer_id: str):
+    """Returns the latest streaming churn score for a customer."""
+    score = event_service.get_score(customer_id) if event_service else None
+    if not score:
+        raise HTTPException(status_code=404, detail="No live score for customer")
+    return score
+
+@app.post("/explain/churn")
+async def explain_churn(data: ChurnInput, top_n: Optional[int] = Query(None, ge=1)):
+    """TreeSHAP drivers of one customer's churn score, strongest first."""
+    return NumpyORJSONResponse((await run_inference('explain', explain_rows, [data.dict()], top_n))[0])
+
+@app.post("/explain/churn/batch")
+async def explain_churn_batch(data: ChurnBatchInput, top_n: Optional[int] = Query(None, ge=1)):
+    """Explains many customers in one vectorized SHAP call (cached rows are skipped)."""
+    rows = [c.dict() for c in data.customers]
+    return NumpyORJSONResponse({"explanations": await run_inference('explain_batch', explain_rows, rows, top_n)})
+
+@app.get("/explain/churn/segment/{risk_segment}")
+async def explain_churn_segment(risk_segment: Literal["HIGH", "MEDIUM", "LOW"], top_n: int = Query(3, ge=1)):
+    """Explains every customer currently scored into `risk_segment` by the live pipeline."""
+    if churn_model is None:
+        raise HTTPException(status_code=503, detail="Churn model not loaded")
+    if event_service is None:
+        return NumpyORJSONResponse({"explanations": []})
+
+    def explain_segment():
+        rows = event_service.feature_store.feature_rows(event_service.customers_in_segment(risk_segment))
+        return explain_rows(rows, top_n)
+
+    return NumpyORJSONResponse({"explanations": await run_inference('explain_batch', explain_segment)})
+
+@app.get("/explain/churn/stats")
+def explain_churn_stats():
+    return get_churn_explainer().cache_info()
+
+@app.get("/explain/churn/{customer_id}")
+async def explain_live_customer(customer_id: str, top_n: Optional[int] = Query(None, ge=1)):
+    """Explains a customer's current streaming features."""
+    row = await run_in_threadpool(event_service.feature_store.feature_row, customer_id) if event_service else None
+    if row is None:
+        raise HTTPException(status_code=404, detail="Customer not in feature store")
+    return NumpyORJSONResponse((await run_inference('explain', explain_rows, [row], top_n))[0])
+
+@app.get("/monitoring/drift")
+def get_drift_report():
+    """PSI per feature (histogram bins / category frequencies) vs the training reference."""
+    if drift_monitor is None:
+        raise HTTPException(status_code=404, detail="No drift reference for the loaded model")
+    return drift_monitor.report()
+
+@app.get("/monitoring/drift/alerts")
+def get_drift_alerts():
+    if drift_monitor is None:
+        raise HTTPException(status_code=404, detail="No drift reference for the loaded model")
+    return {"alerts": drift_monitor.alerts()}
+
+@app.get("/events/stats")
+def get_event_stats():
+    if event_service is None:
+        return {}
+    return {**event_service.stats, "queue_depth": event_service.queue.qsize()}
+
+@app.get("/inference/stats")
+def get_inference_stats():
+    """Executor sizing, queue depth and per-kind queue-wait / service-time percentiles."""
+    return inference.stats()
@@ -0,0 +1,28 @@
+import asyncio
+
+
+class RequestMemo:
+    """
+    Request-scoped memo of intermediate results (customer details, feature row,
+    user context, recommendations ...) for composite endpoints.
+
+    get(key, factory) starts factory() - a zero-argument coroutine function -
+    the first time a key is requested and hands every later caller the same
+    task, so branches running concurrently under asyncio.gather share one
+    computation instead of repeating it. Create one per request; nothing
+    outlives the response.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, factory):
+        task = self._tasks.get(key)
+        if task is None:
+            self.misses += 1
+            task = self._tasks[key] = asyncio.ensure_future(factory())
+        else:
+            self.hits += 1
+        return task
@@ -0,0 +1,37 @@
+import numpy as np
+import orjson
+from fastapi.responses import ORJSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    # NumPy scalars leaking out of pandas rows (np.int64, np.float32, np.bool_ ...)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        # Non-contiguous or object arrays are not handled natively by orjson
+        return obj.tolist()
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content):
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class NumpyORJSONResponse(ORJSONResponse):
+    """
+    ORJSONResponse that serializes NumPy arrays natively and NumPy scalars via .item().
+    Returning it from a handler skips FastAPI's response_model validation and
+    jsonable_encoder pass, so handlers must return already-shaped data.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def sse_event(event, data):
+    """One server-sent event; `data` is JSON-encoded so multi-line text stays on one data line."""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
@@ -1,7 +1,7 @@
 import streamlit as st
 import requests
+import json
 import pandas as pd
-import numpy as np
 import os
 
 # API Configuration - Use env var for Docker, fallback to localhost
@@ -10,14 +10,10 @@ API_URL = os.getenv("API_URL", "http://localhost:8000")
 st.set_page_config(page_title="GrowthAI Platform", page_icon="🚀", layout="wide")
 
 # Initialize session state
-if 'churn_result' not in st.session_state:
-    st.session_state.churn_result = None
-if 'recommendations' not in st.session_state:
-    st.session_state.recommendations = None
 if 'campaign' not in st.session_state:
     st.session_state.campaign = None
-if 'input_data' not in st.session_state:
-    st.session_state.input_data = None
+if 'campaign_customer' not in st.session_state:
+    st.session_state.campaign_customer = None
 
 # Custom CSS
 st.markdown("""
@@ -53,34 +49,216 @@ st.caption("AI-Powered Churn Prediction • Personalized Recommendations • Ret
 # Sidebar
 st.sidebar.header("🎯 Customer Selection")
 
+PAGE_SIZE = 50
+
+if 'page_cursors' not in st.session_state:
+    # Cursor stack: index i holds the cursor that loads page i
+    st.session_state.page_cursors = [None]
+
+@st.cache_data(ttl=300)
+def get_customer_facets():
+    try:
+        response = requests.get(f"{API_URL}/data/customers/facets", timeout=5)
+        if response.status_code == 200:
+            return response.json()
+        return None
+    except:
+        return None
+
 @st.cache_data(ttl=60)
-def get_customer_list():
+def get_customer_page(cursor, prefix, segment, country, risk):
+    params = {"limit": PAGE_SIZE, "cursor": cursor, "q": prefix or None,
+              "segment": segment, "country": country, "risk": risk}
+    try:
+        response = requests.get(f"{API_URL}/data/customers",
+                                params={k: v for k, v in params.items() if v}, timeout=5)
+        if response.status_code == 200:
+            return response.json()
+        return {"items": [], "next_cursor": None}
+    except:
+        return {"items": [], "next_cursor": None}
+
+def reset_paging():
+    st.session_state.page_cursors = [None]
+
+def iter_sse(response):
+    """Yields (event, data) from a text/event-stream response as events arrive."""
+    event, data = "message", []
+    # chunk_size=None: hand over bytes as soon as they arrive instead of filling a buffer
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+@st.cache_data(ttl=30)
+def get_customer360(customer_id):
+    # Profile, live churn score + drivers, recommendations and campaign context in one call
     try:
-        response = requests.get(f"{API_URL}/data/customers", timeout=5)
+        response = requests.get(f"{API_URL}/customer360/{customer_id}", timeout=20)
         if response.status_code == 200:
             return response.json()
+        return None
+    except:
+        return None
+
+@st.cache_data(ttl=5)
+def get_cohort_version():
+    # Cheap poll; the cohort fetches below are cached per returned version
+    try:
+        response = requests.get(f"{API_URL}/data/cohort/version", timeout=5)
+        if response.status_code == 200:
+            return response.json()['version']
+        return None
+    except:
+        return None
+
+@st.cache_data(max_entries=64)
+def get_cohort_summary(version, segment, country):
+    params = {"segment": segment, "country": country}
+    try:
+        response = requests.get(f"{API_URL}/data/cohort/summary",
+                                params={k: v for k, v in params.items() if v}, timeout=10)
+        if response.status_code == 200:
+            return response.json()
+        return None
+    except:
+        return None
+
+@st.cache_data(max_entries=64)
+def get_top_risk(version, segment, country, limit):
+    params = {"segment": segment, "country": country, "limit": limit}
+    try:
+        response = requests.get(f"{API_URL}/data/cohort/top-risk",
+                                params={k: v for k, v in params.items() if v}, timeout=10)
+        if response.status_code == 200:
+            return response.json()['items']
         return []
     except:
         return []
 
-customers = get_customer_list()
+facets = get_customer_facets()
 
-if not customers:
+if facets is None:
     st.error("⚠️ Cannot connect to Backend API. Please ensure the API is running:")
     st.code("uvicorn src.api.main:app --reload --port 8000", language="bash")
     st.stop()
 
+view = st.sidebar.radio("View", ["👤 Customer", "📈 Cohort"], horizontal=True)
+
+# =====================
+# COHORT VIEW
+# =====================
+if view == "📈 Cohort":
+    st.header("Cohort Risk Analytics")
+    st.caption("Aggregated server-side from cached churn scores")
+
+    col_seg, col_cty, col_top = st.columns([1, 1, 1])
+    with col_seg:
+        cohort_segment = st.selectbox("Segment", ["All"] + facets['segments'], key="cohort_segment")
+    with col_cty:
+        cohort_country = st.selectbox("Country", ["All"] + facets['countries'], key="cohort_country")
+    with col_top:
+        top_n = st.slider("Top-risk list size", 10, 200, 25, step=5)
+    cohort_segment = None if cohort_segment == "All" else cohort_segment
+    cohort_country = None if cohort_country == "All" else cohort_country
+
+    version = get_cohort_version()
+    summary = get_cohort_summary(version, cohort_segment, cohort_country) if version is not None else None
+    if summary is None:
+        st.error("Could not load cohort summary from the API.")
+        st.stop()
+
+    dist = summary['risk_distribution']
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Customers", f"{summary['customers']:,}")
+    m2.metric("Scored", f"{summary['scored']:,}")
+    m3.metric("High Risk", f"{dist['HIGH']:,}",
+              f"{dist['HIGH'] / summary['scored']:.1%} of scored" if summary['scored'] else None,
+              delta_color="off")
+    mean_prob = summary['mean_churn_probability']
+    m4.metric("Mean Churn Probability", f"{mean_prob:.1%}" if mean_prob is not None else "N/A")
+
+    col_dist, col_hist = st.columns(2)
+    with col_dist:
+        st.subheader("Risk Distribution")
+        st.bar_chart(pd.DataFrame({"customers": [dist[k] for k in ("LOW", "MEDIUM", "HIGH", "UNKNOWN")]},
+                                  index=["LOW", "MEDIUM", "HIGH", "UNKNOWN"]))
+    with col_hist:
+        st.subheader("Churn Probability Histogram")
+        edges = summary['probability_histogram']['edges']
+        st.bar_chart(pd.DataFrame({"customers": summary['probability_histogram']['counts']},
+                                  index=[f"{lo:.2f}" for lo in edges[:-1]]))
+
+    for title, key in (("Segment Breakdown", "segments"), ("Country Breakdown", "countries")):
+        rows = summary[key]
+        if not rows:
+            continue
+        st.subheader(title)
+        breakdown = pd.DataFrame(rows).fillna({"value": "(none)"}).set_index("value")
+        col_chart, col_table = st.columns([1, 1])
+        with col_chart:
+            st.bar_chart(breakdown[["LOW", "MEDIUM", "HIGH"]])
+        with col_table:
+            st.dataframe(breakdown, use_container_width=True)
+
+    st.subheader(f"🔥 Top {top_n} At-Risk Customers")
+    top = get_top_risk(version, cohort_segment, cohort_country, top_n)
+    if top:
+        st.dataframe(pd.DataFrame(top), use_container_width=True, hide_index=True)
+    else:
+        st.info("No scored customers in this cohort yet.")
+
+    st.caption(f"Data version {summary['version']}")
+    st.stop()
+
+search_prefix = st.sidebar.text_input("🔎 Search by Customer ID", key="customer_search", on_change=reset_paging)
+segment_filter = st.sidebar.selectbox("Segment", ["All"] + facets['segments'], on_change=reset_paging)
+country_filter = st.sidebar.selectbox("Country", ["All"] + facets['countries'], on_change=reset_paging)
+risk_filter = st.sidebar.selectbox("Cached Risk", ["All"] + facets['risk_segments'], on_change=reset_paging)
+
+page = get_customer_page(
+    st.session_state.page_cursors[-1],
+    search_prefix.strip(),
+    None if segment_filter == "All" else segment_filter,
+    None if country_filter == "All" else country_filter,
+    None if risk_filter == "All" else risk_filter,
+)
+customers = [c['customer_id'] for c in page['items']]
+
+if not customers:
+    st.sidebar.warning("No customers match these filters.")
+    st.stop()
+
 selected_customer = st.sidebar.selectbox("Select Customer", customers, key="customer_select")
 
-# Fetch customer details
-details = {"name": "Unknown", "segment": "Unknown", "country": "US", "age": 30}
-if selected_customer:
-    try:
-        resp = requests.get(f"{API_URL}/data/customer/{selected_customer}", timeout=5)
-        if resp.status_code == 200:
-            details = resp.json()
-    except:
-        pass
+col_prev, col_page, col_next = st.sidebar.columns([1, 1, 1])
+with col_prev:
+    if st.button("◀", disabled=len(st.session_state.page_cursors) == 1, use_container_width=True):
+        st.session_state.page_cursors.pop()
+        st.rerun()
+with col_page:
+    st.markdown(f"Page {len(st.session_state.page_cursors)}")
+with col_next:
+    if st.button("▶", disabled=page['next_cursor'] is None, use_container_width=True):
+        st.session_state.page_cursors.append(page['next_cursor'])
+        st.rerun()
+
+# Everything for the selected customer in one round trip
+c360 = get_customer360(selected_customer) if selected_customer else None
+if c360 is None:
+    st.sidebar.warning("Could not load customer data.")
+    c360 = {"details": {}, "churn": None, "churn_features": None, "recommendations": [], "campaign_context": {}}
+details = c360['details'] or {"name": "Unknown", "segment": "Unknown", "country": "US", "age": 30}
+churn = c360['churn']
+
+# A generated campaign belongs to the customer it was generated for
+if st.session_state.campaign_customer != selected_customer:
+    st.session_state.campaign = None
 
 st.sidebar.markdown("---")
 st.sidebar.markdown(f"**👤 Name:** {details.get('name', 'N/A')}")
@@ -96,48 +274,27 @@ tab1, tab2, tab3 = st.tabs(["📊 Churn Analysis", "🎯 Recommendations", "✉
 # =====================
 with tab1:
     st.header("Customer Churn Risk Analysis")
-    st.markdown("Analyze the likelihood of this customer leaving using our XGBoost ML model.")
+    st.markdown("Likelihood of this customer leaving, scored by our XGBoost ML model on their live behavioural features.")
     
     col_btn, col_info = st.columns([1, 3])
     
     with col_btn:
-        analyze_btn = st.button("🔍 Analyze Churn Risk", type="primary", use_container_width=True)
+        if st.button("🔄 Refresh", use_container_width=True):
+            get_customer360.clear()
+            st.rerun()
     
     with col_info:
-        st.info("Click to run real-time ML inference on customer behavior data")
-    
-    if analyze_btn:
-        # Generate behavioral features (in production, fetch from feature store)
-        st.session_state.input_data = {
-            "customer_id": selected_customer,
-            "age": int(details.get('age', 30)),
-            "recency_days": int(np.random.randint(1, 90)),
-            "frequency_total": int(np.random.randint(5, 50)),
-            "frequency_30d": int(np.random.randint(1, 10)),
-            "avg_order_value": float(np.random.uniform(20, 200)),
-            "category_diversity": int(np.random.randint(1, 5)),
-            "login_count_14d": int(np.random.randint(0, 20)),
-            "country": details.get('country', "US")
-        }
-        
-        with st.spinner("Running XGBoost inference..."):
-            try:
-                resp = requests.post(f"{API_URL}/predict/churn", json=st.session_state.input_data, timeout=10)
-                if resp.status_code == 200:
-                    st.session_state.churn_result = resp.json()
-                else:
-                    st.error(f"API Error: {resp.status_code} - {resp.text}")
-            except Exception as e:
-                st.error(f"Prediction failed: {e}")
+        st.info("Scores come from the streaming feature store and update as new events arrive")
     
-    # Display results (persists after button click)
-    if st.session_state.churn_result:
+    if churn is None:
+        st.warning("No live features for this customer yet.")
+    else:
         st.markdown("---")
         st.subheader("📈 Analysis Results")
         
-        res = st.session_state.churn_result
-        churn_prob = res['churn_probability']
-        risk_level = res['risk_segment']
+        churn_prob = churn['churn_probability']
+        risk_level = churn['risk_segment']
+        features = c360['churn_features']
         
         color_class = "low-risk"
         if risk_level == "HIGH": color_class = "high-risk"
@@ -157,22 +314,24 @@ with tab1:
             st.metric("Churn Probability", f"{churn_prob:.1%}")
         
         with col3:
-            if st.session_state.input_data:
-                st.metric("Avg Order Value", f"${st.session_state.input_data['avg_order_value']:.2f}")
+            st.metric("Avg Order Value", f"${features['avg_order_value']:.2f}")
         
         # Feature breakdown
         st.markdown("---")
         st.subheader("🔬 Feature Analysis")
-        if st.session_state.input_data:
-            feat_col1, feat_col2, feat_col3, feat_col4 = st.columns(4)
-            with feat_col1:
-                st.metric("Days Since Last Order", st.session_state.input_data['recency_days'])
-            with feat_col2:
-                st.metric("Orders (30 days)", st.session_state.input_data['frequency_30d'])
-            with feat_col3:
-                st.metric("Category Diversity", st.session_state.input_data['category_diversity'])
-            with feat_col4:
-                st.metric("Logins (14 days)", st.session_state.input_data['login_count_14d'])
+        feat_col1, feat_col2, feat_col3, feat_col4 = st.columns(4)
+        with feat_col1:
+            st.metric("Days Since Last Order", features['recency_days'])
+        with feat_col2:
+            st.metric("Orders (30 days)", features['frequency_30d'])
+        with feat_col3:
+            st.metric("Category Diversity", features['category_diversity'])
+        with feat_col4:
+            st.metric("Logins (14 days)", features['login_count_14d'])
+
+        if churn['drivers']:
+            st.subheader("🧭 Top Risk Drivers")
+            st.dataframe(pd.DataFrame(churn['drivers']), use_container_width=True, hide_index=True)
 
 # =======================
 # TAB 2: RECOMMENDATIONS
@@ -181,44 +340,30 @@ with tab2:
     st.header("Personalized Recommendations")
     st.markdown("Get AI-powered product and content recommendations based on customer history using semantic search.")
     
-    rec_btn = st.button("🎯 Generate Recommendations", type="primary", use_container_width=False)
+    # Display recommendations
+    st.markdown("---")
+    st.subheader(f"🎁 Top Picks for {details.get('name', selected_customer)}")
     
-    if rec_btn:
-        with st.spinner("Running hybrid semantic search..."):
-            try:
-                resp = requests.post(f"{API_URL}/recommend", json={"customer_id": selected_customer}, timeout=20)
-                if resp.status_code == 200:
-                    st.session_state.recommendations = resp.json()
-                else:
-                    st.error(f"API Error: {resp.status_code}")
-            except Exception as e:
-                st.error(f"Recommendation failed: {e}")
+    recs = c360['recommendations']
     
-    # Display recommendations
-    if st.session_state.recommendations:
-        st.markdown("---")
-        st.subheader(f"🎁 Top Picks for {details.get('name', selected_customer)}")
-        
-        recs = st.session_state.recommendations
-        
-        if not recs:
-            st.warning("No recommendations found.")
-        else:
-            cols = st.columns(3)
-            for i, item in enumerate(recs):
-                with cols[i % 3]:
-                    item_type = item.get('type', 'Item')
-                    badge_class = "product-badge" if item_type == "Product" else "content-badge"
-                    
-                    st.markdown(f"""
-                    <div class="rec-card">
-                        <span class="{badge_class}">{item_type}</span>
-                        <h4 style="margin-top: 10px;">{item.get('title', 'Unknown')}</h4>
-                        <p style="color: #666; font-size: 14px;">{item.get('category', 'N/A')}</p>
-                        <p style="font-size: 13px;">{item.get('description', '')[:80]}...</p>
-                        <p style="color: #4CAF50; font-weight: bold;">Match Score: {item.get('score', 0):.2%}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+    if not recs:
+        st.warning("No recommendations found.")
+    else:
+        cols = st.columns(3)
+        for i, item in enumerate(recs):
+            with cols[i % 3]:
+                item_type = item.get('type', 'Item')
+                badge_class = "product-badge" if item_type == "Product" else "content-badge"
+                
+                st.markdown(f"""
+                <div class="rec-card">
+                    <span class="{badge_class}">{item_type}</span>
+                    <h4 style="margin-top: 10px;">{item.get('title', 'Unknown')}</h4>
+                    <p style="color: #666; font-size: 14px;">{item.get('category', 'N/A')}</p>
+                    <p style="font-size: 13px;">{item.get('description', '')[:80]}...</p>
+                    <p style="color: #4CAF50; font-weight: bold;">Match Score: {item.get('score', 0):.2%}</p>
+                </div>
+                """, unsafe_allow_html=True)
 
 # =======================
 # TAB 3: CAMPAIGN GENERATOR
@@ -227,28 +372,46 @@ with tab3:
     st.header("AI Campaign Generator")
     st.markdown("Generate personalized retention emails using Google Gemini AI.")
     
-    if st.session_state.churn_result is None:
-        st.warning("⚠️ Please run Churn Analysis first (Tab 1) to unlock this feature.")
+    if churn is None:
+        st.warning("⚠️ No churn score for this customer yet (see Tab 1).")
     else:
-        st.success(f"✅ Customer {selected_customer} identified as **{st.session_state.churn_result['risk_segment']}** risk")
+        st.success(f"✅ Customer {selected_customer} identified as **{churn['risk_segment']}** risk")
         
         campaign_btn = st.button("✨ Generate Retention Email", type="primary")
         
         if campaign_btn:
-            with st.spinner("Gemini is crafting your email..."):
-                payload = {
-                    "customer_id": selected_customer,
-                    "risk_segment": st.session_state.churn_result['risk_segment'],
-                    "churn_probability": st.session_state.churn_result['churn_probability']
-                }
-                try:
-                    resp = requests.post(f"{API_URL}/campaign/generate", json=payload, timeout=30)
-                    if resp.status_code == 200:
-                        st.session_state.campaign = resp.json()
-                    else:
+            # Name and titles from the 360 payload, so the API doesn't look them up again
+            payload = {
+                "customer_id": selected_customer,
+                "risk_segment": churn['risk_segment'],
+                "churn_probability": churn['churn_probability'],
+                **c360['campaign_context'],
+            }
+            # Body is rendered as tokens stream in; subject and strategy arrive with the final event
+            preview = st.empty()
+            preview.info("Gemini is crafting your email...")
+            body = ""
+            try:
+                with requests.post(f"{API_URL}/campaign/generate/stream", json=payload,
+                                   stream=True, timeout=(5, 60)) as resp:
+                    if resp.status_code != 200:
                         st.error(f"API Error: {resp.status_code} - {resp.text}")
-                except Exception as e:
-                    st.error(f"Campaign generation failed: {e}")
+                    else:
+                        for event, data in iter_sse(resp):
+                            if event == "token":
+                                body += data['text']
+                                preview.markdown(body + "▌")
+                            elif event == "error":
+                                st.warning(f"Generation failed, using a template instead: {data['text']}")
+                            elif event == "done":
+                                st.session_state.campaign = data
+                                st.session_state.campaign_customer = selected_customer
+                                # Widgets keyed by these names would keep the previous email
+                                st.session_state.pop("email_subject", None)
+                                st.session_state.pop("email_body", None)
+                preview.empty()
+            except Exception as e:
+                st.error(f"Campaign generation failed: {e}")
         
         if st.session_state.campaign:
             st.markdown("---")
@@ -0,0 +1,83 @@
+"""
+Time-to-first-byte and total time of /campaign/generate vs the SSE variant
+/campaign/generate/stream.
+
+Starts the API with the local fake streaming LLM (LLM_BACKEND=fake), whose
+first-token delay and per-token delay are set from the command line, so the
+numbers are reproducible without a Gemini key. Pass --external to time an API
+that is already running (e.g. against real Gemini) instead.
+
+    python -m src.benchmarks.bench_campaign_streaming --requests 10 --first-token-ms 300 --token-ms 25
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import numpy as np
+import requests
+
+PAYLOAD = {'customer_id': 'C001', 'risk_segment': 'HIGH', 'churn_probability': 0.82,
+           'customer_name': 'User_C001', 'recommended_titles': ['Item A', 'Item B']}
+
+
+def wait_ready(base_url, timeout=600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(base_url + '/', timeout=2).ok:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    return False
+
+
+def time_request(url):
+    """(ms to first body byte, ms to end of body)"""
+    start = time.perf_counter()
+    with requests.post(url, json=PAYLOAD, stream=True, timeout=120) as resp:
+        resp.raise_for_status()
+        chunks = resp.iter_content(chunk_size=None)
+        next(chunks)
+        first = time.perf_counter()
+        for _ in chunks:
+            pass
+    return (first - start) * 1000, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=10)
+    parser.add_argument('--first-token-ms', type=float, default=300)
+    parser.add_argument('--token-ms', type=float, default=25)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--external', default=None, help="Base URL of a running API")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.external
+    if base_url is None:
+        env = {**os.environ, 'LLM_BACKEND': 'fake', 'FAKE_LLM_FIRST_TOKEN_MS': str(args.first_token_ms),
+               'FAKE_LLM_TOKEN_MS': str(args.token_ms)}
+        server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'src.api.main:app', '--port', str(args.port)],
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        if not wait_ready(base_url):
+            raise RuntimeError("API did not become ready")
+        print(f"{'endpoint':>26} {'TTFB p50':>9} {'TTFB max':>9} {'total p50':>10}")
+        for path in ('/campaign/generate', '/campaign/generate/stream'):
+            timings = np.array([time_request(base_url + path) for _ in range(args.requests)])
+            print(f"{path:>26} {np.percentile(timings[:, 0], 50):7.0f}ms {timings[:, 0].max():7.0f}ms "
+                  f"{np.percentile(timings[:, 1], 50):8.0f}ms")
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Bulk rendering throughput of the precompiled retention templates
+(campaign_templates.render_bulk) against the offline campaign target of
+100k emails/s on one core. Exits non-zero when the best run is below --target.
+
+    python -m src.benchmarks.bench_campaign_templates --customers 200000
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from src.services import campaign_templates
+
+TITLES = ['Smart Gadget 12', 'Courtroom Justice - 29', 'Story 7', 'Noise Cancelling Headphones']
+
+
+def make_inputs(n):
+    rng = np.random.default_rng(0)
+    customer_ids = [f"C{i:07d}" for i in range(n)]
+    segments = np.array(['HIGH', 'MEDIUM', 'LOW'])[rng.integers(0, 3, n)].tolist()
+    names = [f"User_{cid}" if keep else None for cid, keep in zip(customer_ids, rng.random(n) < 0.9)]
+    titles = [TITLES[:k] or None for k in rng.integers(0, 3, n)]
+    return customer_ids, segments, names, titles
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--customers', type=int, default=200_000)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--target', type=float, default=100_000, help="Required emails/s")
+    args = parser.parse_args()
+
+    customer_ids, segments, names, titles = make_inputs(args.customers)
+    rates = []
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        campaign = campaign_templates.render_bulk(customer_ids, segments, names, titles)
+        elapsed = time.perf_counter() - start
+        rates.append(args.customers / elapsed)
+        print(f"render_bulk {args.customers:,} emails in {elapsed * 1000:7.0f}ms  ({rates[-1]:,.0f}/s)")
+
+    variants, counts = np.unique(campaign['template_variant'], return_counts=True)
+    best = max(rates)
+    print(f"best {best:,.0f}/s vs target {args.target:,.0f}/s; variants {dict(zip(variants.tolist(), counts.tolist()))}")
+    if best < args.target:
+        print("BELOW TARGET")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
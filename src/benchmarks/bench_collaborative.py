@@ -0,0 +1,66 @@
+"""
+Item-item co-occurrence model: training time, peak traced memory, model size and
+query latency on synthetic power-law interactions.
+
+    python -m src.benchmarks.bench_collaborative --interactions 2000000 --users 200000 --items 50000
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.models.collaborative import ItemCooccurrenceModel
+
+
+def make_interactions(n, n_users, n_items):
+    rng = np.random.default_rng(0)
+    # Zipf-like item popularity so a few items co-occur with almost everything
+    item_p = 1 / np.arange(1, n_items + 1) ** 0.8
+    item_p /= item_p.sum()
+    return pd.DataFrame({
+        'customer_id': np.char.add('C', rng.integers(0, n_users, n).astype(str)),
+        'item_id': np.char.add('I', rng.choice(n_items, size=n, p=item_p).astype(str)),
+        'action': rng.choice(['view', 'like', 'cart', 'purchase', 'watch_later'], size=n),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--interactions', type=int, default=2_000_000)
+    parser.add_argument('--users', type=int, default=200_000)
+    parser.add_argument('--items', type=int, default=50_000)
+    parser.add_argument('--neighbours', type=int, default=50)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    interactions = make_interactions(args.interactions, args.users, args.items)
+    print(f"{len(interactions):,} interactions, {args.users:,} users, {args.items:,} items, "
+          f"{os.cpu_count()} cores")
+
+    for workers in sorted({1, os.cpu_count()}):
+        tracemalloc.start()
+        start = time.perf_counter()
+        model = ItemCooccurrenceModel.from_interactions(interactions, neighbours=args.neighbours, workers=workers)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"fit workers={workers:<3} {elapsed:7.2f}s  peak traced={peak / 1e6:8.1f}MB  "
+              f"model={model.nbytes() / 1e6:7.1f}MB  nnz={model.similarity.nnz:,}")
+
+    histories = interactions.groupby('customer_id')['item_id'].agg(list).sample(
+        args.queries, random_state=0, replace=True).tolist()
+    model.score(histories[0])
+    times = []
+    for history in histories:
+        start = time.perf_counter()
+        model.score(history)
+        times.append((time.perf_counter() - start) * 1000)
+    print(f"query p50={np.percentile(times, 50):.2f}ms  p99={np.percentile(times, 99):.2f}ms  "
+          f"(mean history {np.mean([len(h) for h in histories]):.1f} items)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Concurrency benchmark for the data layer.
+
+Runs N threads issuing a mix of per-customer reads and cached-score writes and
+reports throughput and latency percentiles. Compares the old engine setup
+(plain SQLite, rollback journal) with the tuned engine from database.py.
+
+    python -m src.benchmarks.bench_db_concurrency --threads 16 --ops 2000
+    DATABASE_URL=postgresql+psycopg2://... python -m src.benchmarks.bench_db_concurrency
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import sessionmaker
+
+from src.data.database import build_engine
+from src.data.models import Base, Customer
+
+
+def seed(engine, n_customers):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(Customer.__table__.insert(), [
+            {"customer_id": f"C{i:07d}", "age": 30, "country": "US", "signup_date": datetime(2023, 1, 1)}
+            for i in range(n_customers)
+        ])
+
+
+def run(engine, n_customers, threads, ops, write_ratio):
+    Session = sessionmaker(bind=engine)
+    latencies = []
+    errors = 0
+
+    def worker(seed_value):
+        nonlocal errors
+        rng = random.Random(seed_value)
+        local = []
+        for _ in range(ops // threads):
+            cid = f"C{rng.randrange(n_customers):07d}"
+            start = time.perf_counter()
+            try:
+                with Session() as db:
+                    if rng.random() < write_ratio:
+                        db.execute(update(Customer).where(Customer.customer_id == cid)
+                                   .values(churn_probability=rng.random(), risk_segment="HIGH"))
+                        db.commit()
+                    else:
+                        db.execute(select(Customer).where(Customer.customer_id == cid)).scalar_one_or_none()
+            except Exception:
+                errors += 1
+            local.append(time.perf_counter() - start)
+        return local
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for result in pool.map(worker, range(threads)):
+            latencies.extend(result)
+    wall = time.perf_counter() - wall_start
+
+    lat_ms = np.array(latencies) * 1000
+    return {
+        "ops_per_sec": len(latencies) / wall,
+        "p50_ms": float(np.percentile(lat_ms, 50)),
+        "p99_ms": float(np.percentile(lat_ms, 99)),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, default=10_000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=4_000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    url = os.getenv("DATABASE_URL")
+    if url and not url.startswith("sqlite"):
+        configs = {"tuned": build_engine(url)}
+    else:
+        tmp = tempfile.mkdtemp()
+        configs = {
+            "legacy": create_engine(f"sqlite:///{tmp}/legacy.db", connect_args={"check_same_thread": False}),
+            "tuned": build_engine(f"sqlite:///{tmp}/tuned.db"),
+        }
+
+    for name, engine in configs.items():
+        seed(engine, args.customers)
+        stats = run(engine, args.customers, args.threads, args.ops, args.write_ratio)
+        print(f"{name:>7}: {stats['ops_per_sec']:8.0f} ops/s  p50={stats['p50_ms']:.2f}ms  "
+              f"p99={stats['p99_ms']:.2f}ms  errors={stats['errors']}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
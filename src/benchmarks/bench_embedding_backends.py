@@ -0,0 +1,67 @@
+"""
+Embedding backend parity check and throughput benchmark (torch vs ONNX vs ONNX int8).
+
+Parity: per-text cosine similarity between each backend's embedding and the
+torch reference, plus top-10 neighbour overlap on the catalogue. Exits non-zero
+when a backend drops below its cosine threshold, so it can gate CI.
+
+    python -m src.benchmarks.bench_embedding_backends --threads 4 --batch-size 64
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from src.models.embed_catalogue import load_catalogue
+from src.models.embedding_backends import DEFAULT_MODEL, get_embedding_backend
+
+MIN_COSINE = {'onnx': 0.999, 'onnx-int8': 0.97}
+
+
+def throughput(backend, texts, batch_size, repeat=3):
+    backend.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        emb = backend.encode(texts, batch_size=batch_size)
+        best = min(best, time.perf_counter() - start)
+    return emb, len(texts) / best
+
+
+def topk_overlap(reference, candidate, k=10):
+    ref_nn = np.argsort(-(reference @ reference.T), axis=1)[:, 1:k + 1]
+    cand_nn = np.argsort(-(candidate @ candidate.T), axis=1)[:, 1:k + 1]
+    return float(np.mean([len(np.intersect1d(a, b)) / k for a, b in zip(ref_nn, cand_nn)]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+
+    texts = load_catalogue().texts()
+    results = {}
+    for name in ('torch', 'onnx', 'onnx-int8'):
+        backend = get_embedding_backend(name, args.model, threads=args.threads)
+        results[name] = throughput(backend, texts, args.batch_size)
+
+    reference = results['torch'][0]
+    failed = False
+    print(f"{'backend':<10} {'items/s':>9} {'speedup':>8} {'cos mean':>9} {'cos min':>8} {'top10 overlap':>14}")
+    for name, (emb, items_per_sec) in results.items():
+        cos = np.sum(reference * emb, axis=1)
+        overlap = topk_overlap(reference, emb)
+        print(f"{name:<10} {items_per_sec:9.0f} {items_per_sec / results['torch'][1]:7.2f}x "
+              f"{cos.mean():9.5f} {cos.min():8.5f} {overlap:14.3f}")
+        if name in MIN_COSINE and cos.min() < MIN_COSINE[name]:
+            print(f"  PARITY FAILED: {name} min cosine {cos.min():.5f} < {MIN_COSINE[name]}")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Tail latency of recommendation + churn scoring under open-loop load.
+
+inline:   every request runs on a 40-thread pool with an unbounded queue (what
+          sync FastAPI handlers get from Starlette), BLAS/torch/XGBoost threads
+          left at their defaults
+executor: requests go through InferenceExecutor (sized pool, budgeted intra-op
+          threads, bounded queue, queue-wait deadline)
+
+Requests arrive at a fixed rate regardless of completions, and latency is
+measured from the scheduled arrival, so a growing backlog shows up in p99.
+Rejected (503) requests are counted separately.
+
+    python -m src.benchmarks.bench_inference_executor --items 200000 --rates 50 100 200
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import xgboost as xgb
+
+from src.benchmarks.bench_recommend_history import build_engine
+from src.services.inference_executor import ExecutorOverloaded, InferenceExecutor
+
+STARLETTE_THREADS = 40
+
+
+def build_churn_model(n_features=14, rows=20_000):
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((rows, n_features)).astype(np.float32)
+    y = (X[:, 0] + 0.5 * X[:, 1] + rng.standard_normal(rows) > 0).astype(int)
+    model = xgb.XGBClassifier(n_estimators=200, max_depth=6, tree_method='hist')
+    model.fit(X, y)
+    return model, X[:1]
+
+
+def open_loop(submit, rate, seconds):
+    """Fires submit(done_callback) `rate` times per second; returns latencies (ms) and rejections."""
+    latencies, rejected = [], [0]
+    lock = threading.Lock()
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    n = int(rate * seconds)
+    pending = threading.Semaphore(0)
+
+    for i in range(n):
+        scheduled = start + i * interval
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        def done(ok, scheduled=scheduled):
+            with lock:
+                if ok:
+                    latencies.append((time.perf_counter() - scheduled) * 1000)
+                else:
+                    rejected[0] += 1
+            pending.release()
+
+        submit(i, done)
+    for _ in range(n):
+        pending.acquire()
+    return np.asarray(latencies), rejected[0], time.perf_counter() - start
+
+
+def run(mode, engine, model, row, rate, seconds, workers, max_queue, max_wait_ms):
+    tasks = [lambda: engine.recommend_for_user('HEAVY', top_k=6), lambda: model.predict_proba(row)]
+
+    if mode == 'inline':
+        pool = ThreadPoolExecutor(STARLETTE_THREADS)
+
+        def submit(i, done):
+            def call():
+                tasks[i % 2]()
+                done(True)
+            pool.submit(call)
+
+        result = open_loop(submit, rate, seconds)
+        pool.shutdown()
+        return result
+
+    executor = InferenceExecutor(workers=workers, max_queue=max_queue, max_queue_wait=max_wait_ms / 1000)
+    executor.budget_xgboost(model)
+    executor.start()
+
+    def submit(i, done):
+        try:
+            future = executor.submit('recommend' if i % 2 == 0 else 'churn', tasks[i % 2])
+        except ExecutorOverloaded:
+            done(False)
+            return
+        future.add_done_callback(lambda f: done(f.exception() is None))
+
+    result = open_loop(submit, rate, seconds)
+    executor.stop()
+    model.set_params(n_jobs=None)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=200_000)
+    parser.add_argument('--history', type=int, default=50)
+    parser.add_argument('--rates', type=int, nargs='+', default=[50, 100, 200])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-queue', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=250)
+    args = parser.parse_args()
+
+    engine = build_engine(args.items, args.history)
+    model, row = build_churn_model()
+
+    print(f"{'mode':>9} {'rate':>6} {'done/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'max ms':>9} {'rejected':>9}")
+    for rate in args.rates:
+        for mode in ('inline', 'executor'):
+            latencies, rejected, elapsed = run(mode, engine, model, row, rate, args.seconds,
+                                               args.workers, args.max_queue, args.max_wait_ms)
+            p = np.percentile(latencies, [50, 99, 100]) if len(latencies) else [float('nan')] * 3
+            print(f"{mode:>9} {rate:>6} {len(latencies) / elapsed:8.0f} {p[0]:8.1f} {p[1]:9.1f} {p[2]:9.1f} {rejected:>9}")
+
+
+if __name__ == '__main__':
+    main()
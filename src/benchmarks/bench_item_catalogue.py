@@ -0,0 +1,97 @@
+"""
+Memory and top-k materialization cost: pandas item repo vs columnar ItemCatalogue.
+
+    python -m src.benchmarks.bench_item_catalogue --items 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.models.item_catalogue import ItemCatalogue
+
+
+def make_frames(n):
+    rng = np.random.default_rng(0)
+    n_products = n // 2
+    n_content = n - n_products
+    categories = np.array(['Electronics', 'Fashion', 'Home', 'Entertainment'])
+    genres = np.array(['Action', 'Drama', 'Tech Review', 'Comedy'])
+    products = pd.DataFrame({
+        'product_id': [f"P{i:07d}" for i in range(n_products)],
+        'name': [f"Smart Gadget {i}" for i in range(n_products)],
+        'category': categories[rng.integers(0, 4, n_products)],
+        'price': rng.uniform(5, 1500, n_products).round(2),
+        'description': [f"High quality gadget #{i} suitable for enthusiasts. Features state-of-the-art technology."
+                        for i in range(n_products)],
+    })
+    content = pd.DataFrame({
+        'content_id': [f"CT{i:07d}" for i in range(n_content)],
+        'title': [f"Story {i}" for i in range(n_content)],
+        'genre': genres[rng.integers(0, 4, n_content)],
+        'type': 'Podcast',
+        'description': [f"A engaging podcast about story {i}." for i in range(n_content)],
+    })
+    return products, content
+
+
+def pandas_repo(products, content):
+    """The previous _prepare_item_repo() implementation."""
+    p = products.copy()
+    p['item_id'] = p['product_id']
+    p['type'] = 'Product'
+    p['title'] = p['name']
+    p = p[['item_id', 'type', 'title', 'category', 'description', 'price']]
+    p['meta'] = p.apply(lambda x: f"Price: ${x['price']}", axis=1)
+    c = content.copy()
+    c['item_id'] = c['content_id']
+    c['type'] = 'Content'
+    c['category'] = c['genre']
+    c = c[['item_id', 'type', 'title', 'category', 'description']]
+    c['meta'] = c['type']
+    c['price'] = 0
+    return pd.concat([p, c], ignore_index=True)
+
+
+def per_request(fn, repeat=2000):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat * 1e6
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=1_000_000)
+    parser.add_argument('--top-k', type=int, default=26)
+    args = parser.parse_args()
+
+    products, content = make_frames(args.items)
+
+    start = time.perf_counter()
+    items = pandas_repo(products, content)
+    pandas_build = time.perf_counter() - start
+    start = time.perf_counter()
+    catalogue = ItemCatalogue.from_frames(products, content)
+    columnar_build = time.perf_counter() - start
+
+    pandas_bytes = items.memory_usage(deep=True).sum()
+    print(f"build:  pandas {pandas_build:6.2f}s   columnar {columnar_build:6.2f}s")
+    print(f"memory: pandas {pandas_bytes / args.items:6.1f} B/item   "
+          f"columnar {catalogue.nbytes() / args.items:6.1f} B/item")
+
+    idx = np.random.default_rng(1).integers(0, args.items, args.top_k).tolist()
+    pandas_us, pandas_peak = per_request(lambda: [items.iloc[i].to_dict() for i in idx])
+    columnar_us, columnar_peak = per_request(lambda: catalogue.records(idx))
+    print(f"top-{args.top_k} records: pandas {pandas_us:8.1f} us (peak {pandas_peak / 1024:.0f} KiB)   "
+          f"columnar {columnar_us:8.1f} us (peak {columnar_peak / 1024:.0f} KiB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+recommend_for_user latency for heavy users (10k-item histories).
+
+legacy: history as a Python list, `item_id not in list` per candidate over a
+        fixed top_k+20 candidate window (can return fewer than top_k)
+masked: boolean exclusion mask before top-k, optional MMR re-ranking
+
+    python -m src.benchmarks.bench_recommend_history --items 200000 --history 10000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.models.catalogue_store import CatalogueStore
+from src.models.item_catalogue import ItemCatalogue
+from src.models.personalization import PersonalizationEngine
+
+
+def build_engine(n_items, history, dim=384):
+    rng = np.random.default_rng(0)
+    catalogue = ItemCatalogue.from_records([
+        {'item_id': f"I{i:07d}", 'title': f"Item {i}", 'category': f"cat{i % 20}",
+         'type': 'Product' if i % 2 else 'Content', 'description': ''}
+        for i in range(n_items)
+    ])
+    embeddings = rng.standard_normal((n_items, dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    # Heavy user whose history is the neighbourhood of one item, i.e. it covers
+    # exactly the items that would otherwise rank highest
+    anchor = embeddings[0]
+    seen = np.argsort(-(embeddings @ anchor))[:history]
+    interactions = pd.DataFrame({
+        'customer_id': 'HEAVY',
+        'item_id': [f"I{i:07d}" for i in seen],
+        'action': 'view',
+        'timestamp': '2024-01-01',
+    })
+
+    engine = PersonalizationEngine.__new__(PersonalizationEngine)
+    engine.model = object()
+    engine.customers = pd.DataFrame({'customer_id': ['HEAVY'], 'segment': ['Casual']})
+    engine.fit_interactions(interactions)
+    engine._rng = rng
+    engine.store = CatalogueStore(catalogue, embeddings)
+    return engine
+
+
+def legacy_recommend(engine, customer_id, top_k):
+    snapshot = engine.store.snapshot
+    user_vector = engine.get_user_embedding(customer_id, snapshot)
+    scores = snapshot.embeddings @ user_vector
+    k = top_k + 20
+    top_idx = np.argpartition(-scores, k - 1)[:k]
+    top_idx = top_idx[np.argsort(-scores[top_idx])]
+    user_history_ids = engine.interactions[engine.interactions['customer_id'] == customer_id]['item_id'].tolist()
+    picked = []
+    for idx in top_idx:
+        if snapshot.catalogue.item_id(idx) not in user_history_ids:
+            picked.append(idx)
+        if len(picked) >= top_k:
+            break
+    return snapshot.catalogue.records(picked, scores[picked])
+
+
+def bench(fn, repeat):
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return np.percentile(times, 50), np.percentile(times, 99), len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=200_000)
+    parser.add_argument('--history', type=int, default=10_000)
+    parser.add_argument('--top-k', type=int, default=6)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    engine = build_engine(args.items, args.history)
+    runs = {
+        'legacy': lambda: legacy_recommend(engine, 'HEAVY', args.top_k),
+        'masked': lambda: engine.recommend_for_user('HEAVY', args.top_k, diversity=0),
+        'masked+mmr': lambda: engine.recommend_for_user('HEAVY', args.top_k, diversity=0.3),
+    }
+    for name, fn in runs.items():
+        p50, p99, n = bench(fn, args.repeat)
+        print(f"{name:<11} p50={p50:8.2f}ms  p99={p99:8.2f}ms  results={n}/{args.top_k}")
+
+
+if __name__ == '__main__':
+    main()
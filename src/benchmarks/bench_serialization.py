@@ -0,0 +1,79 @@
+"""
+Serialization cost of a 1000-item recommendation response.
+
+before: FastAPI default path - validate each dict into RecItem, jsonable_encoder,
+        then json.dumps (what `response_model=List[RecItem]` did)
+after:  NumpyORJSONResponse rendering the engine's dicts directly
+
+    python -m src.benchmarks.bench_serialization --items 1000 --repeat 200
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from typing import Optional
+
+from src.api.serialization import NumpyORJSONResponse
+
+
+# Mirrors src.api.main.RecItem (importing main would load the embedding model)
+class RecItem(BaseModel):
+    item_id: str
+    title: str
+    category: str
+    type: str
+    description: str
+    score: float
+    meta: Optional[str] = None
+
+
+def make_recs(n):
+    rng = np.random.default_rng(0)
+    return [{
+        'item_id': f"P{i:05d}",
+        'type': 'Product',
+        'title': f"Item {i}",
+        'category': 'Electronics',
+        'description': "High quality item suitable for enthusiasts. Features state-of-the-art technology.",
+        'price': np.float64(rng.uniform(5, 500)),
+        'meta': f"Price: ${i}",
+        'score': np.float32(rng.random()),
+    } for i in range(n)]
+
+
+def before(recs):
+    validated = [RecItem(**{**r, 'score': float(r['score'])}) for r in recs]
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def after(recs):
+    return NumpyORJSONResponse(recs).body
+
+
+def bench(fn, recs, repeat):
+    fn(recs)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = fn(recs)
+    return (time.perf_counter() - start) / repeat * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    recs = make_recs(args.items)
+    before_ms, before_bytes = bench(before, recs, args.repeat)
+    after_ms, after_bytes = bench(after, recs, args.repeat)
+    print(f"before (pydantic + jsonable_encoder + json): {before_ms:7.3f} ms  {before_bytes:,} bytes")
+    print(f"after  (orjson, numpy-aware):               {after_ms:7.3f} ms  {after_bytes:,} bytes")
+    print(f"speedup: {before_ms / after_ms:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Per-worker memory and aggregate throughput of the preloaded gunicorn deployment
+as the worker count grows.
+
+For each worker count a server is started with src/api/gunicorn_conf.py, a
+closed-loop load (keep-alive clients, mixed /predict/churn, /recommend and
+/data/customer requests) runs for a fixed time, then every worker's RSS, PSS and
+private memory are read from /proc/<pid>/smaps_rollup. PSS splits shared pages
+between the processes mapping them, so sum(PSS) is the real footprint; with
+preload + gc.freeze it should grow far slower than workers x RSS.
+
+    python -m src.benchmarks.bench_serving_workers --workers 1 2 4 --seconds 20 --clients 16
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+
+CONF = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'api', 'gunicorn_conf.py')
+
+
+def smaps_rollup(pid):
+    """Rss / Pss / Private (clean + dirty) in MB for one process."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {'rss': fields.get('Rss', 0.0), 'pss': fields.get('Pss', 0.0),
+            'private': fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0)}
+
+
+def worker_pids(master_pid):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def wait_ready(base_url, n_workers, master_pid, timeout=600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(base_url + '/', timeout=2).ok and len(worker_pids(master_pid)) >= n_workers:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    return False
+
+
+def run_load(base_url, clients, seconds):
+    payload = {'customer_id': 'C001', 'recency_days': 45, 'frequency_30d': 1, 'avg_order_value': 520.0,
+               'category_diversity': 2, 'login_count_14d': 3, 'country': 'US'}
+    requests_per_kind = [
+        ('post', '/predict/churn', payload),
+        ('post', '/recommend', {'customer_id': 'C001'}),
+        ('get', '/data/customer/C002', None),
+    ]
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def client(offset):
+        session = requests.Session()
+        local, i = [], offset
+        while time.perf_counter() < stop_at:
+            method, path, body = requests_per_kind[i % len(requests_per_kind)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                resp = session.request(method, base_url + path, json=body, timeout=30)
+                ok = resp.ok
+            except requests.RequestException:
+                ok = False
+            local.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return np.asarray(latencies), errors[0]
+
+
+def bench(n_workers, port, clients, seconds, preload=True):
+    env = {**os.environ, 'WEB_CONCURRENCY': str(n_workers), 'BIND': f"127.0.0.1:{port}",
+           'PRELOAD_APP': '1' if preload else '0'}
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', CONF, 'src.api.main:app'],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        if not wait_ready(base_url, n_workers, server.pid):
+            raise RuntimeError(f"Server with {n_workers} workers did not become ready")
+        latencies, errors = run_load(base_url, clients, seconds)
+        memory = [smaps_rollup(pid) for pid in worker_pids(server.pid)]
+        master = smaps_rollup(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+    return {
+        'workers': n_workers,
+        'rps': len(latencies) / seconds,
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else float('nan'),
+        'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else float('nan'),
+        'errors': errors,
+        'worker_rss_mb': float(np.mean([m['rss'] for m in memory])),
+        'worker_private_mb': float(np.mean([m['private'] for m in memory])),
+        'total_pss_mb': master['pss'] + sum(m['pss'] for m in memory),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--seconds', type=int, default=20)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--no-preload', action='store_true', help="Baseline: every worker imports the app itself")
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6} "
+          f"{'RSS/worker':>11} {'private/worker':>15} {'total PSS':>10}")
+    for n in args.workers:
+        r = bench(n, args.port, args.clients, args.seconds, preload=not args.no_preload)
+        print(f"{r['workers']:>7} {r['rps']:8.0f} {r['p50_ms']:8.1f} {r['p99_ms']:8.1f} {r['errors']:>6} "
+              f"{r['worker_rss_mb']:9.0f}MB {r['worker_private_mb']:13.0f}MB {r['total_pss_mb']:8.0f}MB")
+
+
+if __name__ == '__main__':
+    main()
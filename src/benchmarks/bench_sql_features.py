@@ -0,0 +1,108 @@
+"""
+Feature building benchmark: pandas over full tables vs SQL-side aggregation.
+
+Generates a synthetic transactions table (10M rows by default) in SQLite or
+DATABASE_URL, then times:
+  - pandas: read the whole transactions table and run build_features()
+  - sql:    build_features_sql(), aggregating in the database
+  - a single-customer history lookup with and without the composite index
+
+    python -m src.benchmarks.bench_sql_features --rows 10000000 --customers 500000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from src.data.models import Base
+from src.data.migrations import upgrade
+from src.features.build_features import build_features
+from src.features.sql_features import build_features_sql
+
+
+def generate(engine, n_rows, n_customers, chunk=1_000_000):
+    rng = np.random.default_rng(42)
+    customer_ids = np.array([f"C{i:07d}" for i in range(n_customers)])
+    pd.DataFrame({
+        'customer_id': customer_ids,
+        'age': rng.integers(18, 70, n_customers),
+        'country': rng.choice(['US', 'UK', 'India', 'Germany'], n_customers),
+    }).to_sql('customers', engine, if_exists='append', index=False)
+
+    start_date = np.datetime64('2023-07-01')
+    categories = np.array(['Electronics', 'Fashion', 'Home', 'Entertainment'])
+    for offset in range(0, n_rows, chunk):
+        n = min(chunk, n_rows - offset)
+        pd.DataFrame({
+            'transaction_id': np.char.add('T', np.arange(offset, offset + n).astype(str)),
+            'customer_id': customer_ids[rng.integers(0, n_customers, n)],
+            'amount': rng.gamma(2.0, 40.0, n).round(2),
+            'category': categories[rng.integers(0, len(categories), n)],
+            'order_date': pd.to_datetime(start_date + rng.integers(0, 366, n).astype('timedelta64[D]')),
+        }).to_sql('transactions', engine, if_exists='append', index=False)
+        print(f"  inserted {offset + n:,} rows")
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<32} {time.perf_counter() - start:8.2f}s")
+    return result
+
+
+def pandas_path(engine):
+    customers = pd.read_sql('SELECT customer_id, age, country FROM customers', engine)
+    transactions = pd.read_sql('SELECT customer_id, transaction_id AS order_id, amount, category, order_date '
+                               'FROM transactions', engine)
+    events = pd.DataFrame(columns=['customer_id', 'event_type', 'event_date'])
+    return build_features(customers, transactions, events)
+
+
+def history_lookup(engine, customer_id):
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT order_date, amount FROM transactions WHERE customer_id = :cid "
+            "AND order_date >= '2024-06-01' ORDER BY order_date"
+        ), {"cid": customer_id}).all()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--customers', type=int, default=500_000)
+    args = parser.parse_args()
+
+    url = os.getenv('DATABASE_URL') or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    # Create tables without the new indexes to measure the "before" state
+    for table in Base.metadata.sorted_tables:
+        table.create(bind=engine)
+        with engine.begin() as conn:
+            for index in table.indexes:
+                if index.name.startswith('ix_transactions_customer_id') or index.name == 'ix_transactions_order_date':
+                    conn.execute(text(f'DROP INDEX IF EXISTS {index.name}'))
+
+    print(f"Generating {args.rows:,} transactions for {args.customers:,} customers...")
+    generate(engine, args.rows, args.customers)
+
+    timed("history lookup (no index)", lambda: history_lookup(engine, 'C0000042'))
+    timed("migration (create indexes)", lambda: upgrade(engine))
+    timed("history lookup (indexed)", lambda: history_lookup(engine, 'C0000042'))
+
+    sql_features = timed("build_features_sql", lambda: build_features_sql(engine))
+    pandas_features = timed("pandas build_features", lambda: pandas_path(engine))
+    print(f"rows pulled into pandas: sql={len(sql_features):,}  pandas={args.rows + args.customers:,}")
+
+    merged = sql_features.merge(pandas_features, on='customer_id', suffixes=('_sql', '_pd'))
+    for col in ['recency_days', 'frequency_total', 'frequency_30d', 'avg_order_value', 'category_diversity']:
+        diff = (merged[f'{col}_sql'].astype(float) - merged[f'{col}_pd'].astype(float)).abs().max()
+        print(f"max |diff| {col:<20} {diff:.6f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+import threading
+
+import numpy as np
+
+RISK_LEVELS = ['UNKNOWN', 'LOW', 'MEDIUM', 'HIGH']
+# Churn probability histogram resolution of the cohort summaries
+PROB_BINS = 20
+
+
+def risk_segments_for(probs):
+    """Vectorized churn probability -> HIGH (> 0.7) / MEDIUM (> 0.4) / LOW"""
+    return np.where(probs > 0.7, "HIGH", np.where(probs > 0.4, "MEDIUM", "LOW"))
+
+
+class CustomerIndex:
+    """
+    Sorted, columnar customer index for paging/searching the customer base.
+    IDs are kept in a sorted NumPy string array so cursor seeks and prefix
+    search are binary searches; filters are applied on small vectorized slices.
+
+    Cohort analytics are pre-aggregated: per (segment, country) cell the index
+    keeps risk-level counts, a churn-probability histogram and the probability
+    sum. update_risk() retracts each customer's previous score and adds the new
+    one, so summaries never rescan the customer base. `version` increments on
+    every update and keys client-side caches.
+    """
+
+    def __init__(self, customers):
+        order = np.argsort(customers['customer_id'].to_numpy().astype(str), kind='stable')
+        df = customers.iloc[order].reset_index(drop=True)
+
+        self.ids = df['customer_id'].to_numpy().astype(str)
+        self.names = df['name'].to_numpy().astype(str) if 'name' in df.columns else self.ids
+        self.segment_values, self.segment_codes = self._encode(df, 'segment')
+        self.country_values, self.country_codes = self._encode(df, 'country')
+        self.risk_codes = np.zeros(len(self.ids), dtype=np.int8)
+        self.churn_probs = np.full(len(self.ids), np.nan, dtype=np.float32)
+        self.version = 0
+        self._lock = threading.Lock()
+        self._top_cache = {}
+
+        # Cohort cell per customer; code -1 (missing value) maps to slot 0
+        self._cube_shape = (len(self.segment_values) + 1, len(self.country_values) + 1)
+        self.cells = (self.segment_codes + 1) * self._cube_shape[1] + (self.country_codes + 1)
+        n_cells = self._cube_shape[0] * self._cube_shape[1]
+        self._risk_cube = np.zeros((n_cells, len(RISK_LEVELS)), dtype=np.int64)
+        self._risk_cube[:, 0] = np.bincount(self.cells, minlength=n_cells)
+        self._hist_cube = np.zeros((n_cells, PROB_BINS), dtype=np.int64)
+        self._prob_sum = np.zeros(n_cells, dtype=np.float64)
+
+    @staticmethod
+    def _encode(df, column):
+        if column not in df.columns:
+            return np.array([], dtype=str), np.full(len(df), -1, dtype=np.int32)
+        values, codes = np.unique(df[column].fillna('').astype(str).to_numpy(), return_inverse=True)
+        return values, codes.astype(np.int32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def update_risk(self, scores):
+        """Applies cached risk segments / probabilities, e.g. from the event ingestion service."""
+        if not scores or not len(self.ids):
+            return
+        ids = np.array([s['customer_id'] for s in scores], dtype=str)
+        codes = np.array([RISK_LEVELS.index(s.get('risk_segment') or 'UNKNOWN') for s in scores], dtype=np.int8)
+        probs = np.array([np.nan if s.get('churn_probability') is None else s['churn_probability']
+                          for s in scores], dtype=np.float32)
+        pos = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        found = self.ids[pos] == ids
+        pos, codes, probs = pos[found], codes[found], probs[found]
+        # Last score wins when a customer appears twice in one batch
+        _, last = np.unique(pos[::-1], return_index=True)
+        keep = len(pos) - 1 - last
+        pos, codes, probs = pos[keep], codes[keep], probs[keep]
+
+        cells = self.cells[pos]
+        with self._lock:
+            old_codes = self.risk_codes[pos]
+            old_probs = self.churn_probs[pos]
+            np.subtract.at(self._risk_cube, (cells, old_codes), 1)
+            np.add.at(self._risk_cube, (cells, codes), 1)
+            for values, sign in ((old_probs, -1), (probs, 1)):
+                scored = ~np.isnan(values)
+                np.add.at(self._hist_cube, (cells[scored], self._prob_bin(values[scored])), sign)
+                np.add.at(self._prob_sum, cells[scored], sign * values[scored].astype(np.float64))
+            self.risk_codes[pos] = codes
+            self.churn_probs[pos] = probs
+            self.version += 1
+            self._top_cache.clear()
+
+    @staticmethod
+    def _prob_bin(probs):
+        return np.clip((probs * PROB_BINS).astype(np.int64), 0, PROB_BINS - 1)
+
+    def facets(self):
+        return {
+            'segments': [s for s in self.segment_values.tolist() if s],
+            'countries': [c for c in self.country_values.tolist() if c],
+            'risk_segments': RISK_LEVELS[1:],
+        }
+
+    def _cube_slices(self, segment=None, country=None):
+        """(segment slot, country slot) index expressions for a filter; None means no match."""
+        slices = []
+        for values, wanted in ((self.segment_values, segment), (self.country_values, country)):
+            if wanted:
+                code = self._code_for(values, wanted)
+                if code is None:
+                    return None
+                slices.append(code + 1)
+            else:
+                slices.append(slice(None))
+        return tuple(slices)
+
+    @staticmethod
+    def _breakdown(labels, risk, prob_sum):
+        scored = risk[:, 1:].sum(axis=1)
+        rows = []
+        for i, label in enumerate(labels):
+            total = int(risk[i].sum())
+            if total == 0:
+                continue
+            rows.append({
+                'value': label or None,
+                'customers': total,
+                **{level: int(risk[i, j]) for j, level in enumerate(RISK_LEVELS)},
+                'mean_churn_probability': float(prob_sum[i] / scored[i]) if scored[i] else None,
+            })
+        return rows
+
+    def cohort_summary(self, segment=None, country=None):
+        """
+        Risk distribution, probability histogram and segment/country breakdowns of the
+        customers matching the filters, read from the pre-aggregated cubes.
+        """
+        shape = self._cube_shape
+        with self._lock:
+            version = self.version
+            risk = self._risk_cube.reshape(*shape, -1).copy()
+            hist = self._hist_cube.reshape(*shape, -1).copy()
+            prob_sum = self._prob_sum.reshape(shape).copy()
+
+        where = self._cube_slices(segment, country)
+        if where is None:
+            risk, hist, prob_sum = risk[:0, :0], hist[:0, :0], prob_sum[:0, :0]
+        else:
+            # Keep both axes so per-segment and per-country breakdowns come from the same slice
+            seg, cty = (np.s_[w:w + 1] if isinstance(w, int) else w for w in where)
+            risk, hist, prob_sum = risk[seg, cty], hist[seg, cty], prob_sum[seg, cty]
+            seg_labels = ([''] + self.segment_values.tolist())[seg]
+            cty_labels = ([''] + self.country_values.tolist())[cty]
+
+        risk_total = risk.sum(axis=(0, 1)) if risk.size else np.zeros(len(RISK_LEVELS), dtype=np.int64)
+        scored = int(risk_total[1:].sum())
+        return {
+            'version': version,
+            'customers': int(risk_total.sum()),
+            'scored': scored,
+            'risk_distribution': {level: int(risk_total[i]) for i, level in enumerate(RISK_LEVELS)},
+            'mean_churn_probability': float(prob_sum.sum() / scored) if scored else None,
+            'probability_histogram': {
+                'edges': np.linspace(0, 1, PROB_BINS + 1).round(4).tolist(),
+                'counts': (hist.sum(axis=(0, 1)) if hist.size else np.zeros(PROB_BINS, dtype=np.int64)).tolist(),
+            },
+            'segments': self._breakdown(seg_labels, risk.sum(axis=1), prob_sum.sum(axis=1)) if risk.size else [],
+            'countries': self._breakdown(cty_labels, risk.sum(axis=0), prob_sum.sum(axis=0)) if risk.size else [],
+        }
+
+    def top_risk(self, limit=20, segment=None, country=None):
+        """Highest cached churn probabilities (optionally within a segment/country)."""
+        key = (limit, segment, country)
+        with self._lock:
+            cached = self._top_cache.get(key)
+            if cached is not None:
+                return cached
+            version = self.version
+            probs = self.churn_probs.copy()
+
+        where = self._cube_slices(segment, country)
+        if where is None:
+            rows = []
+        else:
+            scores = np.where(np.isnan(probs), -np.inf, probs)
+            for codes, slot in ((self.segment_codes, where[0]), (self.country_codes, where[1])):
+                if isinstance(slot, int):
+                    scores[codes != slot - 1] = -np.inf
+            n = min(limit, int(np.count_nonzero(np.isfinite(scores))))
+            top = np.argpartition(-scores, n - 1)[:n] if n else np.empty(0, dtype=np.int64)
+            top = top[np.argsort(-scores[top], kind='stable')]
+            rows = [{**self._row(p), 'churn_probability': float(probs[p])} for p in top]
+
+        result = {'version': version, 'items': rows}
+        with self._lock:
+            if self.version == version and len(self._top_cache) < 256:
+                self._top_cache[key] = result
+        return result
+
+    def _code_for(self, values, value):
+        pos = int(np.searchsorted(values, value))
+        return pos if pos < len(values) and values[pos] == value else None
+
+    def page(self, cursor=None, limit=50, prefix=None, segment=None, country=None, risk=None):
+        """
+        Returns (rows, next_cursor). `cursor` is the last customer_id of the previous
+        page; pages are stable under inserts because they seek by key, not offset.
+        """
+        start, stop = 0, len(self.ids)
+        if prefix:
+            start = int(np.searchsorted(self.ids, prefix, side='left'))
+            stop = int(np.searchsorted(self.ids, prefix + '\uffff', side='left'))
+        if cursor:
+            start = max(start, int(np.searchsorted(self.ids, cursor, side='right')))
+
+        filters = []
+        for values, codes, wanted in ((self.segment_values, self.segment_codes, segment),
+                                      (self.country_values, self.country_codes, country)):
+            if wanted:
+                code = self._code_for(values, wanted)
+                if code is None:
+                    return [], None
+                filters.append((codes, code))
+        if risk:
+            filters.append((self.risk_codes, RISK_LEVELS.index(risk)))
+
+        positions = []
+        # Scan forward in growing blocks until the page is full (+1 to know if more exist)
+        block = max(limit * 4, 256)
+        pos = start
+        while pos < stop and len(positions) <= limit:
+            end = min(pos + block, stop)
+            mask = np.ones(end - pos, dtype=bool)
+            for codes, code in filters:
+                mask &= codes[pos:end] == code
+            positions.extend((np.flatnonzero(mask) + pos).tolist())
+            pos = end
+            block *= 2
+
+        has_more = len(positions) > limit
+        positions = positions[:limit]
+        rows = [self._row(p) for p in positions]
+        next_cursor = rows[-1]['customer_id'] if has_more and rows else None
+        return rows, next_cursor
+
+    def _row(self, pos):
+        seg = self.segment_codes[pos]
+        cty = self.country_codes[pos]
+        return {
+            'customer_id': str(self.ids[pos]),
+            'name': str(self.names[pos]),
+            'segment': str(self.segment_values[seg]) if seg >= 0 else None,
+            'country': str(self.country_values[cty]) if cty >= 0 else None,
+            'risk_segment': RISK_LEVELS[self.risk_codes[pos]] if self.risk_codes[pos] else None,
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 
@@ -34,6 +34,12 @@ class Transaction(Base):
     
     customer = relationship("Customer", back_populates="transactions")
 
+    # Per-customer history and date-window queries (recency, 30d frequency)
+    __table_args__ = (
+        Index("ix_transactions_customer_id_order_date", "customer_id", "order_date"),
+        Index("ix_transactions_order_date", "order_date"),
+    )
+
 class MarketingInteraction(Base):
     """
     Stores the AI-generated content sent to users. 
@@ -51,7 +57,14 @@ class MarketingInteraction(Base):
     ai_generated_subject = Column(String)
     ai_generated_body = Column(Text)
     ai_explanation_reasoning = Column(Text) # Chain of thought
+    # Fallback template copy variant (A/B test, see campaign_templates.py); NULL for LLM-written copy
+    template_variant = Column(String, nullable=True)
+    discount_code = Column(String, nullable=True)
     
     created_at = Column(DateTime, default=datetime.utcnow)
     
     customer = relationship("Customer", back_populates="interactions")
+
+    __table_args__ = (
+        Index("ix_marketing_interactions_customer_id_created_at", "customer_id", "created_at"),
+    )
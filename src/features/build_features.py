@@ -54,6 +54,10 @@ def build_features(customers, transactions, events, reference_date_str='2024-07-
     features = features.merge(diversity, on='customer_id', how='left')
     features = features.merge(login_count, on='customer_id', how='left')
     
+    return fill_and_label(features)
+
+def fill_and_label(features):
+    """Fills missing aggregates and adds the churn label. Shared with sql_features.py."""
     # Fill NaNs
     features['recency_days'] = features['recency_days'].fillna(999) # Never purchased
     features['frequency_total'] = features['frequency_total'].fillna(0)
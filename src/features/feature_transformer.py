@@ -0,0 +1,116 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+NUMERIC_FEATURES = ['age', 'recency_days', 'frequency_total', 'frequency_30d', 'avg_order_value',
+                    'category_diversity', 'login_count_14d']
+CATEGORICAL_FEATURE = 'country'
+FORMAT_VERSION = 1
+
+
+def transformer_path_for(model_path):
+    """churn_model.pkl -> churn_model.features.json (the transformer lives next to its model)."""
+    return os.path.splitext(model_path)[0] + '.features.json'
+
+
+class ChurnFeatureTransformer:
+    """
+    Fitted encoder from build_features() rows to the churn model's input matrix.
+
+    The column order and the country -> one-hot index table are frozen at fit
+    time and saved next to the model, so training, single scoring and batch
+    scoring all go through the same encode(). Countries not seen during
+    training encode to all zeros instead of silently shifting columns.
+    """
+
+    def __init__(self, numeric_features, categories):
+        self.numeric_features = list(numeric_features)
+        self.categories = list(categories)
+        self.category_index = {c: i for i, c in enumerate(self.categories)}
+        self.feature_names = (self.numeric_features
+                              + [f"{CATEGORICAL_FEATURE}_{c}" for c in self.categories])
+        self._offset = len(self.numeric_features)
+
+    @classmethod
+    def fit(cls, data, numeric_features=None):
+        """Learns the categorical vocabulary from a training frame."""
+        numeric = numeric_features or [c for c in NUMERIC_FEATURES if c in data.columns]
+        categories = sorted(data[CATEGORICAL_FEATURE].dropna().astype(str).unique())
+        return cls(numeric, categories)
+
+    @classmethod
+    def from_feature_names(cls, feature_names):
+        """Rebuilds the transformer of a model trained before transformers were saved."""
+        prefix = f"{CATEGORICAL_FEATURE}_"
+        return cls([f for f in feature_names if not f.startswith(prefix)],
+                   [f[len(prefix):] for f in feature_names if f.startswith(prefix)])
+
+    def __len__(self):
+        return len(self.feature_names)
+
+    def _check_columns(self, columns):
+        missing = [c for c in self.numeric_features if c not in columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {missing}")
+
+    def encode(self, rows):
+        """Feature dicts -> float32 matrix in the frozen column order."""
+        if rows:
+            self._check_columns(rows[0])
+        X = np.zeros((len(rows), len(self)), dtype=np.float32)
+        numeric = np.array([[row[c] for c in self.numeric_features] for row in rows], dtype=np.float32)
+        X[:, :self._offset] = numeric.reshape(len(rows), self._offset)
+        codes = np.fromiter((self.category_index.get(row.get(CATEGORICAL_FEATURE), -1) for row in rows),
+                            dtype=np.int64, count=len(rows))
+        known = np.flatnonzero(codes >= 0)
+        X[known, self._offset + codes[known]] = 1.0
+        return X
+
+    def encode_frame(self, data):
+        """Same encoding for a DataFrame (training, chunked and batch paths)."""
+        self._check_columns(data.columns)
+        X = np.zeros((len(data), len(self)), dtype=np.float32)
+        X[:, :self._offset] = data[self.numeric_features].to_numpy(np.float32)
+        codes = pd.Categorical(data[CATEGORICAL_FEATURE], categories=self.categories).codes
+        known = np.flatnonzero(codes >= 0)
+        X[known, self._offset + codes[known]] = 1.0
+        return X
+
+    def unknown_categories(self, values):
+        return sorted({v for v in values if v is not None and v not in self.category_index})
+
+    def to_dict(self):
+        return {'version': FORMAT_VERSION, 'numeric_features': self.numeric_features,
+                'categorical_feature': CATEGORICAL_FEATURE, 'categories': self.categories,
+                'feature_names': self.feature_names}
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            spec = json.load(f)
+        if spec.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported feature transformer version: {spec.get('version')}")
+        transformer = cls(spec['numeric_features'], spec['categories'])
+        if transformer.feature_names != spec['feature_names']:
+            raise ValueError("Feature transformer column order does not match its saved feature names")
+        return transformer
+
+    @classmethod
+    def load_for_model(cls, model_path, model=None):
+        """Transformer saved next to `model_path`, else derived from the model's own feature names."""
+        path = transformer_path_for(model_path)
+        if os.path.exists(path):
+            return cls.load(path)
+        if model is not None:
+            names = model.get_booster().feature_names
+            if names:
+                return cls.from_feature_names(names)
+        raise FileNotFoundError(f"No feature transformer found at {path}")
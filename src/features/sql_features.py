@@ -0,0 +1,65 @@
+import pandas as pd
+from sqlalchemy import select, func, case, distinct
+
+from src.data.models import Customer, Transaction
+from src.features.build_features import fill_and_label
+
+
+def transaction_aggregates_query(reference_date, customer_ids=None):
+    """
+    One row per customer with recency/frequency/AOV aggregates computed in the
+    database. Served by ix_transactions_customer_id_order_date, so a subset of
+    customers only touches their own index range.
+    """
+    last_30d = reference_date - pd.Timedelta(days=30)
+    query = (
+        select(
+            Transaction.customer_id.label('customer_id'),
+            func.max(Transaction.order_date).label('last_order_date'),
+            func.count(Transaction.id).label('frequency_total'),
+            func.sum(case((Transaction.order_date >= last_30d.to_pydatetime(), 1), else_=0)).label('frequency_30d'),
+            func.avg(Transaction.amount).label('avg_order_value'),
+            func.count(distinct(Transaction.category)).label('category_diversity'),
+        )
+        .group_by(Transaction.customer_id)
+    )
+    if customer_ids is not None:
+        query = query.where(Transaction.customer_id.in_(list(customer_ids)))
+    return query
+
+
+def build_features_sql(engine, events=None, reference_date_str='2024-07-01', customer_ids=None):
+    """
+    SQL-side equivalent of build_features(): only the per-customer aggregate rows
+    leave the database instead of the whole transactions table.
+    Logins are not stored in the DB yet, so login_count_14d comes from `events` if given.
+    """
+    reference_date = pd.to_datetime(reference_date_str)
+
+    customer_query = select(Customer.customer_id, Customer.age, Customer.country)
+    if customer_ids is not None:
+        customer_query = customer_query.where(Customer.customer_id.in_(list(customer_ids)))
+
+    with engine.connect() as conn:
+        customers = pd.read_sql(customer_query, conn)
+        aggregates = pd.read_sql(transaction_aggregates_query(reference_date, customer_ids), conn)
+
+    aggregates['last_order_date'] = pd.to_datetime(aggregates['last_order_date'])
+    aggregates['recency_days'] = (reference_date - aggregates['last_order_date']).dt.days
+    aggregates = aggregates.drop(columns=['last_order_date'])
+    aggregates['frequency_30d'] = aggregates['frequency_30d'].astype(float)
+
+    features = customers.merge(aggregates, on='customer_id', how='left')
+
+    if events is not None and len(events):
+        last_14d = reference_date - pd.Timedelta(days=14)
+        event_dates = pd.to_datetime(events['event_date'])
+        logins = events[(events['event_type'] == 'login') & (event_dates >= last_14d)]
+        login_count = logins.groupby('customer_id').size().rename('login_count_14d')
+        features = features.merge(login_count, left_on='customer_id', right_index=True, how='left')
+    else:
+        features['login_count_14d'] = 0
+
+    features = features[['customer_id', 'age', 'country', 'recency_days', 'frequency_total', 'frequency_30d',
+                         'avg_order_value', 'category_diversity', 'login_count_14d']].copy()
+    return fill_and_label(features)
@@ -0,0 +1,191 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+
+import pandas as pd
+
+# Window lengths mirror build_features.py so streaming and batch features agree
+FREQUENCY_WINDOW_DAYS = 30
+LOGIN_WINDOW_DAYS = 14
+NEVER_PURCHASED_RECENCY = 999
+
+
+def to_naive_utc(ts):
+    """
+    Event time(s) as naive UTC pd.Timestamp / datetime Series. Offset-aware input
+    (e.g. ISO strings ending in "Z") is converted; naive input is taken as UTC,
+    matching the raw data and the store's reference date.
+    """
+    ts = pd.to_datetime(ts, utc=True, format='ISO8601')
+    return ts.dt.tz_localize(None) if isinstance(ts, pd.Series) else ts.tz_localize(None)
+
+
+class CustomerAggregate:
+    """Rolling per-customer state needed to rebuild one churn feature row."""
+
+    __slots__ = ('age', 'country', 'order_count', 'amount_sum', 'categories',
+                 'last_purchase', 'order_times', 'login_times')
+
+    def __init__(self, age=None, country=None):
+        self.age = age
+        self.country = country
+        self.order_count = 0
+        self.amount_sum = 0.0
+        self.categories = Counter()
+        self.last_purchase = None
+        # Sorted event timestamps still inside their sliding window
+        self.order_times = []
+        self.login_times = []
+
+
+class RollingFeatureStore:
+    """
+    In-memory feature store fed by raw events.
+    Keeps all-time aggregates plus sliding 14/30-day windows per customer and
+    expires window entries as the event-time watermark advances.
+    """
+
+    def __init__(self, reference_date=None):
+        self._lock = threading.RLock()
+        self._customers = {}
+        # (expiry_time, customer_id) - lets us find customers whose windows change
+        # when time moves forward without scanning every customer
+        self._expiry_heap = []
+        self.reference_date = pd.Timestamp(reference_date).normalize() if reference_date is not None else None
+
+    @classmethod
+    def from_frames(cls, customers, transactions, events, reference_date_str='2024-07-01'):
+        """Bootstraps the store from the same raw frames build_features() uses."""
+        store = cls(reference_date=reference_date_str)
+        for row in customers[['customer_id', 'age', 'country']].itertuples(index=False):
+            store.register_customer(row.customer_id, age=row.age, country=row.country)
+
+        tx = transactions.copy()
+        tx['order_date'] = pd.to_datetime(tx['order_date'])
+        has_category = 'category' in tx.columns
+        for row in tx.itertuples(index=False):
+            store._apply_transaction(row.customer_id, row.order_date, row.amount,
+                                     row.category if has_category else None)
+
+        ev = events[events['event_type'] == 'login'].copy()
+        ev['event_date'] = pd.to_datetime(ev['event_date'])
+        for row in ev.itertuples(index=False):
+            store._apply_login(row.customer_id, row.event_date)
+
+        store._expire()
+        return store
+
+    def register_customer(self, customer_id, age=None, country=None):
+        with self._lock:
+            agg = self._customers.get(customer_id)
+            if agg is None:
+                agg = self._customers[customer_id] = CustomerAggregate(age, country)
+            else:
+                agg.age = age if age is not None else agg.age
+                agg.country = country if country is not None else agg.country
+            return agg
+
+    def apply_events(self, events):
+        """
+        Applies a batch of event dicts and returns (affected_customer_ids, day_rolled).
+        Affected customers are those with new events plus those whose windows expired.
+        day_rolled is True when the watermark crossed a day boundary, which shifts
+        recency_days for every customer.
+        """
+        affected = set()
+        with self._lock:
+            previous_reference = self.reference_date
+            for event in events:
+                customer_id = event['customer_id']
+                event_type = event['event_type']
+                ts = to_naive_utc(event['timestamp'])
+                if event_type == 'transaction':
+                    self._apply_transaction(customer_id, ts, float(event.get('amount') or 0.0),
+                                            event.get('category'))
+                elif event_type == 'login':
+                    self._apply_login(customer_id, ts)
+                else:
+                    # Interactions do not feed churn features; they are routed to recsys listeners
+                    continue
+                affected.add(customer_id)
+            affected |= self._expire()
+            day_rolled = previous_reference is not None and self.reference_date != previous_reference
+        return affected, day_rolled
+
+    def _advance(self, ts):
+        day = ts.normalize()
+        if self.reference_date is None or day > self.reference_date:
+            self.reference_date = day
+
+    def _apply_transaction(self, customer_id, ts, amount, category=None):
+        agg = self._customers.get(customer_id) or self.register_customer(customer_id)
+        self._advance(ts)
+        agg.order_count += 1
+        agg.amount_sum += amount
+        if category is not None:
+            agg.categories[category] += 1
+        if agg.last_purchase is None or ts > agg.last_purchase:
+            agg.last_purchase = ts
+        insort(agg.order_times, ts)
+        heapq.heappush(self._expiry_heap, (ts + pd.Timedelta(days=FREQUENCY_WINDOW_DAYS), customer_id))
+
+    def _apply_login(self, customer_id, ts):
+        agg = self._customers.get(customer_id) or self.register_customer(customer_id)
+        self._advance(ts)
+        insort(agg.login_times, ts)
+        heapq.heappush(self._expiry_heap, (ts + pd.Timedelta(days=LOGIN_WINDOW_DAYS), customer_id))
+
+    def _expire(self):
+        """Drops window entries older than the watermark and returns the customers touched."""
+        if self.reference_date is None:
+            return set()
+        expired = set()
+        # An entry with timestamp t is inside the window while t >= reference - window,
+        # i.e. it leaves once t + window < reference
+        while self._expiry_heap and self._expiry_heap[0][0] < self.reference_date:
+            _, customer_id = heapq.heappop(self._expiry_heap)
+            expired.add(customer_id)
+        for customer_id in expired:
+            agg = self._customers[customer_id]
+            self._trim(agg.order_times, FREQUENCY_WINDOW_DAYS)
+            self._trim(agg.login_times, LOGIN_WINDOW_DAYS)
+        return expired
+
+    def _trim(self, times, window_days):
+        cutoff = self.reference_date - pd.Timedelta(days=window_days)
+        del times[:bisect_left(times, cutoff)]
+
+    def feature_row(self, customer_id):
+        """Returns the build_features()-compatible feature dict for one customer."""
+        with self._lock:
+            agg = self._customers.get(customer_id)
+            if agg is None:
+                return None
+            return self._row(customer_id, agg)
+
+    def feature_rows(self, customer_ids=None):
+        with self._lock:
+            ids = self._customers.keys() if customer_ids is None else customer_ids
+            return [self._row(cid, self._customers[cid]) for cid in ids if cid in self._customers]
+
+    def _row(self, customer_id, agg):
+        if agg.last_purchase is None:
+            recency = NEVER_PURCHASED_RECENCY
+        else:
+            recency = (self.reference_date - agg.last_purchase.normalize()).days
+        return {
+            'customer_id': customer_id,
+            'age': agg.age if agg.age is not None else 30,
+            'country': agg.country,
+            'recency_days': recency,
+            'frequency_total': agg.order_count,
+            'frequency_30d': len(agg.order_times),
+            'avg_order_value': agg.amount_sum / agg.order_count if agg.order_count else 0.0,
+            'category_diversity': len(agg.categories),
+            'login_count_14d': len(agg.login_times),
+        }
+
+    def customer_ids(self):
+        with self._lock:
+            return list(self._customers.keys())
@@ -0,0 +1,123 @@
+import threading
+
+import numpy as np
+
+from src.models.item_catalogue import ItemCatalogue
+
+
+class CatalogueSnapshot:
+    """
+    Immutable view of the catalogue at one version. Readers grab
+    `store.snapshot` once per request and use only that object, so a
+    concurrent upsert/delete can never mix rows from two versions.
+    """
+
+    __slots__ = ('catalogue', 'embeddings', 'alive', 'version')
+
+    def __init__(self, catalogue, embeddings, alive, version):
+        self.catalogue = catalogue
+        self.embeddings = embeddings
+        self.alive = alive
+        self.version = version
+
+    def __len__(self):
+        return len(self.catalogue)
+
+    @property
+    def live_count(self):
+        return int(self.alive.sum())
+
+
+class CatalogueStore:
+    """
+    Mutable catalogue + embedding matrix with copy-on-write snapshots.
+
+    Upserts embed only the changed items and append them to an over-allocated
+    embedding buffer; rows already visible to older snapshots are never
+    written. Replaced and deleted rows are tombstoned in the `alive` mask and
+    physically dropped by compact() once they exceed `compact_ratio`.
+    """
+
+    def __init__(self, catalogue, embeddings, encoder=None, compact_ratio=0.2):
+        self.encoder = encoder
+        self.compact_ratio = compact_ratio
+        self._write_lock = threading.Lock()
+        n = len(catalogue)
+        # The initial matrix is used as-is (it may be a read-only memmap shared between
+        # processes); the first upsert grows into a private buffer instead of writing to it
+        self._buffer = embeddings
+        self.snapshot = CatalogueSnapshot(catalogue, embeddings, np.ones(n, dtype=bool), 0)
+
+    def _ensure_capacity(self, needed):
+        if needed <= len(self._buffer):
+            return
+        # Old snapshots keep a reference to the previous buffer, so growing is safe
+        grown = np.empty((max(needed, 2 * len(self._buffer)), self._buffer.shape[1]), dtype=np.float32)
+        grown[:len(self.snapshot)] = self._buffer[:len(self.snapshot)]
+        self._buffer = grown
+
+    def upsert(self, items):
+        """Adds or replaces items (dicts accepted by ItemCatalogue.from_records)."""
+        if not items:
+            return self.snapshot
+        # Last write wins for duplicate ids inside one batch
+        items = list({it['item_id']: it for it in items}.values())
+        new_rows = ItemCatalogue.from_records(items)
+        # Encode outside the lock - it is the slow part and touches no shared state
+        new_embeddings = self.encoder.encode(new_rows.texts())
+
+        with self._write_lock:
+            current = self.snapshot
+            n, m = len(current), len(new_rows)
+            alive = np.concatenate([current.alive, np.ones(m, dtype=bool)])
+            alive[current.catalogue.indices_for([it['item_id'] for it in items])] = False
+
+            self._ensure_capacity(n + m)
+            self._buffer[n:n + m] = new_embeddings
+            catalogue = current.catalogue.concat(new_rows, alive=alive)
+            self.snapshot = CatalogueSnapshot(catalogue, self._buffer[:n + m], alive, current.version + 1)
+            self._maybe_compact()
+        return self.snapshot
+
+    def delete(self, item_ids):
+        """Tombstones items; returns the number of rows removed."""
+        with self._write_lock:
+            current = self.snapshot
+            rows = current.catalogue.indices_for(item_ids)
+            if not len(rows):
+                return 0
+            alive = current.alive.copy()
+            alive[rows] = False
+            self.snapshot = CatalogueSnapshot(current.catalogue.reindexed(alive), current.embeddings,
+                                              alive, current.version + 1)
+            self._maybe_compact()
+            return len(rows)
+
+    def _maybe_compact(self):
+        dead = len(self.snapshot) - self.snapshot.live_count
+        if dead and dead >= self.compact_ratio * len(self.snapshot):
+            self._compact()
+
+    def compact(self):
+        with self._write_lock:
+            self._compact()
+        return self.snapshot
+
+    def _compact(self):
+        current = self.snapshot
+        keep = np.flatnonzero(current.alive)
+        embeddings = current.embeddings[keep]
+        self._buffer = np.empty((max(len(keep) * 2, 16), embeddings.shape[1]), dtype=np.float32)
+        self._buffer[:len(keep)] = embeddings
+        self.snapshot = CatalogueSnapshot(current.catalogue.take(keep), self._buffer[:len(keep)],
+                                          np.ones(len(keep), dtype=bool), current.version + 1)
+
+    def stats(self):
+        snap = self.snapshot
+        return {
+            'version': snap.version,
+            'rows': len(snap),
+            'live_items': snap.live_count,
+            'tombstones': len(snap) - snap.live_count,
+            'capacity': len(self._buffer),
+        }
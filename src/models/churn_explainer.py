@@ -0,0 +1,108 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import shap
+
+from src.features.feature_transformer import CATEGORICAL_FEATURE
+
+
+def model_version(model):
+    """Content hash of the booster, so a retrained model never reuses old explanations."""
+    return hashlib.sha1(bytes(model.get_booster().save_raw())).hexdigest()[:12]
+
+
+class ChurnExplainer:
+    """
+    TreeSHAP explanations for the churn model.
+
+    The TreeExplainer is built once per model version (a new model means a new
+    ChurnExplainer). Batches are encoded with the shared feature transformer and
+    explained in one vectorized shap call; the country one-hot columns are summed
+    back into a single 'country' driver. Explanations are cached per customer
+    together with a fingerprint of the encoded feature row, so a cached entry is
+    only served while the customer's features are unchanged.
+    """
+
+    def __init__(self, model, transformer, cache_size=100_000, chunk_size=10_000):
+        self.transformer = transformer
+        self.version = model_version(model)
+        self.explainer = shap.TreeExplainer(model)
+        self.base_value = float(np.ravel(self.explainer.expected_value)[0])
+        self.cache_size = cache_size
+        self.chunk_size = chunk_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+        # Encoded columns -> reported drivers (numeric features + one 'country')
+        n_numeric = len(transformer.numeric_features)
+        self.drivers = transformer.numeric_features + [CATEGORICAL_FEATURE]
+        self._grouping = np.zeros((len(transformer), len(self.drivers)), dtype=np.float32)
+        self._grouping[np.arange(n_numeric), np.arange(n_numeric)] = 1.0
+        self._grouping[n_numeric:, n_numeric] = 1.0
+
+    def _compute(self, X):
+        contributions = []
+        for start in range(0, len(X), self.chunk_size):
+            values = self.explainer.shap_values(X[start:start + self.chunk_size])
+            contributions.append(np.asarray(values, dtype=np.float32).reshape(-1, X.shape[1]))
+        return np.concatenate(contributions) @ self._grouping
+
+    def explain(self, rows, top_n=None):
+        """
+        Explains build_features()-style rows (dicts with customer_id). Returns one dict
+        per row with the churn probability, base value (log-odds) and drivers ordered
+        by absolute SHAP contribution.
+        """
+        if not rows:
+            return []
+        X = self.transformer.encode(rows)
+        fingerprints = [hashlib.blake2b(x.tobytes(), digest_size=8).digest() for x in X]
+
+        results = [None] * len(rows)
+        with self._lock:
+            for i, row in enumerate(rows):
+                cached = self._cache.get(row['customer_id'])
+                if cached is not None and cached[0] == fingerprints[i]:
+                    self._cache.move_to_end(row['customer_id'])
+                    results[i] = cached[1]
+            missing = [i for i, r in enumerate(results) if r is None]
+            self.stats['hits'] += len(rows) - len(missing)
+            self.stats['misses'] += len(missing)
+
+        if missing:
+            grouped = self._compute(X[missing])
+            logits = self.base_value + grouped.sum(axis=1)
+            probs = 1 / (1 + np.exp(-logits))
+            order = np.argsort(-np.abs(grouped), axis=1, kind='stable')
+            with self._lock:
+                for j, i in enumerate(missing):
+                    row = rows[i]
+                    explanation = {
+                        'churn_probability': float(probs[j]),
+                        'base_value': self.base_value,
+                        'drivers': [{'feature': self.drivers[k], 'value': row.get(self.drivers[k]),
+                                     'shap': float(grouped[j, k])} for k in order[j]],
+                    }
+                    results[i] = explanation
+                    self._cache[row['customer_id']] = (fingerprints[i], explanation)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return [{'customer_id': row['customer_id'], 'model_version': self.version, **res,
+                 'drivers': res['drivers'][:top_n] if top_n else res['drivers']}
+                for row, res in zip(rows, results)]
+
+    def invalidate(self, customer_ids=None):
+        with self._lock:
+            if customer_ids is None:
+                self._cache.clear()
+            else:
+                for cid in customer_ids:
+                    self._cache.pop(cid, None)
+
+    def cache_info(self):
+        with self._lock:
+            return {'model_version': self.version, 'cached': len(self._cache), **self.stats}
@@ -0,0 +1,95 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+from src.models.popularity import ACTION_WEIGHTS, DEFAULT_ACTION_WEIGHT
+
+
+def _top_m_per_row(block, m):
+    """Keeps the m largest entries of every row of a CSR block (vectorized, no per-row loop)."""
+    block = block.tocsr()
+    block.sum_duplicates()
+    counts = np.diff(block.indptr)
+    rows = np.repeat(np.arange(block.shape[0]), counts)
+    order = np.lexsort((-block.data, rows))
+    rank = np.arange(len(order)) - np.repeat(block.indptr[:-1], counts)
+    keep = order[rank < m]
+    return sp.csr_matrix((block.data[keep], (rows[keep], block.indices[keep])), shape=block.shape)
+
+
+class ItemCooccurrenceModel:
+    """
+    Item-item collaborative filtering on a sparse customer x item matrix.
+
+    Similarity is cosine over action-weighted co-occurrence, computed in row
+    blocks of R^T R so the dense n_items^2 matrix never exists; each block is
+    pruned to its `neighbours` strongest items straight away. Peak memory is
+    O(nnz(R) + block_size * n_items) and the model is O(n_items * neighbours).
+    Blocks run on a thread pool - scipy's sparse kernels release the GIL.
+    """
+
+    def __init__(self, neighbours=50, block_size=2048, workers=None):
+        self.neighbours = neighbours
+        self.block_size = block_size
+        self.workers = workers or os.cpu_count()
+        self.item_ids = np.empty(0, dtype=object)
+        self._item_index = {}
+        self.similarity = sp.csr_matrix((0, 0), dtype=np.float32)
+
+    @classmethod
+    def from_interactions(cls, interactions, **kwargs):
+        model = cls(**kwargs)
+        model.fit(interactions)
+        return model
+
+    def fit(self, interactions):
+        """Trains on an interactions.csv-shaped frame (customer_id, item_id, action)."""
+        users, user_codes = np.unique(interactions['customer_id'].to_numpy(str), return_inverse=True)
+        items, item_codes = np.unique(interactions['item_id'].to_numpy(str), return_inverse=True)
+        weights = (interactions['action'].map(ACTION_WEIGHTS).fillna(DEFAULT_ACTION_WEIGHT)
+                   .to_numpy(np.float32))
+        # Repeated (customer, item) pairs are summed by the COO -> CSC conversion
+        R = sp.coo_matrix((weights, (user_codes, item_codes)), shape=(len(users), len(items))).tocsc()
+        norms = np.sqrt(np.asarray(R.multiply(R).sum(axis=0)).ravel())
+        R = (R @ sp.diags(1 / np.maximum(norms, 1e-12))).astype(np.float32)
+        Rt = R.T.tocsr()
+        R = R.tocsr()
+
+        def block(start):
+            sims = (Rt[start:start + self.block_size] @ R).tocsr()
+            # Drop self-similarity (block row i is item start + i)
+            rows = np.repeat(np.arange(sims.shape[0]), np.diff(sims.indptr))
+            sims.data[sims.indices == rows + start] = 0
+            sims.eliminate_zeros()
+            return _top_m_per_row(sims, self.neighbours)
+
+        starts = range(0, len(items), self.block_size)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            blocks = list(pool.map(block, starts))
+
+        self.item_ids = items
+        self._item_index = {item_id: i for i, item_id in enumerate(items)}
+        self.similarity = sp.vstack(blocks, format='csr') if blocks else sp.csr_matrix((0, 0), dtype=np.float32)
+        return self
+
+    def score(self, history_ids, history_weights=None):
+        """
+        Returns (item_ids, scores) for every item co-occurring with the history,
+        scores normalized to [0, 1]. Items the model has never seen are ignored.
+        """
+        rows = [self._item_index[i] for i in history_ids if i in self._item_index]
+        if not rows:
+            return self.item_ids[:0], np.empty(0, dtype=np.float32)
+        weights = np.ones(len(rows), dtype=np.float32) if history_weights is None else history_weights
+        profile = sp.csr_matrix((weights, (np.zeros(len(rows), dtype=np.int64), rows)),
+                                shape=(1, len(self.item_ids)))
+        scores = (profile @ self.similarity).tocsr()
+        if not scores.nnz:
+            return self.item_ids[:0], np.empty(0, dtype=np.float32)
+        values = scores.data / scores.data.max()
+        return self.item_ids[scores.indices], values.astype(np.float32)
+
+    def nbytes(self):
+        return self.similarity.data.nbytes + self.similarity.indices.nbytes + self.similarity.indptr.nbytes
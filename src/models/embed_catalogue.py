@@ -0,0 +1,214 @@
+"""
+Catalogue embedding job.
+
+Encodes every item text with a pool of worker processes (one torch or ONNX
+model copy per process, intra-op threads pinned per worker), batching texts of
+similar length together to cut padding waste. Embeddings are written as shards under
+data/processed/embeddings/ and the job resumes from the shards already on disk.
+
+    python -m src.models.embed_catalogue --workers 4 --threads-per-worker 2 --batch-size 128
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.models.embedding_backends import DEFAULT_MODEL
+from src.models.item_catalogue import ItemCatalogue
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+DEFAULT_OUTPUT_DIR = os.path.join(BASE_DIR, 'data', 'processed', 'embeddings')
+
+# Per-process model, created once by the pool initializer
+_worker_model = None
+
+
+def texts_fingerprint(texts, model_name):
+    h = hashlib.sha1(model_name.encode('utf-8'))
+    for t in texts:
+        h.update(t.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def load_catalogue(raw_dir=None):
+    raw_dir = raw_dir or os.path.join(BASE_DIR, 'data', 'raw')
+    products = pd.read_csv(os.path.join(raw_dir, 'products.csv'))
+    content = pd.read_csv(os.path.join(raw_dir, 'content.csv'))
+    return ItemCatalogue.from_frames(products, content)
+
+
+def plan_shards(texts, shard_size):
+    """Sorts rows by text length so each shard (and batch) holds similar lengths."""
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    order = np.argsort(lengths, kind='stable')
+    return [order[i:i + shard_size] for i in range(0, len(order), shard_size)]
+
+
+def _init_worker(backend, model_name, threads):
+    global _worker_model
+    from src.models.embedding_backends import get_embedding_backend
+
+    try:
+        _worker_model = get_embedding_backend(backend, model_name, threads=threads)
+    except Exception as e:
+        # An initializer that raises makes Pool respawn the worker forever; fail the shards instead
+        _worker_model = e
+
+
+def _encode_shard(task):
+    shard_id, indices, texts, batch_size, output_dir = task
+    if isinstance(_worker_model, Exception):
+        raise RuntimeError(f"Embedding model failed to load: {_worker_model}")
+    start = time.perf_counter()
+    emb = _worker_model.encode(texts, batch_size=batch_size)
+    _write_shard(output_dir, shard_id, indices, emb)
+    return shard_id, len(texts), time.perf_counter() - start
+
+
+def _shard_path(output_dir, shard_id):
+    return os.path.join(output_dir, f"shard_{shard_id:05d}.npz")
+
+
+def _write_shard(output_dir, shard_id, indices, embeddings):
+    # Write-then-rename so an interrupted job never leaves a half-written shard
+    final_path = _shard_path(output_dir, shard_id)
+    tmp_path = final_path + '.tmp.npz'
+    np.savez(tmp_path, indices=indices, embeddings=embeddings)
+    os.replace(tmp_path, final_path)
+
+
+def _prepare_output(output_dir, manifest):
+    """Keeps existing shards only if they were produced for the same texts/model/backend/sharding."""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+        if all(previous.get(k) == manifest[k] for k in ('fingerprint', 'model', 'backend', 'shard_size')):
+            return
+        print("Catalogue, model or backend changed - discarding previous shards.")
+        # Consolidated matrices (see load_embeddings) were assembled from the old shards
+        for name in os.listdir(output_dir):
+            if name.startswith('shard_') or (name.startswith('embeddings_') and name.endswith('.npy')):
+                os.remove(os.path.join(output_dir, name))
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def run_embedding_job(catalogue=None, output_dir=DEFAULT_OUTPUT_DIR, model_name=DEFAULT_MODEL,
+                      backend='torch', workers=None, threads_per_worker=1, batch_size=128, shard_size=4096):
+    catalogue = catalogue or load_catalogue()
+    texts = catalogue.texts()
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+    manifest = {
+        'model': model_name,
+        # Vectors from different backends (fp32 torch vs int8 ONNX) must not be mixed
+        'backend': backend,
+        'fingerprint': texts_fingerprint(texts, model_name),
+        'n_items': len(texts),
+        'shard_size': shard_size,
+    }
+    _prepare_output(output_dir, manifest)
+
+    shards = plan_shards(texts, shard_size)
+    pending = [
+        (shard_id, indices, [texts[i] for i in indices], batch_size, output_dir)
+        for shard_id, indices in enumerate(shards)
+        if not os.path.exists(_shard_path(output_dir, shard_id))
+    ]
+    print(f"{len(shards)} shards total, {len(shards) - len(pending)} already done, "
+          f"{len(pending)} to encode with {workers} workers x {threads_per_worker} threads.")
+
+    encoded = 0
+    start = time.perf_counter()
+    if pending:
+        ctx = mp.get_context('spawn')
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(backend, model_name, threads_per_worker)) as pool:
+            for shard_id, n, seconds in pool.imap_unordered(_encode_shard, pending):
+                encoded += n
+                print(f"  shard {shard_id:05d}: {n} items in {seconds:.1f}s")
+    wall = time.perf_counter() - start
+
+    cores = workers * threads_per_worker
+    stats = {
+        'items_encoded': encoded,
+        'wall_seconds': wall,
+        'items_per_sec': encoded / wall if wall > 0 else 0.0,
+        'items_per_sec_per_core': encoded / wall / cores if wall > 0 else 0.0,
+        'cores': cores,
+    }
+    print(f"Encoded {encoded} items in {wall:.1f}s - {stats['items_per_sec']:.0f} items/s, "
+          f"{stats['items_per_sec_per_core']:.0f} items/s/core")
+    return stats
+
+
+def load_embeddings(output_dir=DEFAULT_OUTPUT_DIR, texts=None, model_name=DEFAULT_MODEL, mmap=False, backend=None):
+    """
+    Assembles shards into one (n_items, dim) float32 matrix in catalogue order.
+    Returns None if shards are missing or were built for different texts or,
+    when `backend` is given, by a different embedding backend.
+
+    With mmap=True the assembled matrix is written once to a consolidated .npy
+    and returned as a read-only memory map: the pages live in the OS page cache
+    and are shared by every process serving the same catalogue.
+    """
+    manifest_path = os.path.join(output_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if texts is not None and manifest['fingerprint'] != texts_fingerprint(texts, model_name):
+        return None
+    if backend is not None and manifest.get('backend') != backend:
+        return None
+
+    consolidated = os.path.join(output_dir, f"embeddings_{manifest.get('backend')}_{manifest['fingerprint'][:16]}.npy")
+    if mmap and os.path.exists(consolidated):
+        return np.load(consolidated, mmap_mode='r')
+
+    n_shards = -(-manifest['n_items'] // manifest['shard_size'])
+    matrix = None
+    for shard_id in range(n_shards):
+        path = _shard_path(output_dir, shard_id)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as shard:
+            if matrix is None:
+                matrix = np.empty((manifest['n_items'], shard['embeddings'].shape[1]), dtype=np.float32)
+            matrix[shard['indices']] = shard['embeddings']
+    if mmap:
+        try:
+            tmp_path = consolidated + '.tmp.npy'
+            np.save(tmp_path, matrix)
+            os.replace(tmp_path, consolidated)
+            return np.load(consolidated, mmap_mode='r')
+        except OSError as e:
+            print(f"Could not write {consolidated} ({e}); keeping embeddings in memory.")
+    return matrix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--backend', default='torch', choices=['torch', 'onnx', 'onnx-int8'])
+    parser.add_argument('--workers', type=int, default=None, help="Encode processes (default: cores / threads)")
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=128)
+    parser.add_argument('--shard-size', type=int, default=4096)
+    args = parser.parse_args()
+
+    run_embedding_job(output_dir=args.output_dir, model_name=args.model, backend=args.backend, workers=args.workers,
+                      threads_per_worker=args.threads_per_worker, batch_size=args.batch_size,
+                      shard_size=args.shard_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Sentence embedding backends.
+
+All backends return L2-normalized float32 NumPy arrays, so the engine can use
+plain dot products for cosine similarity regardless of backend.
+
+    torch      SentenceTransformer on PyTorch (reference implementation)
+    onnx       same model exported to ONNX, run with ONNX Runtime
+    onnx-int8  ONNX export with dynamic int8 weight quantization
+
+Select with PersonalizationEngine(embedding_backend=...) or EMBEDDING_BACKEND.
+"""
+import os
+
+import numpy as np
+
+DEFAULT_MODEL = 'all-MiniLM-L6-v2'
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+ONNX_CACHE_DIR = os.path.join(BASE_DIR, 'src', 'models', 'onnx')
+MAX_SEQ_LENGTH = 256
+
+
+def _normalize(x):
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return (x / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def _hf_name(model_name):
+    if os.path.isdir(model_name) or '/' in model_name:
+        return model_name
+    return f"sentence-transformers/{model_name}"
+
+
+class TorchEmbeddingBackend:
+    name = 'torch'
+
+    def __init__(self, model_name=DEFAULT_MODEL, threads=None):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name, device='cpu')
+
+    def encode(self, texts, batch_size=64):
+        emb = self.model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True,
+                                show_progress_bar=False)
+        return _normalize(emb)
+
+
+def export_onnx(model_name=DEFAULT_MODEL, output_dir=None, quantize=True):
+    """
+    Exports the transformer encoder to ONNX (+ an int8 dynamically quantized copy)
+    and saves tokenizer.json next to it. Only this step needs torch/transformers.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    output_dir = output_dir or os.path.join(ONNX_CACHE_DIR, os.path.basename(model_name.rstrip('/')))
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_path = os.path.join(output_dir, 'model.onnx')
+
+    tokenizer = AutoTokenizer.from_pretrained(_hf_name(model_name))
+    model = AutoModel.from_pretrained(_hf_name(model_name)).eval()
+    dummy = tokenizer(["export sample text"], return_tensors='pt')
+    input_names = [n for n in ('input_ids', 'attention_mask', 'token_type_ids') if n in dummy]
+    dynamic_axes = {n: {0: 'batch', 1: 'sequence'} for n in input_names + ['last_hidden_state']}
+
+    class _Encoder(torch.nn.Module):
+        # Positional-input wrapper; HF forward() signatures differ across versions
+        def __init__(self, hf_model):
+            super().__init__()
+            self.hf_model = hf_model
+
+        def forward(self, *inputs):
+            return self.hf_model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _Encoder(model), tuple(dummy[n] for n in input_names), fp32_path,
+            input_names=input_names, output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes, opset_version=17, dynamo=False,
+        )
+    tokenizer.save_pretrained(output_dir)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, os.path.join(output_dir, 'model.int8.onnx'), weight_type=QuantType.QInt8)
+    print(f"Exported {model_name} to {output_dir}")
+    return output_dir
+
+
+class OnnxEmbeddingBackend:
+    """
+    MiniLM on ONNX Runtime: tokenizers + one InferenceSession, mean pooling and
+    L2 normalization in NumPy. No torch import at serving time.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, quantized=False, threads=None, model_dir=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.name = 'onnx-int8' if quantized else 'onnx'
+        model_dir = model_dir or os.path.join(ONNX_CACHE_DIR, os.path.basename(model_name.rstrip('/')))
+        model_file = os.path.join(model_dir, 'model.int8.onnx' if quantized else 'model.onnx')
+        if not os.path.exists(model_file):
+            export_onnx(model_name, model_dir, quantize=quantized)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_file, options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {'input_ids': ids, 'attention_mask': mask}
+        if 'token_type_ids' in self.input_names:
+            feeds['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self.session.run(None, feeds)[0]
+        # Mean pooling over real tokens, as in the sentence-transformers config
+        weights = mask[..., None].astype(np.float32)
+        return (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+
+    def encode(self, texts, batch_size=64):
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        # Length-sorted batches keep padding small; results are put back in input order
+        order = np.argsort([len(t) for t in texts], kind='stable')
+        out = None
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            emb = self._encode_batch([texts[i] for i in idx])
+            if out is None:
+                out = np.empty((len(texts), emb.shape[1]), dtype=np.float32)
+            out[idx] = emb
+        return _normalize(out)
+
+
+def get_embedding_backend(name=None, model_name=DEFAULT_MODEL, threads=None):
+    name = name or os.getenv('EMBEDDING_BACKEND', 'torch')
+    if name == 'torch':
+        return TorchEmbeddingBackend(model_name, threads=threads)
+    if name == 'onnx':
+        return OnnxEmbeddingBackend(model_name, quantized=False, threads=threads)
+    if name == 'onnx-int8':
+        return OnnxEmbeddingBackend(model_name, quantized=True, threads=threads)
+    raise ValueError(f"Unknown embedding backend: {name}")
@@ -0,0 +1,168 @@
+"""
+Offline evaluation of the recommender on a temporal split of interactions.csv.
+
+Everything before the split timestamp is the training log the engine is fitted
+on; the items each customer touches afterwards are the ground truth. Quality
+metrics are computed on the (n_users, k) matrix returned by
+PersonalizationEngine.recommend_batch (same ranking as recommend_for_user,
+including the served MMR diversity), fully vectorized:
+
+    recall@k   hits / relevant items
+    ndcg@k     DCG of the hit positions / ideal DCG
+    coverage   distinct recommended items / live catalogue items
+
+Latency percentiles come from timing recommend_for_user on a sample of users,
+so every change to the online path can be checked against quality. The same
+sample checks that the batch path still ranks like the online path
+(`online_parity`: share of sampled users with identical lists).
+
+    python -m src.models.evaluate_recommendations --test-fraction 0.2 --k 10
+"""
+import argparse
+import copy
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def temporal_split(interactions, test_fraction=0.2):
+    """Splits at the timestamp quantile so the test set is the most recent `test_fraction`."""
+    ts = pd.to_datetime(interactions['timestamp'])
+    cutoff = ts.quantile(1 - test_fraction)
+    return interactions[ts < cutoff], interactions[ts >= cutoff], cutoff
+
+
+def relevance_keys(test, customer_ids, catalogue, exclude=None):
+    """
+    Ground truth as sorted int64 keys user_index * n_rows + catalogue_row, plus
+    the number of relevant items per user. `exclude` (same key encoding) drops
+    items the user already had in training, which the recommender never returns.
+    """
+    n_rows = len(catalogue)
+    user_codes = pd.Index(customer_ids).get_indexer(test['customer_id'].to_numpy(str))
+    rows, found = catalogue.indices_for(test['item_id'].to_numpy(str), return_mask=True)
+    user_codes = user_codes[found]
+    keep = user_codes >= 0
+    keys = np.unique(user_codes[keep].astype(np.int64) * n_rows + rows[keep])
+    if exclude is not None and len(exclude):
+        keys = keys[~np.isin(keys, exclude)]
+    n_relevant = np.bincount(keys // n_rows, minlength=len(customer_ids))
+    return keys, n_relevant
+
+
+def ranking_metrics(recommended, relevant_keys, n_relevant, n_rows, k):
+    """recall@k and ndcg@k per user from an (n_users, >=k) matrix of catalogue rows (-1 = empty slot)."""
+    recs = recommended[:, :k]
+    user_index = np.arange(len(recs), dtype=np.int64)[:, None]
+    hits = np.isin(user_index * n_rows + recs, relevant_keys) & (recs >= 0)
+
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = (hits * discounts).sum(axis=1)
+    ideal = np.concatenate([[0.0], np.cumsum(discounts)])[np.minimum(n_relevant, k)]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        recall = np.where(n_relevant > 0, hits.sum(axis=1) / n_relevant, np.nan)
+        ndcg = np.where(ideal > 0, dcg / ideal, np.nan)
+    return recall, ndcg
+
+
+def catalogue_coverage(recommended, alive):
+    rows = np.unique(recommended[recommended >= 0])
+    return len(rows) / max(int(alive.sum()), 1)
+
+
+def _sample(customer_ids, sample, seed):
+    rng = np.random.default_rng(seed)
+    return rng.choice(customer_ids, size=min(sample, len(customer_ids)), replace=False)
+
+
+def latency_percentiles(engine, customer_ids, top_k, diversity, sample=200, seed=0):
+    sample_ids = _sample(customer_ids, sample, seed)
+    engine.recommend_for_user(sample_ids[0], top_k, diversity=diversity)  # warm-up
+    times = []
+    for cid in sample_ids:
+        start = time.perf_counter()
+        engine.recommend_for_user(cid, top_k, diversity=diversity)
+        times.append((time.perf_counter() - start) * 1000)
+    return {f"p{p}_ms": float(np.percentile(times, p)) for p in (50, 90, 99)}
+
+
+def online_parity(engine, customer_ids, recommended, snapshot, top_k, diversity, sample=200, seed=0):
+    """
+    Share of sampled users whose batch list equals what recommend_for_user serves.
+    Cold-start lists are compared on their trending prefix (online tops them up
+    with random items). Returns (share, mismatched customer ids).
+    """
+    position = {cid: i for i, cid in enumerate(customer_ids)}
+    mismatched = []
+    sample_ids = _sample(customer_ids, sample, seed)
+    for cid in sample_ids:
+        batch = [snapshot.catalogue.item_id(r) for r in recommended[position[cid]] if r >= 0]
+        online = [rec['item_id'] for rec in engine.recommend_for_user(cid, top_k, diversity=diversity)]
+        if online[:len(batch)] != batch:
+            mismatched.append(cid)
+    return 1 - len(mismatched) / max(len(sample_ids), 1), mismatched
+
+
+def evaluate(engine, interactions, k=10, test_fraction=0.2, latency_sample=200, diversity=None):
+    """
+    Fits a copy of `engine` on the training part of `interactions` and scores it on
+    the rest; `engine` itself keeps serving its full log. `diversity` defaults to
+    the one recommend_for_user serves.
+    """
+    diversity = engine.DIVERSITY if diversity is None else diversity
+    train, test, cutoff = temporal_split(interactions, test_fraction)
+    # fit_interactions replaces (never mutates) the derived state, so a shallow copy
+    # shares the catalogue store and embedding model but gets its own history/CF/popularity
+    engine = copy.copy(engine)
+    engine.fit_interactions(train)
+    customer_ids = np.unique(test['customer_id'].to_numpy(str))
+
+    start = time.perf_counter()
+    recommended, snapshot = engine.recommend_batch(customer_ids, top_k=k, diversity=diversity)
+    batch_seconds = time.perf_counter() - start
+
+    n_rows = len(snapshot)
+    history = engine.history_matrix(customer_ids, snapshot).tocoo()
+    seen_keys = history.row.astype(np.int64) * n_rows + history.col
+    keys, n_relevant = relevance_keys(test, customer_ids, snapshot.catalogue, exclude=seen_keys)
+    recall, ndcg = ranking_metrics(recommended, keys, n_relevant, n_rows, k)
+    parity, mismatched = online_parity(engine, customer_ids, recommended, snapshot, k, diversity, latency_sample)
+    if mismatched:
+        print(f"WARNING: batch and online rankings differ for {len(mismatched)} sampled users, "
+              f"e.g. {mismatched[:5]}")
+
+    return {
+        'cutoff': str(cutoff),
+        'train_interactions': len(train),
+        'test_interactions': len(test),
+        'test_users': int((n_relevant > 0).sum()),
+        f'recall@{k}': float(np.nanmean(recall)),
+        f'ndcg@{k}': float(np.nanmean(ndcg)),
+        'coverage': catalogue_coverage(recommended, snapshot.alive),
+        'diversity': float(diversity),
+        'online_parity': parity,
+        'batch_users_per_sec': len(customer_ids) / batch_seconds if batch_seconds else float('inf'),
+        **latency_percentiles(engine, customer_ids, k, diversity, latency_sample),
+    }
+
+
+def main():
+    from src.models.personalization import PersonalizationEngine
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--test-fraction', type=float, default=0.2)
+    parser.add_argument('--latency-sample', type=int, default=200)
+    parser.add_argument('--backend', default=None)
+    parser.add_argument('--diversity', type=float, default=None, help="MMR diversity (default: the served one)")
+    args = parser.parse_args()
+
+    engine = PersonalizationEngine(embedding_backend=args.backend)
+    results = evaluate(engine, engine.interactions, args.k, args.test_fraction, args.latency_sample, args.diversity)
+    for name, value in results.items():
+        print(f"{name:<22} {value:.4f}" if isinstance(value, float) else f"{name:<22} {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+import numpy as np
+
+
+class StringTable:
+    """
+    Immutable table of strings stored as one UTF-8 buffer plus an offsets array.
+    Two Python objects per table instead of one str object per row.
+    """
+
+    def __init__(self, strings=(), buffer=None, offsets=None):
+        if buffer is not None:
+            self.buffer, self.offsets = buffer, offsets
+            return
+        encoded = [s.encode('utf-8') for s in strings]
+        self.offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=self.offsets[1:])
+        self.buffer = b''.join(encoded)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+    def concat(self, other):
+        offsets = np.concatenate([self.offsets, other.offsets[1:] + self.offsets[-1]])
+        return StringTable(buffer=self.buffer + other.buffer, offsets=offsets)
+
+    def take(self, indices):
+        chunks = [self.buffer[self.offsets[i]:self.offsets[i + 1]] for i in indices]
+        offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+        np.cumsum([len(c) for c in chunks], out=offsets[1:])
+        return StringTable(buffer=b''.join(chunks), offsets=offsets)
+
+    def nbytes(self):
+        return len(self.buffer) + self.offsets.nbytes
+
+
+def _intern(values):
+    """Returns (unique_values list, int16 codes) for a categorical column."""
+    uniques, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return uniques.tolist(), codes.astype(np.int16)
+
+
+def _merge_interned(values_a, codes_a, values_b, codes_b):
+    """Concatenates two interned columns, remapping codes onto a shared value list."""
+    values = list(values_a)
+    lookup = {v: i for i, v in enumerate(values)}
+    remap = np.empty(len(values_b), dtype=np.int16)
+    for j, v in enumerate(values_b):
+        if v not in lookup:
+            lookup[v] = len(values)
+            values.append(v)
+        remap[j] = lookup[v]
+    return values, np.concatenate([codes_a, remap[codes_b] if len(codes_b) else codes_b])
+
+
+class ItemCatalogue:
+    """
+    Columnar catalogue of products and content.
+    Ids/prices are NumPy arrays, type/category/meta are interned codes and
+    free text lives in StringTables. Dict records are only built for the
+    rows that are actually returned (see record()/records()).
+    """
+
+    PRODUCT = 'Product'
+    CONTENT = 'Content'
+
+    def __init__(self, item_ids, types, categories, titles, descriptions, prices, kinds):
+        # Fixed-width UTF-8 bytes: ~8 bytes per id instead of 4 bytes per char for dtype=str
+        self.item_ids = np.char.encode(np.asarray(item_ids, dtype=str), 'utf-8')
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.type_values, self.type_codes = _intern(types)
+        self.category_values, self.category_codes = _intern(categories)
+        # Content format (Movie/Podcast/Article...) shown as meta for content items
+        self.kind_values, self.kind_codes = _intern(kinds)
+        self.titles = StringTable(titles)
+        self.descriptions = StringTable(descriptions)
+        self.build_id_index()
+
+    @classmethod
+    def from_frames(cls, products, content):
+        """Builds the catalogue column-wise from products.csv and content.csv frames."""
+        n_products = len(products)
+        return cls(
+            item_ids=np.concatenate([products['product_id'].to_numpy(str), content['content_id'].to_numpy(str)]),
+            types=[cls.PRODUCT] * n_products + [cls.CONTENT] * len(content),
+            categories=np.concatenate([products['category'].to_numpy(str), content['genre'].to_numpy(str)]),
+            titles=products['name'].astype(str).tolist() + content['title'].astype(str).tolist(),
+            descriptions=products['description'].astype(str).tolist() + content['description'].astype(str).tolist(),
+            prices=np.concatenate([products['price'].to_numpy(np.float64), np.zeros(len(content))]),
+            kinds=[''] * n_products + content['type'].astype(str).tolist(),
+        )
+
+    @classmethod
+    def from_records(cls, items):
+        """Builds a catalogue from item dicts (item_id, type, title, category, description, price, kind)."""
+        return cls(
+            item_ids=[it['item_id'] for it in items],
+            types=[it.get('type') or cls.PRODUCT for it in items],
+            categories=[it.get('category') or '' for it in items],
+            titles=[it.get('title') or '' for it in items],
+            descriptions=[it.get('description') or '' for it in items],
+            prices=[float(it.get('price') or 0.0) for it in items],
+            kinds=[it.get('kind') or '' for it in items],
+        )
+
+    def _with_columns(self, item_ids, prices, types, categories, kinds, titles, descriptions, alive=None):
+        cat = ItemCatalogue.__new__(ItemCatalogue)
+        cat.item_ids, cat.prices = item_ids, prices
+        cat.type_values, cat.type_codes = types
+        cat.category_values, cat.category_codes = categories
+        cat.kind_values, cat.kind_codes = kinds
+        cat.titles, cat.descriptions = titles, descriptions
+        cat.build_id_index(alive)
+        return cat
+
+    def concat(self, other, alive=None):
+        """New catalogue with `other` appended. `alive` masks superseded rows out of the id index."""
+        return self._with_columns(
+            np.concatenate([self.item_ids, other.item_ids]) if len(self) else other.item_ids,
+            np.concatenate([self.prices, other.prices]),
+            _merge_interned(self.type_values, self.type_codes, other.type_values, other.type_codes),
+            _merge_interned(self.category_values, self.category_codes, other.category_values, other.category_codes),
+            _merge_interned(self.kind_values, self.kind_codes, other.kind_values, other.kind_codes),
+            self.titles.concat(other.titles),
+            self.descriptions.concat(other.descriptions),
+            alive=alive,
+        )
+
+    def take(self, indices):
+        """New catalogue containing only the given rows, in that order."""
+        indices = np.asarray(indices, dtype=np.int64)
+        return self._with_columns(
+            self.item_ids[indices], self.prices[indices],
+            (self.type_values, self.type_codes[indices]),
+            (self.category_values, self.category_codes[indices]),
+            (self.kind_values, self.kind_codes[indices]),
+            self.titles.take(indices), self.descriptions.take(indices),
+        )
+
+    def reindexed(self, alive):
+        """Shares all columns with this catalogue; only the id index is rebuilt over `alive` rows."""
+        return self._with_columns(
+            self.item_ids, self.prices,
+            (self.type_values, self.type_codes), (self.category_values, self.category_codes),
+            (self.kind_values, self.kind_codes), self.titles, self.descriptions, alive=alive,
+        )
+
+    def build_id_index(self, alive=None):
+        """Sorted view of ids for vectorized id -> row lookups, over live rows only."""
+        rows = np.arange(len(self.item_ids)) if alive is None else np.flatnonzero(alive)
+        order = np.argsort(self.item_ids[rows], kind='stable')
+        self._id_order = rows[order]
+        self._sorted_ids = self.item_ids[self._id_order]
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    def indices_for(self, item_ids, return_mask=False):
+        """
+        Row indices for the given ids (unknown ids are dropped). With return_mask,
+        also returns the boolean mask of which input ids were found.
+        """
+        ids = np.char.encode(np.asarray(item_ids, dtype=str), 'utf-8')
+        if not len(ids) or not len(self._sorted_ids):
+            rows = np.empty(0, dtype=np.int64)
+            return (rows, np.zeros(len(ids), dtype=bool)) if return_mask else rows
+        pos = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self._sorted_ids) - 1)
+        found = self._sorted_ids[pos] == ids
+        rows = self._id_order[pos[found]]
+        return (rows, found) if return_mask else rows
+
+    def item_id(self, i):
+        return self.item_ids[i].decode('utf-8')
+
+    def text(self, i):
+        """Embedding text: Title + Category + Description for rich semantic matching."""
+        return f"{self.titles[i]} ({self.category_values[self.category_codes[i]]}): {self.descriptions[i]}"
+
+    def texts(self):
+        return [self.text(i) for i in range(len(self))]
+
+    def record(self, i):
+        item_type = self.type_values[self.type_codes[i]]
+        price = float(self.prices[i])
+        if item_type == self.PRODUCT:
+            meta = f"Price: ${price}"
+        else:
+            meta = self.kind_values[self.kind_codes[i]] or item_type
+        return {
+            'item_id': self.item_id(i),
+            'type': item_type,
+            'title': self.titles[i],
+            'category': self.category_values[self.category_codes[i]],
+            'description': self.descriptions[i],
+            'price': price,
+            'meta': meta,
+        }
+
+    def records(self, indices, scores=None):
+        recs = [self.record(int(i)) for i in indices]
+        if scores is not None:
+            for rec, score in zip(recs, scores):
+                rec['score'] = float(score)
+        return recs
+
+    def nbytes(self):
+        """Approximate resident size of the columnar data."""
+        return (self.item_ids.nbytes + self.prices.nbytes + self.type_codes.nbytes
+                + self.category_codes.nbytes + self.kind_codes.nbytes
+                + self.titles.nbytes() + self.descriptions.nbytes()
+                + self._id_order.nbytes + self._sorted_ids.nbytes)
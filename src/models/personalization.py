@@ -1,11 +1,31 @@
 import pandas as pd
 import numpy as np
-from sentence_transformers import SentenceTransformer, util
+import scipy.sparse as sp
 import os
-import torch
+
+from src.models.item_catalogue import ItemCatalogue
+from src.models.catalogue_store import CatalogueStore
+from src.models.embed_catalogue import load_embeddings
+from src.models.embedding_backends import get_embedding_backend, DEFAULT_MODEL
+from src.models.popularity import PopularityModel
+from src.models.collaborative import ItemCooccurrenceModel
 
 class PersonalizationEngine:
-    def __init__(self):
+    # Candidate pool per requested item for MMR re-ranking
+    CANDIDATE_FACTOR = 4
+    # Redundancy between two items for MMR: semantic similarity + same category + same type
+    MMR_SEMANTIC_WEIGHT = 0.6
+    MMR_CATEGORY_WEIGHT = 0.3
+    MMR_TYPE_WEIGHT = 0.1
+    # Weight of the collaborative-filtering score added to the semantic cosine score
+    CF_WEIGHT = 0.3
+    # MMR relevance/redundancy trade-off served by default (online and batch)
+    DIVERSITY = 0.3
+
+    def __init__(self, embedding_backend=None, model_name=DEFAULT_MODEL):
+        """
+        embedding_backend: 'torch', 'onnx' or 'onnx-int8' (default: EMBEDDING_BACKEND env or 'torch')
+        """
         print("Initializing Personalization Engine (Industry Grade)...")
         self.base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
         self.raw_dir = os.path.join(self.base_dir, 'data', 'raw')
@@ -20,120 +40,336 @@ class PersonalizationEngine:
         else:
              self.customers = pd.read_csv(os.path.join(self.raw_dir, 'customers.csv'))
 
+        self.fit_interactions(self.interactions)
         
-        # Prepare Unified Item Repo
-        self.items = self._prepare_item_repo()
+        # Prepare Unified Item Repo (columnar, see item_catalogue.py)
+        catalogue = ItemCatalogue.from_frames(self.products, self.content)
+        self.store = None
+        self._rng = np.random.default_rng()
         
         # Load Model
         try:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            print("Embedding model loaded successfully.")
+            self.model = get_embedding_backend(embedding_backend, model_name)
+            print(f"Embedding model loaded successfully ({self.model.name} backend).")
             
             # Pre-compute Item Embeddings
             # Combine Title/Name + Category/Genre + Description for rich semantic matching
-            self.item_texts = self.items.apply(
-                lambda x: f"{x['title']} ({x['category']}): {x['description']}", axis=1
-            ).tolist()
+            self.item_texts = catalogue.texts()
             
-            self.item_embeddings = self.model.encode(self.item_texts, convert_to_tensor=True)
-            print(f"Computed embeddings for {len(self.items)} items.")
+            # Reuse shards from the embedding job (embed_catalogue.py) when they match the catalogue
+            # (memory-mapped, so preforked API workers share one copy of the matrix)
+            precomputed = load_embeddings(texts=self.item_texts, model_name=model_name, mmap=True,
+                                          backend=self.model.name)
+            # Embeddings are L2-normalized float32, so cosine similarity is a dot product
+            if precomputed is not None:
+                item_embeddings = precomputed
+                print(f"Loaded precomputed embeddings for {len(catalogue)} items.")
+            else:
+                item_embeddings = self.model.encode(self.item_texts)
+                print(f"Computed embeddings for {len(catalogue)} items.")
+
+            # Live catalogue: supports upserts/deletes without re-embedding everything
+            self.store = CatalogueStore(catalogue, item_embeddings, encoder=self.model)
             
         except Exception as e:
             print(f"Error loading model: {e}")
             self.model = None
 
-    def _prepare_item_repo(self):
-        """Standardizes Products and Content into a single dataframe"""
-        
-        # Format Products
-        p = self.products.copy()
-        p['item_id'] = p['product_id']
-        p['type'] = 'Product'
-        p['title'] = p['name']
-        # category is already there
-        # description is there
-        p = p[['item_id', 'type', 'title', 'category', 'description', 'price']]
-        p['meta'] = p.apply(lambda x: f"Price: ${x['price']}", axis=1)
-
-        # Format Content
-        c = self.content.copy()
-        c['item_id'] = c['content_id']
-        c['type'] = 'Content'
-        # title is there
-        c['category'] = c['genre'] # Map genre to category
-        # description is there
-        c = c[['item_id', 'type', 'title', 'category', 'description']]
-        c['meta'] = c['type'] # Movie/Article etc
-        c['price'] = 0 # Free content
-        
-        # Combine
-        combined = pd.concat([p, c], ignore_index=True)
-        return combined
+    def fit_interactions(self, interactions):
+        """(Re)builds everything derived from the interaction log: history index, popularity, CF."""
+        self.interactions = interactions.reset_index(drop=True)
+        # customer_id -> interaction row positions, so history lookups skip the full-table scan
+        self._history_index = self.interactions.groupby('customer_id').indices
+        # Fixed-width string arrays hold no per-row Python objects: reading them in
+        # forked workers never touches (and copies) refcounted pages of the parent
+        self._history_customer_ids = self.interactions['customer_id'].to_numpy(str)
+        self._history_item_ids = self.interactions['item_id'].to_numpy(str)
+        # Interactions that arrived after startup (see record_interactions)
+        self._live_history = {}
+
+        # Time-decayed trending items for cold-start users
+        self.popularity = PopularityModel.from_frames(self.interactions, self.customers)
+        # Item-item co-occurrence ("customers who engaged with X also engaged with Y")
+        self.cf = ItemCooccurrenceModel.from_interactions(self.interactions)
+
+    @property
+    def catalogue(self):
+        return self.store.snapshot.catalogue
+
+    @property
+    def item_embeddings(self):
+        return self.store.snapshot.embeddings
+
+    def upsert_items(self, items):
+        """Adds or replaces catalogue items; only these items are embedded."""
+        return self.store.upsert(items)
+
+    def delete_items(self, item_ids):
+        return self.store.delete(item_ids)
 
-    def get_user_embedding(self, customer_id):
+    def record_interactions(self, events):
+        """Interaction listener for the event ingestion service: updates history and popularity."""
+        for event in events:
+            if event.get('item_id'):
+                self._live_history.setdefault(event['customer_id'], []).append(event['item_id'])
+        self.popularity.update(events)
+
+    def get_user_history_ids(self, customer_id):
+        rows = self._history_index.get(customer_id)
+        history = [] if rows is None else self._history_item_ids[rows].tolist()
+        return history + self._live_history.get(customer_id, [])
+
+    def _history_rows(self, customer_id, snapshot, visited_ids=None):
+        """Catalogue rows the customer has interacted with (unique, live only)."""
+        if visited_ids is None:
+            visited_ids = self.get_user_history_ids(customer_id)
+        if not visited_ids:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(snapshot.catalogue.indices_for(visited_ids))
+
+    def get_user_embedding(self, customer_id, snapshot=None, history_rows=None):
         """
         Creates a 'User Vector' based on everything they've interacted with.
         """
-        user_history = self.interactions[self.interactions['customer_id'] == customer_id]
-        
-        if user_history.empty:
-            return None
-            
-        # Get IDs of items visited
-        visited_ids = user_history['item_id'].tolist()
+        if snapshot is None:
+            snapshot = self.store.snapshot
+        if history_rows is None:
+            history_rows = self._history_rows(customer_id, snapshot)
         
-        # Find indices in our master item list
-        indices = self.items.index[self.items['item_id'].isin(visited_ids)].tolist()
-        
-        if not indices:
+        if not len(history_rows):
             return None
             
         # Get embeddings
         # We could weight this by action (Purchase > Cart > View), but simple average is fine for now
-        history_embeddings = self.item_embeddings[indices]
+        history_embeddings = snapshot.embeddings[history_rows]
         
-        # Average vector
-        user_vector = torch.mean(history_embeddings, dim=0)
-        return user_vector
+        # Average vector, re-normalized so dot products stay cosine similarities
+        user_vector = history_embeddings.mean(axis=0)
+        return user_vector / max(np.linalg.norm(user_vector), 1e-12)
+
+    def user_context(self, customer_id):
+        """
+        Per-request intermediates of recommend_for_user (catalogue snapshot, history
+        ids/rows, user vector). Callers that need them for more than one thing
+        compute them once and pass the dict back as `context`.
+        """
+        snapshot = self.store.snapshot
+        history_ids = self.get_user_history_ids(customer_id)
+        history_rows = self._history_rows(customer_id, snapshot, history_ids)
+        return {
+            'snapshot': snapshot,
+            'history_ids': history_ids,
+            'history_rows': history_rows,
+            'user_vector': self.get_user_embedding(customer_id, snapshot, history_rows),
+        }
 
-    def recommend_for_user(self, customer_id, top_k=5):
+    def recommend_for_user(self, customer_id, top_k=5, diversity=DIVERSITY, context=None):
         """
         Hybrid Semantic Search Recommendation.
-        Finds items semantically similar to what the user has liked before.
+        Finds items semantically similar to what the user has liked before, boosted
+        by item-item collaborative filtering (CF_WEIGHT * normalized co-occurrence score).
+
+        Already-seen and deleted items are masked out before top-k selection, so the
+        result always has min(top_k, eligible items) entries however long the history.
+        `diversity` (0..1) is the MMR trade-off between relevance and category/type/
+        semantic redundancy; 0 returns the pure relevance ranking. `context` is a
+        precomputed user_context() for this customer.
         """
         if self.model is None:
             return []
 
-        user_vector = self.get_user_embedding(customer_id)
+        # One snapshot per request so concurrent catalogue updates stay consistent
+        context = context or self.user_context(customer_id)
+        snapshot = context['snapshot']
+        catalogue = snapshot.catalogue
+        history_ids = context['history_ids']
+        history_rows = context['history_rows']
+        user_vector = context['user_vector']
         
         if user_vector is None:
-            # Cold Start: Recommend Trending/Random high quality items
-            # For now, just random top items - but let's diversify
-            return self.items.sample(top_k).to_dict('records')
+            return self._cold_start(customer_id, snapshot, top_k)
             
+        # Exclusion mask: live items the user has not seen yet
+        eligible = snapshot.alive.copy()
+        eligible[history_rows] = False
+        n_eligible = int(np.count_nonzero(eligible))
+        if n_eligible == 0:
+            return []
+
         # Semantic Search for nearest neighbors
-        cosine_scores = util.cos_sim(user_vector, self.item_embeddings)[0]
-        
-        # Get top results
-        top_results = torch.topk(cosine_scores, k=top_k+20) # Get more to filter
-        
-        recommendations = []
-        user_history_ids = self.interactions[self.interactions['customer_id'] == customer_id]['item_id'].tolist()
+        scores = snapshot.embeddings @ user_vector
+        self._blend_cf(scores, history_ids, catalogue)
+        scores[~eligible] = -np.inf
         
-        for score, idx in zip(top_results.values, top_results.indices):
-            idx = int(idx)
-            item = self.items.iloc[idx]
-            
-            # Simple Filter: Don't show what they already saw
-            if item['item_id'] not in user_history_ids:
-                rec = item.to_dict()
-                rec['score'] = float(score)
-                recommendations.append(rec)
-                
-            if len(recommendations) >= top_k:
-                break
+        # Candidate pool: exactly top_k without diversification, a wider pool for MMR
+        pool = min(n_eligible, top_k * self.CANDIDATE_FACTOR if diversity > 0 else top_k)
+        candidates = np.argpartition(-scores, pool - 1)[:pool]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        if diversity > 0 and len(candidates) > top_k:
+            picked = self._mmr(candidates, scores[candidates], snapshot, top_k, diversity)
+        else:
+            picked = candidates[:top_k]
                 
-        return recommendations
+        # Only the final top-k rows are materialized as dicts
+        return catalogue.records(picked, scores[picked])
+
+    def history_matrix(self, customer_ids, snapshot):
+        """Binary customers x catalogue-rows CSR matrix of (live) interaction history."""
+        live_pairs = [(cid, item_id) for cid, items in self._live_history.items() for item_id in items]
+        users = self._history_customer_ids
+        items = self._history_item_ids
+        if live_pairs:
+            live_users, live_items = zip(*live_pairs)
+            users = np.concatenate([users, np.asarray(live_users, dtype=str)])
+            items = np.concatenate([items, np.asarray(live_items, dtype=str)])
+        user_codes = pd.Index(customer_ids).get_indexer(users)
+        rows, found = snapshot.catalogue.indices_for(items, return_mask=True)
+        user_codes = user_codes[found]
+        keep = user_codes >= 0
+        history = sp.csr_matrix((np.ones(int(keep.sum()), dtype=np.float32), (user_codes[keep], rows[keep])),
+                                shape=(len(customer_ids), len(snapshot)))
+        history.sum_duplicates()
+        history.data[:] = 1.0
+        return history
+
+    def _cf_history(self, customer_ids):
+        """
+        customers x CF-items CSR matrix of interaction counts. Duplicate interactions
+        count, as in CF.score(history_ids) on the online path.
+        """
+        live_pairs = [(cid, item_id) for cid, items in self._live_history.items() for item_id in items]
+        users = self._history_customer_ids
+        items = self._history_item_ids
+        if live_pairs:
+            live_users, live_items = zip(*live_pairs)
+            users = np.concatenate([users, np.asarray(live_users, dtype=str)])
+            items = np.concatenate([items, np.asarray(live_items, dtype=str)])
+        user_codes = pd.Index(customer_ids).get_indexer(users)
+        item_codes = pd.Index(self.cf.item_ids).get_indexer(items)
+        keep = (user_codes >= 0) & (item_codes >= 0)
+        history = sp.csr_matrix((np.ones(int(keep.sum()), dtype=np.float32), (user_codes[keep], item_codes[keep])),
+                                shape=(len(customer_ids), len(self.cf.item_ids)))
+        history.sum_duplicates()
+        return history
+
+    def recommend_batch(self, customer_ids, top_k=5, diversity=DIVERSITY, chunk_size=1024):
+        """
+        recommend_for_user for many customers at once: same user vectors, CF blend
+        (duplicate interactions counted), exclusion mask and MMR re-ranking, with the
+        scoring vectorized per chunk of customers. Returns (rows, snapshot): rows is
+        an (n, top_k) int64 array of catalogue rows in `snapshot`, padded with -1
+        when fewer items are eligible. Cold-start rows hold the trending items only
+        (the online path tops them up with random live items).
+        """
+        snapshot = self.store.snapshot
+        customer_ids = list(customer_ids)
+        result = np.full((len(customer_ids), top_k), -1, dtype=np.int64)
+        if self.model is None or not customer_ids:
+            return result, snapshot
+
+        history = self.history_matrix(customer_ids, snapshot)
+        counts = np.diff(history.indptr)
+        use_cf = self.cf is not None and len(self.cf.item_ids) > 0
+        if use_cf:
+            cf_history = self._cf_history(customer_ids)
+            cf_rows, cf_found = snapshot.catalogue.indices_for(self.cf.item_ids, return_mask=True)
+        pool = top_k * self.CANDIDATE_FACTOR if diversity > 0 else top_k
+        warm = np.flatnonzero(counts > 0)
+        for start in range(0, len(warm), chunk_size):
+            users = warm[start:start + chunk_size]
+            h = history[users]
+            user_vectors = (h @ snapshot.embeddings) / counts[users, None]
+            user_vectors /= np.maximum(np.linalg.norm(user_vectors, axis=1, keepdims=True), 1e-12)
+            scores = user_vectors @ snapshot.embeddings.T
+
+            if use_cf:
+                # Normalized per customer over all CF items, like CF.score
+                cf = (cf_history[users] @ self.cf.similarity).toarray()
+                cf_max = cf.max(axis=1, keepdims=True)
+                cf = np.divide(cf, cf_max, out=np.zeros_like(cf), where=cf_max > 0)
+                scores[:, cf_rows] += self.CF_WEIGHT * cf[:, cf_found]
+
+            scores[:, ~snapshot.alive] = -np.inf
+            h_rows = np.repeat(np.arange(len(users)), np.diff(h.indptr))
+            scores[h_rows, h.indices] = -np.inf
+
+            k = min(pool, scores.shape[1])
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top = np.take_along_axis(
+                top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable'), axis=1)
+            if diversity <= 0:
+                top = top[:, :top_k]
+                top[~np.isfinite(np.take_along_axis(scores, top, axis=1))] = -1
+                result[users, :top.shape[1]] = top
+                continue
+            for i, user in enumerate(users):
+                candidates = top[i][np.isfinite(scores[i, top[i]])]
+                if len(candidates) > top_k:
+                    candidates = self._mmr(candidates, scores[i, candidates], snapshot, top_k, diversity)
+                result[user, :len(candidates)] = candidates
+
+        # Cold-start customers share one trending list per segment
+        cold = np.flatnonzero(counts == 0)
+        segments = pd.Series([self.popularity.segment_of(customer_ids[i]) for i in cold], dtype=object)
+        for segment, group in segments.groupby(segments.fillna(''), sort=False).indices.items():
+            trending = self.popularity.top_items(top_k * 2, segment=segment or None)
+            rows = snapshot.catalogue.indices_for([item_id for item_id, _ in trending])[:top_k]
+            result[cold[group], :len(rows)] = rows
+        return result, snapshot
+
+    def _blend_cf(self, scores, history_ids, catalogue):
+        """Adds collaborative-filtering candidates to the semantic scores in place."""
+        if self.cf is None:
+            return
+        cf_ids, cf_scores = self.cf.score(history_ids)
+        if not len(cf_ids):
+            return
+        rows, found = catalogue.indices_for(cf_ids, return_mask=True)
+        scores[rows] += self.CF_WEIGHT * cf_scores[found]
+
+    def _cold_start(self, customer_id, snapshot, top_k):
+        """Trending items for the customer's segment, topped up with random live items."""
+        segment = self.popularity.segment_of(customer_id)
+        # Over-fetch a little: some popular ids may have been deleted from the catalogue
+        trending = self.popularity.top_items(top_k * 2, segment=segment)
+        rows, scores = [], []
+        if trending:
+            score_of = dict(trending)
+            # indices_for drops unknown ids but keeps order, so align scores by id
+            found = snapshot.catalogue.indices_for(list(score_of))
+            rows = found[:top_k].tolist()
+            scores = [score_of[snapshot.catalogue.item_id(i)] for i in rows]
+
+        if len(rows) < top_k:
+            live = np.flatnonzero(snapshot.alive)
+            live = live[~np.isin(live, rows)]
+            extra = self._rng.choice(live, size=min(top_k - len(rows), len(live)), replace=False)
+            rows += extra.tolist()
+            scores += [0.0] * len(extra)
+        return snapshot.catalogue.records(rows, scores)
+
+    def _mmr(self, candidates, relevance, snapshot, top_k, diversity):
+        """Maximal marginal relevance over the candidate set (vectorized per step)."""
+        catalogue = snapshot.catalogue
+        emb = snapshot.embeddings[candidates]
+        categories = catalogue.category_codes[candidates]
+        types = catalogue.type_codes[candidates]
+
+        redundancy = np.zeros(len(candidates), dtype=np.float32)
+        chosen = np.zeros(len(candidates), dtype=bool)
+        order = []
+        for _ in range(top_k):
+            mmr = (1 - diversity) * relevance - diversity * redundancy
+            mmr[chosen] = -np.inf
+            j = int(np.argmax(mmr))
+            order.append(j)
+            chosen[j] = True
+            similarity = (self.MMR_SEMANTIC_WEIGHT * (emb @ emb[j])
+                          + self.MMR_CATEGORY_WEIGHT * (categories == categories[j])
+                          + self.MMR_TYPE_WEIGHT * (types == types[j]))
+            np.maximum(redundancy, similarity, out=redundancy)
+        return candidates[order]
 
     def get_all_customers(self):
         return self.customers['customer_id'].tolist()
@@ -0,0 +1,177 @@
+import math
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.features.streaming_features import to_naive_utc
+
+# Stronger intent counts more towards popularity
+ACTION_WEIGHTS = {'purchase': 5.0, 'cart': 3.0, 'like': 2.0, 'watch_later': 1.5, 'view': 1.0}
+DEFAULT_ACTION_WEIGHT = 1.0
+
+
+class PopularityModel:
+    """
+    Time-decayed popularity per item, per category and per customer segment.
+
+    Uses forward decay: an interaction at time t adds w * exp(lambda * (t - anchor)),
+    so scores only ever grow and an update is O(1) - no pass over all items to
+    decay old counts. Ranking by these scores equals ranking by
+    sum(w * 2^(-(now - t) / half_life)). Top-N lists per (segment, category) are
+    cached and rebuilt lazily after updates, so serving is an O(k) slice.
+    """
+
+    def __init__(self, half_life_days=14.0, top_n=200, refresh_seconds=1.0):
+        self.decay_rate = math.log(2) / half_life_days
+        self.top_n = top_n
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._anchor = None          # pd.Timestamp the exponents are relative to
+        self._watermark = None       # latest interaction time seen
+
+        self._item_index = {}
+        self._item_ids = []
+        self._item_category = []     # category code per item
+        self._categories = {}
+        self._scores = np.zeros(0)   # global decayed score per item
+        self._segment_scores = {}    # segment -> scores aligned with _scores
+        self._customer_segment = {}
+
+        self._top_cache = {}
+        self._dirty = False
+        self._last_refresh = 0.0
+
+    @classmethod
+    def from_frames(cls, interactions, customers=None, **kwargs):
+        model = cls(**kwargs)
+        if customers is not None and 'segment' in customers.columns:
+            model._customer_segment = dict(zip(customers['customer_id'], customers['segment']))
+        model.update_frame(interactions)
+        return model
+
+    # --- Updates ---
+
+    def _days(self, ts):
+        return (ts - self._anchor) / pd.Timedelta(days=1)
+
+    def _ensure_items(self, item_ids, categories):
+        new = 0
+        for item_id, category in zip(item_ids, categories):
+            if item_id not in self._item_index:
+                self._item_index[item_id] = len(self._item_ids)
+                self._item_ids.append(item_id)
+                self._item_category.append(self._categories.setdefault(category, len(self._categories)))
+                new += 1
+        if new:
+            self._scores = np.concatenate([self._scores, np.zeros(new)])
+            for segment, scores in self._segment_scores.items():
+                self._segment_scores[segment] = np.concatenate([scores, np.zeros(new)])
+
+    def _rebase(self, latest):
+        """Moves the anchor forward before exp() can overflow; rescales all scores."""
+        shift_days = self._days(latest)
+        if shift_days * self.decay_rate < 300:
+            return
+        factor = math.exp(-self.decay_rate * shift_days)
+        self._scores *= factor
+        for scores in self._segment_scores.values():
+            scores *= factor
+        self._anchor = latest
+
+    def update_frame(self, interactions):
+        """Vectorized bulk update from an interactions.csv-shaped frame."""
+        if interactions is None or interactions.empty:
+            return
+        ts = to_naive_utc(interactions['timestamp'])
+        with self._lock:
+            if self._anchor is None:
+                self._anchor = ts.min()
+            latest = ts.max()
+            self._watermark = latest if self._watermark is None else max(self._watermark, latest)
+            self._rebase(self._watermark)
+
+            categories = interactions['category'] if 'category' in interactions.columns else [''] * len(interactions)
+            self._ensure_items(interactions['item_id'].tolist(), list(categories))
+            idx = np.fromiter((self._item_index[i] for i in interactions['item_id']), dtype=np.int64,
+                              count=len(interactions))
+            weights = interactions['action'].map(ACTION_WEIGHTS).fillna(DEFAULT_ACTION_WEIGHT).to_numpy()
+            contrib = weights * np.exp(self.decay_rate * self._days(ts).to_numpy())
+
+            np.add.at(self._scores, idx, contrib)
+            segments = interactions['customer_id'].map(self._customer_segment)
+            for segment in segments.dropna().unique():
+                mask = (segments == segment).to_numpy()
+                scores = self._segment_scores.setdefault(segment, np.zeros(len(self._scores)))
+                np.add.at(scores, idx[mask], contrib[mask])
+            self._dirty = True
+
+    def update(self, events):
+        """Incremental update from interaction event dicts (customer_id, item_id, action, timestamp)."""
+        if not events:
+            return
+        self.update_frame(pd.DataFrame([{
+            'customer_id': e['customer_id'],
+            'item_id': e['item_id'],
+            'action': e.get('action') or 'view',
+            'category': e.get('category') or '',
+            'timestamp': e['timestamp'],
+        } for e in events if e.get('item_id')]))
+
+    # --- Serving ---
+
+    def _ranked(self, segment, category):
+        """Cached top-N item indices for one (segment, category) slice."""
+        now = time.monotonic()
+        if self._dirty and now - self._last_refresh >= self.refresh_seconds:
+            self._top_cache = {}
+            self._dirty = False
+            self._last_refresh = now
+        key = (segment, category)
+        ranked = self._top_cache.get(key)
+        if ranked is None:
+            scores = self._segment_scores.get(segment, self._scores) if segment else self._scores
+            if category is not None:
+                code = self._categories.get(category)
+                if code is None:
+                    return np.empty(0, dtype=np.int64)
+                scores = np.where(np.asarray(self._item_category) == code, scores, 0.0)
+            candidates = np.flatnonzero(scores > 0)
+            n = min(self.top_n, len(candidates))
+            if n:
+                top = candidates[np.argpartition(-scores[candidates], n - 1)[:n]]
+                ranked = top[np.argsort(-scores[top], kind='stable')]
+            else:
+                ranked = np.empty(0, dtype=np.int64)
+            self._top_cache[key] = ranked
+        return ranked
+
+    def top_items(self, k, segment=None, category=None, exclude=None):
+        """
+        Returns [(item_id, normalized_score)] for the k most popular items.
+        Segment lists fall back to the global list when the segment has too few items.
+        """
+        with self._lock:
+            if not self._item_ids:
+                return []
+            ranked = self._ranked(segment, category)
+            if segment and len(ranked) < k:
+                seen = set(ranked.tolist())
+                fallback = np.asarray([i for i in self._ranked(None, category) if i not in seen], dtype=np.int64)
+                # Typed fallback: an empty plain list would upcast the index array to float64
+                ranked = np.concatenate([ranked.astype(np.int64, copy=False), fallback])
+            scores = self._segment_scores.get(segment, self._scores) if segment else self._scores
+            top_score = scores[ranked[0]] if len(ranked) else 1.0
+            result = []
+            for i in ranked:
+                item_id = self._item_ids[i]
+                if exclude and item_id in exclude:
+                    continue
+                result.append((item_id, float(scores[i] / top_score) if top_score else 0.0))
+                if len(result) >= k:
+                    break
+            return result
+
+    def segment_of(self, customer_id):
+        return self._customer_segment.get(customer_id)
@@ -0,0 +1,192 @@
+"""
+Out-of-core churn model training.
+
+Streams the feature table in chunks (CSV chunks or Parquet record batches)
+through XGBoost's external-memory DataIter into an ExtMemQuantileDMatrix, so
+the training set is never resident: memory is bounded by one chunk plus the
+on-disk page cache. The country one-hot vocabulary comes from a cheap first
+pass over the country column alone. Rows are routed to train/validation by a
+hash of customer_id, so the split is stable across passes and files. Peak RSS
+is recorded and logged to MLflow.
+
+    python -m src.models.train_churn_external --data data/processed/features.parquet --chunk-rows 1000000
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+import joblib
+import mlflow
+import mlflow.xgboost
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import xgboost as xgb
+
+from src.features.feature_transformer import ChurnFeatureTransformer, NUMERIC_FEATURES, transformer_path_for
+from src.services.drift_monitor import fit_reference, reference_path_for
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+DEFAULT_DATA_PATH = os.path.join(BASE_DIR, 'data', 'processed', 'features.csv')
+DEFAULT_MODEL_PATH = os.path.join(BASE_DIR, 'src', 'models', 'churn_model.pkl')
+
+VALIDATION_PERCENT = 20
+
+DEFAULT_PARAMS = {
+    'objective': 'binary:logistic',
+    'eval_metric': ['logloss', 'auc'],
+    'tree_method': 'hist',
+    'max_depth': 6,
+    'eta': 0.1,
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def iter_chunks(path, chunk_rows, columns=None):
+    """Yields DataFrames of at most `chunk_rows` rows from a CSV or Parquet file."""
+    if path.endswith('.parquet'):
+        parquet = pq.ParquetFile(path)
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows, usecols=columns)
+
+
+def country_vocabulary(path, chunk_rows):
+    """First pass over the country column only."""
+    countries = set()
+    for chunk in iter_chunks(path, chunk_rows, columns=['country']):
+        countries.update(chunk['country'].dropna().unique())
+    return sorted(countries)
+
+
+def fit_transformer(path, chunk_rows):
+    """Transformer fitted from the header and the country-only pass, without loading the table."""
+    header = next(iter_chunks(path, 1)).columns
+    numeric = [c for c in NUMERIC_FEATURES if c in header]
+    return ChurnFeatureTransformer(numeric, country_vocabulary(path, chunk_rows))
+
+
+def is_validation(customer_ids):
+    return (pd.util.hash_pandas_object(customer_ids, index=False).to_numpy() % 100) < VALIDATION_PERCENT
+
+
+class FeatureChunkIter(xgb.DataIter):
+    """
+    Feeds one split of the feature file to XGBoost, one chunk per next() call.
+    If given a drift `reference`, the first full pass also accumulates its counts.
+    `other_rows` counts the rows of the other split seen in the last pass.
+    """
+
+    def __init__(self, path, chunk_rows, transformer, validation, cache_dir, reference=None):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.transformer = transformer
+        self.validation = validation
+        self.reference = reference
+        self.rows = 0
+        self.other_rows = 0
+        self._chunks = None
+        super().__init__(cache_prefix=os.path.join(cache_dir, 'valid' if validation else 'train'))
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = iter_chunks(self.path, self.chunk_rows)
+        for chunk in self._chunks:
+            in_split = is_validation(chunk['customer_id']) == self.validation
+            self.other_rows += int((~in_split).sum())
+            chunk = chunk[in_split]
+            if chunk.empty:
+                continue
+            self.rows += len(chunk)
+            if self.reference is not None:
+                self.reference.update(chunk)
+            input_data(data=self.transformer.encode_frame(chunk), label=chunk['churn'].to_numpy(np.float32),
+                       feature_names=self.transformer.feature_names)
+            return True
+        # Reference counts are complete after one pass; later passes re-read the same rows
+        self.reference = None
+        return False
+
+    def reset(self):
+        self._chunks = None
+        self.rows = 0
+        self.other_rows = 0
+
+
+def train_external(data_path=DEFAULT_DATA_PATH, chunk_rows=1_000_000, num_boost_round=500,
+                   early_stopping_rounds=30, params=None, model_path=DEFAULT_MODEL_PATH):
+    start = time.perf_counter()
+    transformer = fit_transformer(data_path, chunk_rows)
+    reference = fit_reference(next(iter_chunks(data_path, chunk_rows)), transformer, count=False)
+
+    mlflow.set_experiment("churn_prediction")
+    with mlflow.start_run(run_name="external_memory"), tempfile.TemporaryDirectory() as cache_dir:
+        train_iter = FeatureChunkIter(data_path, chunk_rows, transformer, False, cache_dir, reference)
+        valid_iter = FeatureChunkIter(data_path, chunk_rows, transformer, True, cache_dir)
+        dtrain = xgb.ExtMemQuantileDMatrix(train_iter)
+        # The training pass also counted the validation rows; an empty split can't be built into a DMatrix
+        # (the hash split can leave it empty on small tables)
+        dvalid = xgb.ExtMemQuantileDMatrix(valid_iter, ref=dtrain) if train_iter.other_rows else None
+        ingest_seconds = time.perf_counter() - start
+        print(f"Ingested {dtrain.num_row():,} train / {train_iter.other_rows:,} validation rows "
+              f"in {ingest_seconds:.1f}s (peak RSS {peak_rss_mb():.0f} MB)")
+
+        params = {**DEFAULT_PARAMS, **(params or {})}
+        evals_result = {}
+        if dvalid is not None:
+            booster = xgb.train(params, dtrain, num_boost_round=num_boost_round, evals=[(dvalid, 'valid')],
+                                early_stopping_rounds=early_stopping_rounds, evals_result=evals_result,
+                                verbose_eval=False)
+            best_iteration = booster.best_iteration
+        else:
+            print(f"WARNING: no rows in the {VALIDATION_PERCENT}% validation split; "
+                  f"training {num_boost_round} rounds without early stopping or AUC")
+            booster = xgb.train(params, dtrain, num_boost_round=num_boost_round)
+            best_iteration = booster.num_boosted_rounds() - 1
+        total_seconds = time.perf_counter() - start
+        rss = peak_rss_mb()
+        metrics = {'peak_rss_mb': rss, 'train_seconds': total_seconds, 'ingest_seconds': ingest_seconds,
+                   'train_rows': dtrain.num_row(), 'best_iteration': best_iteration}
+        if dvalid is not None:
+            metrics['auc'] = evals_result['valid']['auc'][best_iteration]
+            print(f"AUC: {metrics['auc']}")
+        print(f"Trained {best_iteration + 1} rounds in {total_seconds:.1f}s, peak RSS {rss:.0f} MB")
+
+        mlflow.log_params({**{k: str(v) for k, v in params.items()}, 'chunk_rows': chunk_rows,
+                           'mode': 'external_memory'})
+        mlflow.log_metrics(metrics)
+        mlflow.xgboost.log_model(booster, "model")
+
+        # Same artifact type the API already loads (sklearn wrapper with predict_proba)
+        model = xgb.XGBClassifier()
+        model_json = os.path.join(cache_dir, 'model.json')
+        booster.save_model(model_json)
+        model.load_model(model_json)
+        joblib.dump(model, model_path)
+        transformer.save(transformer_path_for(model_path))
+        reference.save(reference_path_for(model_path))
+        print(f"Model saved to {model_path}")
+        # Release the page caches before their temporary directory is removed
+        del dtrain, dvalid
+    return booster, rss
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH, help="CSV or .parquet feature table")
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000)
+    parser.add_argument('--rounds', type=int, default=500)
+    parser.add_argument('--model-path', default=DEFAULT_MODEL_PATH)
+    args = parser.parse_args()
+    train_external(args.data, args.chunk_rows, args.rounds, model_path=args.model_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,20 +7,22 @@ import mlflow
 import mlflow.xgboost
 import os
 
-def train_model():
+from src.features.feature_transformer import ChurnFeatureTransformer, transformer_path_for
+from src.services.drift_monitor import fit_reference, reference_path_for
+
+def train_model(data=None):
+    """Trains on `data` (the features frame; read from features.csv when None). Returns (model, transformer)."""
     # Load data
     base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    data_path = os.path.join(base_dir, 'data/processed/features.csv')
-    data = pd.read_csv(data_path)
+    if data is None:
+        data_path = os.path.join(base_dir, 'data/processed/features.csv')
+        data = pd.read_csv(data_path)
     
     # Prepare X and y
-    # Drop non-numeric or ID columns
-    X = data.drop(columns=['customer_id', 'country', 'churn', 'signup_date'], errors='ignore')
-    # Simple encoding for now if needed (country is categorical). 
-    # For now I dropped country to keep it simple, but let's encode it for better model.
-    if 'country' in data.columns:
-        X = pd.concat([X, pd.get_dummies(data['country'], prefix='country')], axis=1)
-        
+    # The fitted transformer freezes the column order / country vocabulary and is
+    # saved next to the model so the API encodes requests exactly the same way
+    transformer = ChurnFeatureTransformer.fit(data)
+    X = pd.DataFrame(transformer.encode_frame(data), columns=transformer.feature_names)
     y = data['churn']
     
     # Split
@@ -54,7 +56,10 @@ def train_model():
         # Save locally for API
         model_output_path = os.path.join(base_dir, 'src/models/churn_model.pkl')
         joblib.dump(model, model_output_path)
+        transformer.save(transformer_path_for(model_output_path))
+        fit_reference(data, transformer).save(reference_path_for(model_output_path))
         print(f"Model saved to {model_output_path}")
+    return model, transformer
 
 if __name__ == "__main__":
     train_model()
@@ -0,0 +1,214 @@
+"""
+Parallel hyperparameter search for the churn model.
+
+Random-search trials x CV folds are fanned out over a spawn process pool. The
+core budget is split as workers x nthread so XGBoost's own threads never
+oversubscribe the machine. Each worker builds its fold QuantileDMatrix objects
+(hist tree method) once in the initializer and reuses them for every trial; each
+fit early-stops on its held-out fold. Trials are logged to MLflow as nested runs,
+and the best configuration is refit on the full training split and saved where
+the API loads it.
+
+    python -m src.models.tune_churn_model --trials 40 --folds 5
+    python -m src.models.tune_churn_model --trials 40 --scaling   # wall-clock vs cores
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+
+import joblib
+import mlflow
+import mlflow.xgboost
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import KFold, StratifiedKFold, train_test_split
+
+from src.features.feature_transformer import ChurnFeatureTransformer, transformer_path_for
+from src.services.drift_monitor import fit_reference, reference_path_for
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+DEFAULT_DATA_PATH = os.path.join(BASE_DIR, 'data', 'processed', 'features.csv')
+DEFAULT_MODEL_PATH = os.path.join(BASE_DIR, 'src', 'models', 'churn_model.pkl')
+
+MAX_BOOST_ROUNDS = 1000
+EARLY_STOPPING_ROUNDS = 30
+
+SEARCH_SPACE = {
+    'max_depth': [3, 4, 5, 6, 8],
+    'eta': [0.02, 0.05, 0.1, 0.2],
+    'subsample': [0.6, 0.8, 1.0],
+    'colsample_bytree': [0.6, 0.8, 1.0],
+    'min_child_weight': [1, 3, 5, 10],
+    'lambda': [0.5, 1.0, 2.0, 5.0],
+}
+
+_worker_folds = None
+_worker_nthread = 1
+
+
+def load_training_data(path=DEFAULT_DATA_PATH):
+    """Returns (X float32 array, y, fitted transformer, raw frame); features are encoded once, up front."""
+    data = pd.read_csv(path)
+    transformer = ChurnFeatureTransformer.fit(data)
+    return transformer.encode_frame(data), data['churn'].to_numpy(), transformer, data
+
+
+def sample_trials(n_trials, seed=42):
+    rng = np.random.default_rng(seed)
+    return [{name: values[rng.integers(len(values))] for name, values in SEARCH_SPACE.items()}
+            for _ in range(n_trials)]
+
+
+def make_folds(y, n_folds, seed=42):
+    # Stratify when every class can appear in every fold (tiny datasets can't)
+    if np.bincount(y.astype(int)).min() >= n_folds:
+        splitter = StratifiedKFold(n_folds, shuffle=True, random_state=seed)
+    else:
+        splitter = KFold(n_folds, shuffle=True, random_state=seed)
+    return list(splitter.split(np.zeros(len(y)), y))
+
+
+def _init_worker(X, y, folds, nthread):
+    """Builds every fold's DMatrix pair once per process; trials only train."""
+    global _worker_folds, _worker_nthread
+    _worker_nthread = nthread
+    _worker_folds = []
+    for train_idx, valid_idx in folds:
+        dtrain = xgb.QuantileDMatrix(X[train_idx], y[train_idx], nthread=nthread)
+        # Validation must reuse the training quantile cuts
+        dvalid = xgb.QuantileDMatrix(X[valid_idx], y[valid_idx], ref=dtrain, nthread=nthread)
+        _worker_folds.append((dtrain, dvalid))
+
+
+def _run_fold(task):
+    trial_id, fold_id, params = task
+    dtrain, dvalid = _worker_folds[fold_id]
+    start = time.perf_counter()
+    booster = xgb.train(
+        {**params, 'objective': 'binary:logistic', 'eval_metric': 'auc', 'tree_method': 'hist',
+         'nthread': _worker_nthread, 'verbosity': 0},
+        dtrain, num_boost_round=MAX_BOOST_ROUNDS, evals=[(dvalid, 'valid')],
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS, verbose_eval=False,
+    )
+    return trial_id, fold_id, float(booster.best_score), int(booster.best_iteration), time.perf_counter() - start
+
+
+def plan_workers(cores, n_tasks):
+    """Splits `cores` into (processes, xgboost threads per process)."""
+    workers = max(1, min(cores, n_tasks))
+    return workers, max(1, cores // workers)
+
+
+def run_search(X, y, trials, n_folds=5, cores=None):
+    """Returns one result dict per trial (mean/std CV AUC, mean best iteration, fit seconds)."""
+    cores = cores or os.cpu_count() or 1
+    folds = make_folds(y, n_folds)
+    tasks = [(t, f, params) for t, params in enumerate(trials) for f in range(len(folds))]
+    workers, nthread = plan_workers(cores, len(tasks))
+
+    ctx = mp.get_context('spawn')
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(X, y, folds, nthread)) as pool:
+        fold_results = pool.map(_run_fold, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+
+    scores = np.zeros((len(trials), len(folds)))
+    iterations = np.zeros((len(trials), len(folds)))
+    seconds = np.zeros(len(trials))
+    for trial_id, fold_id, score, best_iteration, elapsed in fold_results:
+        scores[trial_id, fold_id] = score
+        iterations[trial_id, fold_id] = best_iteration
+        seconds[trial_id] += elapsed
+    return [{
+        'params': params,
+        'cv_auc_mean': float(scores[t].mean()),
+        'cv_auc_std': float(scores[t].std()),
+        'best_iteration': int(iterations[t].mean()) + 1,
+        'fit_seconds': float(seconds[t]),
+    } for t, params in enumerate(trials)], {'workers': workers, 'nthread': nthread}
+
+
+def tune(data_path=DEFAULT_DATA_PATH, n_trials=40, n_folds=5, cores=None, model_path=DEFAULT_MODEL_PATH):
+    X, y, transformer, data = load_training_data(data_path)
+    feature_names = transformer.feature_names
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    trials = sample_trials(n_trials)
+
+    mlflow.set_experiment("churn_prediction")
+    with mlflow.start_run(run_name="hyperparameter_search"):
+        start = time.perf_counter()
+        results, layout = run_search(X_train, y_train, trials, n_folds, cores)
+        wall_clock = time.perf_counter() - start
+        print(f"{len(trials)} trials x {n_folds} folds in {wall_clock:.1f}s "
+              f"({layout['workers']} workers x {layout['nthread']} threads)")
+
+        for t, result in enumerate(results):
+            with mlflow.start_run(run_name=f"trial_{t}", nested=True):
+                mlflow.log_params(result['params'])
+                mlflow.log_metrics({k: v for k, v in result.items() if k != 'params'})
+
+        best = max(results, key=lambda r: r['cv_auc_mean'])
+        print(f"Best CV AUC {best['cv_auc_mean']:.4f} +/- {best['cv_auc_std']:.4f}: {best['params']}")
+
+        # Refit on the whole training split with the CV-averaged number of rounds
+        params = dict(best['params'])
+        model = xgb.XGBClassifier(
+            n_estimators=best['best_iteration'], max_depth=params['max_depth'], learning_rate=params['eta'],
+            subsample=params['subsample'], colsample_bytree=params['colsample_bytree'],
+            min_child_weight=params['min_child_weight'], reg_lambda=params['lambda'],
+            tree_method='hist', eval_metric='logloss', n_jobs=cores or os.cpu_count(),
+        )
+        model.fit(pd.DataFrame(X_train, columns=feature_names), y_train)
+        X_test = pd.DataFrame(X_test, columns=feature_names)
+        probs = model.predict_proba(X_test)[:, 1]
+        acc = accuracy_score(y_test, model.predict(X_test))
+        auc = roc_auc_score(y_test, probs) if len(set(y_test)) > 1 else 0.5
+        print(f"Accuracy: {acc}")
+        print(f"AUC: {auc}")
+
+        mlflow.log_params({f"best_{k}": v for k, v in params.items()})
+        mlflow.log_metrics({'search_wall_clock_s': wall_clock, 'accuracy': acc, 'auc': auc,
+                            'workers': layout['workers'], 'nthread': layout['nthread']})
+        mlflow.xgboost.log_model(model, "model")
+
+        joblib.dump(model, model_path)
+        transformer.save(transformer_path_for(model_path))
+        fit_reference(data, transformer).save(reference_path_for(model_path))
+        print(f"Model saved to {model_path}")
+    return best
+
+
+def scaling_report(data_path=DEFAULT_DATA_PATH, n_trials=20, n_folds=5):
+    """Wall-clock of the same search at 1, 2, 4 ... cpu_count cores."""
+    X, y, _, _ = load_training_data(data_path)
+    trials = sample_trials(n_trials)
+    max_cores = os.cpu_count() or 1
+    core_counts = sorted({min(2 ** i, max_cores) for i in range(max_cores.bit_length() + 1)})
+    baseline = None
+    print(f"{'cores':>5} {'workers':>8} {'nthread':>8} {'wall s':>8} {'speedup':>8}")
+    for cores in core_counts:
+        start = time.perf_counter()
+        _, layout = run_search(X, y, trials, n_folds, cores)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{cores:>5} {layout['workers']:>8} {layout['nthread']:>8} {elapsed:8.1f} {baseline / elapsed:7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH)
+    parser.add_argument('--trials', type=int, default=40)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--cores', type=int, default=None)
+    parser.add_argument('--scaling', action='store_true', help="Report wall-clock vs core count instead of tuning")
+    args = parser.parse_args()
+
+    if args.scaling:
+        scaling_report(args.data, args.trials, args.folds)
+    else:
+        tune(args.data, args.trials, args.folds, args.cores)
+
+
+if __name__ == '__main__':
+    main()
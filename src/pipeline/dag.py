@@ -0,0 +1,245 @@
+"""
+Local DAG runner for the offline pipeline (stages are defined in workflow.py).
+
+A Stage declares the files it reads (`inputs`, including its own code), the
+stages it depends on (`deps`) and the files it writes (`outputs`). Its cache
+key hashes the stage name, params, input file contents and the output hashes
+of its dependencies, so a stage is skipped when the key matches its last
+successful run and its outputs are still on disk unchanged - and a dependency
+that re-ran but produced identical outputs does not invalidate it. Stages
+whose result is not a file (database writes) declare a `probe` instead: a
+cheap fingerprint of that state (e.g. row counts), re-checked on every run.
+
+Stages whose dependencies are done run concurrently on a thread pool (pandas,
+XGBoost and the embedding worker processes don't hold the GIL). Values
+returned by stages that ran are handed to dependents in memory; for skipped
+stages, `load` reads the persisted artifact (Parquet) the first time a
+dependent asks for it.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+# Bytes read per update when hashing files
+HASH_CHUNK = 1 << 20
+
+
+class Stage:
+    def __init__(self, name, run, deps=(), inputs=(), outputs=(), load=None, params=None, probe=None):
+        """
+        run(artifacts) -> value; artifacts[dep] is the value of dependency `dep`.
+        load() -> value rebuilds that value from `outputs` when the stage is skipped.
+        probe() -> JSON-serializable fingerprint of state outside `outputs`; the
+        stage re-runs when it differs from the value recorded after its last run.
+        """
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.load = load
+        self.params = params or {}
+        self.probe = probe
+
+    def check(self):
+        """Current probe value, None when there is no probe or it fails (e.g. the database is gone)."""
+        if self.probe is None:
+            return None
+        try:
+            return self.probe()
+        except Exception as e:
+            print(f"[{self.name}] probe failed: {e}")
+            return None
+
+
+class Artifacts:
+    """Stage values for dependents: in memory when the stage ran, loaded on first use when it was skipped."""
+
+    def __init__(self, stages):
+        self._stages = stages
+        self._values = {}
+        self._locks = {name: threading.Lock() for name in stages}
+
+    def set(self, name, value):
+        self._values[name] = value
+
+    def __getitem__(self, name):
+        with self._locks[name]:
+            if name not in self._values:
+                load = self._stages[name].load
+                self._values[name] = load() if load is not None else None
+            return self._values[name]
+
+
+class FileHasher:
+    """Content hashes, reused while a file's size and mtime are unchanged."""
+
+    def __init__(self, cache=None):
+        self.cache = cache or {}
+        self._lock = threading.Lock()
+
+    def digest(self, path):
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        with self._lock:
+            cached = self.cache.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with self._lock:
+            self.cache[path] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+
+class Pipeline:
+    def __init__(self, stages, state_dir, max_workers=None):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [d for d in stage.deps if d not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages {missing}")
+        self.state_dir = state_dir
+        self.state_path = os.path.join(state_dir, 'state.json')
+        self.runs_path = os.path.join(state_dir, 'runs.jsonl')
+        self.max_workers = max_workers or min(4, len(stages))
+
+    def plan(self, targets=None):
+        """Stages needed for `targets` (default: all), dependencies first."""
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through {name}")
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage {name}")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in targets or self.stages:
+            visit(name)
+        return order
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {'stages': {}, 'files': {}}
+        with open(self.state_path) as f:
+            return json.load(f)
+
+    def _save_state(self, state):
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def _cache_key(self, stage, state, hasher):
+        h = hashlib.blake2b(digest_size=16)
+        h.update(json.dumps([stage.name, stage.params], sort_keys=True, default=str).encode())
+        for path in stage.inputs:
+            h.update(f"{path}={hasher.digest(path)}".encode())
+        for dep in stage.deps:
+            record = state['stages'].get(dep, {})
+            # Content of what the dependency produced, not whether it re-ran
+            h.update(f"{dep}={json.dumps(record.get('outputs') or record.get('key'), sort_keys=True)}".encode())
+            if record.get('probe') is not None:
+                h.update(f"{dep}.probe={json.dumps(record['probe'], sort_keys=True)}".encode())
+        return h.hexdigest()
+
+    def _up_to_date(self, stage, key, state, hasher):
+        record = state['stages'].get(stage.name)
+        if not record or record.get('key') != key:
+            return False
+        if stage.probe is not None and (record.get('probe') is None or record['probe'] != stage.check()):
+            return False
+        recorded = record.get('outputs', {})
+        return all(recorded.get(path) is not None and recorded[path] == hasher.digest(path)
+                   for path in stage.outputs)
+
+    def run(self, targets=None, force=()):
+        """
+        Runs the stages needed for `targets`; `force` names stages to re-run even
+        when up to date. Returns {stage: {status, seconds, key}} with status
+        ran / skipped / failed / blocked, and appends it to runs.jsonl. A failed
+        stage blocks its dependents only; independent branches still run.
+        """
+        order = self.plan(targets)
+        state = self._load_state()
+        hasher = FileHasher(state.get('files'))
+        artifacts = Artifacts(self.stages)
+        results = {}
+        pending = list(order)
+        running = {}
+        started = time.perf_counter()
+        started_at = datetime.utcnow().isoformat()
+
+        def execute(stage):
+            begin = time.perf_counter()
+            value = stage.run(artifacts)
+            return value, time.perf_counter() - begin
+
+        with ThreadPoolExecutor(self.max_workers, thread_name_prefix='pipeline') as pool:
+            while pending or running:
+                for name in list(pending):
+                    stage = self.stages[name]
+                    dep_status = [results.get(d, {}).get('status') for d in stage.deps]
+                    if any(s in ('failed', 'blocked') for s in dep_status):
+                        results[name] = {'status': 'blocked', 'seconds': 0.0}
+                        pending.remove(name)
+                        print(f"[{name}] blocked (dependency failed)")
+                        continue
+                    if not all(s in ('ran', 'skipped') for s in dep_status):
+                        continue
+                    pending.remove(name)
+                    key = self._cache_key(stage, state, hasher)
+                    if name not in force and self._up_to_date(stage, key, state, hasher):
+                        results[name] = {'status': 'skipped', 'seconds': 0.0, 'key': key}
+                        print(f"[{name}] up to date, skipped")
+                        continue
+                    print(f"[{name}] running")
+                    running[pool.submit(execute, stage)] = (name, key)
+
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, key = running.pop(future)
+                    stage = self.stages[name]
+                    try:
+                        value, seconds = future.result()
+                    except Exception as e:
+                        traceback.print_exc()
+                        results[name] = {'status': 'failed', 'seconds': 0.0, 'key': key,
+                                         'error': f"{type(e).__name__}: {e}"}
+                        print(f"[{name}] FAILED: {e}")
+                        continue
+                    artifacts.set(name, value)
+                    outputs = {path: hasher.digest(path) for path in stage.outputs}
+                    state['stages'][name] = {'key': key, 'outputs': outputs, 'probe': stage.check(),
+                                             'seconds': seconds, 'finished_at': datetime.utcnow().isoformat()}
+                    state['files'] = hasher.cache
+                    self._save_state(state)
+                    results[name] = {'status': 'ran', 'seconds': seconds, 'key': key}
+                    print(f"[{name}] done in {seconds:.1f}s")
+
+        state['files'] = hasher.cache
+        self._save_state(state)
+        with open(self.runs_path, 'a') as f:
+            f.write(json.dumps({'started_at': started_at, 'wall_seconds': time.perf_counter() - started,
+                                'stages': results}) + '\n')
+        return results
@@ -0,0 +1,262 @@
+"""
+Offline pipeline: raw CSVs -> features -> churn model -> scores, and catalogue
+embeddings -> batch recommendations, plus seeding the database and caching
+the scores on the customers table. Replaces running build_features.py,
+train_churn_model.py, embed_catalogue.py and seed_db.py by hand.
+
+    raw -> features -> train -> score -> publish_scores
+    raw -> seed_db ----------------------> publish_scores
+    embeddings -> recommendations
+
+The raw CSVs are parsed once and kept as Parquet, so later runs and
+downstream stages read columnar files instead of re-parsing text. Stages whose
+inputs are unchanged are skipped (see dag.py; the database stages are
+re-checked with row-count probes); the embedding refresh runs
+alongside feature building and training. Stage timings go to
+data/processed/pipeline/runs.jsonl.
+
+    python -m src.pipeline.workflow                      # everything that changed
+    python -m src.pipeline.workflow --stages score       # score and what it needs
+    python -m src.pipeline.workflow --force train --skip embeddings recommendations
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.features.feature_transformer import transformer_path_for
+from src.pipeline.dag import Pipeline, Stage
+from src.services.drift_monitor import reference_path_for
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+RAW_DIR = os.path.join(BASE_DIR, 'data', 'raw')
+PROCESSED_DIR = os.path.join(BASE_DIR, 'data', 'processed')
+PIPELINE_DIR = os.path.join(PROCESSED_DIR, 'pipeline')
+MODEL_PATH = os.path.join(BASE_DIR, 'src', 'models', 'churn_model.pkl')
+
+RAW_TABLES = ('customers', 'transactions', 'events')
+# Stages whose outputs the API loads at startup
+SERVED_STAGES = ('train', 'embeddings')
+
+
+def src_path(*parts):
+    return os.path.join(BASE_DIR, 'src', *parts)
+
+
+def raw_parquet(table):
+    return os.path.join(PIPELINE_DIR, f"{table}.parquet")
+
+
+def features_parquet():
+    return os.path.join(PROCESSED_DIR, 'features.parquet')
+
+
+def scores_parquet():
+    return os.path.join(PIPELINE_DIR, 'churn_scores.parquet')
+
+
+def recommendations_parquet():
+    return os.path.join(PIPELINE_DIR, 'recommendations.parquet')
+
+
+# --- Stage functions ---
+
+def run_raw(artifacts):
+    os.makedirs(PIPELINE_DIR, exist_ok=True)
+    frames = {}
+    for table in RAW_TABLES:
+        frames[table] = pd.read_csv(os.path.join(RAW_DIR, f"{table}.csv"))
+        frames[table].to_parquet(raw_parquet(table), index=False)
+    return frames
+
+
+def load_raw():
+    return {table: pd.read_parquet(raw_parquet(table)) for table in RAW_TABLES}
+
+
+def run_features(artifacts):
+    from src.features.build_features import build_features
+
+    raw = artifacts['raw']
+    # build_features converts date columns in place; the raw frames are shared with seed_db
+    features = build_features(raw['customers'], raw['transactions'].copy(), raw['events'].copy())
+    features.to_parquet(features_parquet(), index=False)
+    # The standalone training/tuning scripts read the CSV
+    features.to_csv(os.path.join(PROCESSED_DIR, 'features.csv'), index=False)
+    return features
+
+
+def load_features():
+    return pd.read_parquet(features_parquet())
+
+
+def run_train(artifacts):
+    from src.models.train_churn_model import train_model
+
+    return train_model(artifacts['features'])
+
+
+def load_train():
+    import joblib
+    from src.features.feature_transformer import ChurnFeatureTransformer
+
+    model = joblib.load(MODEL_PATH)
+    return model, ChurnFeatureTransformer.load_for_model(MODEL_PATH, model)
+
+
+def run_score(artifacts):
+    from src.data.customer_index import risk_segments_for
+
+    features = artifacts['features']
+    model, transformer = artifacts['train']
+    probs = model.predict_proba(transformer.encode_frame(features))[:, 1]
+    scores = pd.DataFrame({
+        'customer_id': features['customer_id'].to_numpy(),
+        'churn_probability': probs.astype(np.float64),
+        'risk_segment': risk_segments_for(probs),
+    })
+    scores.to_parquet(scores_parquet(), index=False)
+    return scores
+
+
+def load_score():
+    return pd.read_parquet(scores_parquet())
+
+
+def run_seed_db(artifacts):
+    from src.utils.seed_db import seed_database
+
+    raw = artifacts['raw']
+    # Adds customers/transactions new in the raw data to an already seeded database
+    seed_database(raw['customers'], raw['transactions'], upsert=True)
+
+
+def probe_seed_db():
+    from src.utils.seed_db import row_counts
+
+    return row_counts()
+
+
+def run_publish_scores(artifacts):
+    """Caches the batch scores on the customers table (read by the offline campaign job)."""
+    from sqlalchemy import select, update
+    from src.data.database import SessionLocal
+    from src.data.models import Customer
+
+    scores = artifacts['score']
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        # Scored customers missing from the table (not seeded) are skipped; bulk UPDATE needs existing rows
+        known = set(db.execute(select(Customer.customer_id)).scalars())
+        rows = [{'customer_id': cid, 'churn_probability': float(p), 'risk_segment': seg, 'last_updated': now}
+                for cid, p, seg in zip(scores['customer_id'], scores['churn_probability'], scores['risk_segment'])
+                if cid in known]
+        if rows:
+            db.execute(update(Customer), rows)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Cached {len(rows)} churn scores in the database ({len(scores) - len(rows)} customers not in it).")
+
+
+def probe_publish_scores():
+    """Number of customers with a cached score; drops to 0 when the database is reset."""
+    from sqlalchemy import func, select
+    from src.data.database import SessionLocal
+    from src.data.models import Customer
+
+    db = SessionLocal()
+    try:
+        return db.execute(select(func.count()).where(Customer.churn_probability.is_not(None))).scalar_one()
+    finally:
+        db.close()
+
+
+def run_embeddings(artifacts, backend):
+    from src.models.embed_catalogue import run_embedding_job
+
+    return run_embedding_job(backend=backend)
+
+
+def run_recommendations(artifacts, backend, top_k):
+    from src.models.personalization import PersonalizationEngine
+
+    engine = PersonalizationEngine(embedding_backend=backend)
+    if engine.store is None:
+        raise RuntimeError("Embedding model not loaded; cannot compute recommendations")
+    customer_ids = engine.customers['customer_id'].astype(str).tolist()
+    rows, snapshot = engine.recommend_batch(customer_ids, top_k=top_k)
+    user, rank = np.nonzero(rows >= 0)
+    items = rows[user, rank]
+    recs = pd.DataFrame({
+        'customer_id': np.asarray(customer_ids, dtype=object)[user],
+        'rank': rank + 1,
+        'item_id': [snapshot.catalogue.item_id(i) for i in items],
+        'title': [snapshot.catalogue.titles[int(i)] for i in items],
+    })
+    recs.to_parquet(recommendations_parquet(), index=False)
+    return recs
+
+
+def load_recommendations():
+    return pd.read_parquet(recommendations_parquet())
+
+
+def build_pipeline(backend='torch', top_k=10, max_workers=None):
+    raw_csvs = [os.path.join(RAW_DIR, f"{table}.csv") for table in RAW_TABLES]
+    embeddings_manifest = os.path.join(PROCESSED_DIR, 'embeddings', 'manifest.json')
+    stages = [
+        Stage('raw', run_raw, inputs=raw_csvs, outputs=[raw_parquet(t) for t in RAW_TABLES], load=load_raw),
+        Stage('features', run_features, deps=['raw'],
+              inputs=[src_path('features', 'build_features.py')],
+              outputs=[features_parquet()], load=load_features),
+        Stage('train', run_train, deps=['features'],
+              inputs=[src_path('models', 'train_churn_model.py'), src_path('features', 'feature_transformer.py')],
+              outputs=[MODEL_PATH, transformer_path_for(MODEL_PATH), reference_path_for(MODEL_PATH)],
+              load=load_train),
+        Stage('score', run_score, deps=['features', 'train'], outputs=[scores_parquet()], load=load_score),
+        # Database stages: no files to check, the probes re-run them after a reset
+        Stage('seed_db', run_seed_db, deps=['raw'], inputs=[src_path('utils', 'seed_db.py')], probe=probe_seed_db),
+        Stage('publish_scores', run_publish_scores, deps=['score', 'seed_db'], probe=probe_publish_scores),
+        Stage('embeddings', lambda a: run_embeddings(a, backend),
+              inputs=[os.path.join(RAW_DIR, 'products.csv'), os.path.join(RAW_DIR, 'content.csv'),
+                      src_path('models', 'embed_catalogue.py')],
+              outputs=[embeddings_manifest], params={'backend': backend}),
+        Stage('recommendations', lambda a: run_recommendations(a, backend, top_k), deps=['embeddings'],
+              inputs=[os.path.join(RAW_DIR, 'interactions.csv'), os.path.join(RAW_DIR, 'customers_enhanced.csv'),
+                      src_path('models', 'personalization.py')],
+              outputs=[recommendations_parquet()], load=load_recommendations, params={'top_k': top_k}),
+    ]
+    return Pipeline(stages, PIPELINE_DIR, max_workers=max_workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stages', nargs='+', default=None, help="Target stages (default: all)")
+    parser.add_argument('--skip', nargs='+', default=[], help="Leave these stages out of the default targets")
+    parser.add_argument('--force', nargs='+', default=[], help="Re-run these stages even if up to date")
+    parser.add_argument('--backend', default=os.getenv('EMBEDDING_BACKEND', 'torch'),
+                        choices=['torch', 'onnx', 'onnx-int8'])
+    parser.add_argument('--top-k', type=int, default=10, help="Recommendations stored per customer")
+    parser.add_argument('--workers', type=int, default=None, help="Stages run concurrently")
+    args = parser.parse_args()
+
+    pipeline = build_pipeline(args.backend, args.top_k, args.workers)
+    targets = args.stages or [name for name in pipeline.stages if name not in args.skip]
+    results = pipeline.run(targets, force=set(args.force))
+
+    print(f"\n{'stage':<16} {'status':<8} {'seconds':>8}")
+    for name, result in results.items():
+        print(f"{name:<16} {result['status']:<8} {result['seconds']:8.2f}")
+    if any(results.get(name, {}).get('status') == 'ran' for name in SERVED_STAGES):
+        print("\nServed artifacts changed: restart the API to load them.")
+    if any(r['status'] in ('failed', 'blocked') for r in results.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
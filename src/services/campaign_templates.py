@@ -0,0 +1,289 @@
+"""
+Precompiled retention email templates (fallback when the LLM is unavailable,
+and bulk offline campaigns).
+
+Templates are written with named placeholders - {name}, {recommendations},
+{discount_code} - and compiled once at import into positional format strings,
+so rendering is a single str.format call per field with no parsing or dict
+building per email. There are two copy variants per risk segment; each
+customer is deterministically bucketed into one (A/B test) and the variant is
+recorded with the sent email (MarketingInteraction.template_variant).
+"""
+import hashlib
+import os
+import string
+import zlib
+
+# Bump to re-randomize variant assignment for a new test (shared by the API and offline campaigns)
+EXPERIMENT = os.getenv("CAMPAIGN_EXPERIMENT", "retention_fallback_v1")
+VARIANTS = ("A", "B")
+# Percentage of customers per variant
+VARIANT_WEIGHTS = (50, 50)
+_CUMULATIVE_WEIGHTS = [sum(VARIANT_WEIGHTS[:i + 1]) for i in range(len(VARIANT_WEIGHTS))]
+
+DEFAULT_SEGMENT = "MEDIUM"
+DEFAULT_NAME = "Valued Customer"
+DISCOUNT_CODES = {"HIGH": "COMEBACK30", "MEDIUM": "EXPLORE15", "LOW": "THANKYOU10"}
+
+# Order of the positional arguments every compiled template is formatted with
+FIELDS = ("name", "recommendations", "discount_code")
+
+TEMPLATE_SOURCES = {
+    ("HIGH", "A"): {
+        "subject_line": "🎁 {name}, Here's 30% OFF Just For You - Don't Miss Out!",
+        "email_body": """Dear {name},
+
+We've noticed it's been a while since your last visit, and honestly? We miss you!
+
+As one of our special customers, we want to offer you an EXCLUSIVE deal:
+
+🔥 **30% OFF Your Entire Order** 🔥
+Use code: {discount_code}
+
+But hurry - this offer expires in 48 hours!
+
+{recommendations}Here's what's waiting for you:
+✨ New arrivals handpicked based on your preferences
+✨ Free shipping on orders over $50
+✨ Priority customer support
+
+We value your loyalty and would love to have you back. This is our way of saying "thank you" for being part of our community.
+
+👉 [Shop Now and Save 30%]
+
+Questions? Reply to this email - we're here to help!
+
+Warm regards,
+The GrowthAI Team
+
+P.S. This exclusive offer is only available to select customers like you. Don't let it slip away!""",
+        "strategy": "Urgency-driven retention with significant discount (30%) and scarcity tactics for high-risk churning customers",
+    },
+    ("HIGH", "B"): {
+        "subject_line": "🎁 Wait! Here's 30% OFF Just For You - Don't Miss Out!",
+        "email_body": """Dear {name},
+
+We've noticed it's been a while since your last visit, and honestly? We miss you!
+
+🔥 **30% OFF Your Entire Order** 🔥
+Use code: {discount_code}
+
+But hurry - this offer expires in 48 hours!
+
+{recommendations}We value your loyalty and would love to have you back.
+
+👉 [Shop Now and Save 30%]
+
+Warm regards,
+The GrowthAI Team
+
+P.S. This exclusive offer is only available to select customers like you!""",
+        "strategy": "Urgency-driven retention with significant discount (30%) and scarcity tactics",
+    },
+    ("MEDIUM", "A"): {
+        "subject_line": "✨ {name}, Something Special is Waiting For You Inside...",
+        "email_body": """Hey {name}!
+
+We've been thinking about you! 💭
+
+While you were away, we've been busy adding some amazing new products and content that we think you'll absolutely LOVE.
+
+Here's what's new:
+🆕 Fresh arrivals in your favorite categories
+🎯 Personalized picks based on your taste
+⭐ Exclusive early access to upcoming releases
+
+{recommendations}And because you're awesome, here's a little something:
+
+💫 **15% OFF Your Next Purchase** 💫
+Use code: {discount_code}
+
+What are you waiting for? Come see what's new!
+
+👉 [Explore New Arrivals]
+
+We can't wait to show you what we've got!
+
+Cheers,
+The GrowthAI Team
+
+P.S. Your personalized recommendations are ready and waiting. Trust us, you don't want to miss these!""",
+        "strategy": "Curiosity-driven engagement with moderate incentive (15%) and personalization emphasis for medium-risk customers",
+    },
+    ("MEDIUM", "B"): {
+        "subject_line": "✨ Something Special is Waiting For You Inside...",
+        "email_body": """Hey {name}!
+
+We've been thinking about you! 💭
+
+While you were away, we've added amazing new products we think you'll LOVE.
+
+{recommendations}💫 **15% OFF Your Next Purchase** 💫
+Use code: {discount_code}
+
+👉 [Explore New Arrivals]
+
+Cheers,
+The GrowthAI Team""",
+        "strategy": "Curiosity-driven engagement with moderate incentive (15%)",
+    },
+    ("LOW", "A"): {
+        "subject_line": "💫 {name}, Your VIP Picks Are Ready! Plus a Special Thank You Gift",
+        "email_body": """Hello {name}!
+
+Just wanted to drop by and say THANK YOU for being such an amazing customer! 🙏
+
+Because you've been with us, we wanted to share some exclusive picks we think you'll love:
+
+🎯 **Curated Just For You:**
+Based on your unique taste, our AI has handpicked items we know you'll enjoy. These aren't random suggestions - they're personalized matches made just for you!
+
+{recommendations}As a token of our appreciation:
+
+🎁 **Enjoy 10% OFF** on your next order
+Use code: {discount_code}
+
+Plus, here's what else you get as a valued member:
+✅ Early access to sales
+✅ Free shipping on all orders
+✅ Exclusive member-only deals
+
+👉 [See Your Personalized Picks]
+
+Thanks for being part of our community. We truly appreciate you!
+
+Best wishes,
+The GrowthAI Team
+
+P.S. Keep an eye on your inbox - we've got some exciting surprises coming your way soon! 🎉""",
+        "strategy": "Appreciation-focused retention with loyalty recognition and light incentive (10%) to maintain engagement with low-risk customers",
+    },
+    ("LOW", "B"): {
+        "subject_line": "💫 Your VIP Picks Are Ready!",
+        "email_body": """Hello {name}!
+
+Thank you for being an amazing customer! 🙏
+
+{recommendations}🎁 **Enjoy 10% OFF** on your next order
+Use code: {discount_code}
+
+👉 [See Your Personalized Picks]
+
+Best wishes,
+The GrowthAI Team""",
+        "strategy": "Appreciation-focused retention with loyalty recognition",
+    },
+}
+
+
+class CompiledTemplate:
+    """One (segment, variant) template; subject/body are bound str.format methods taking FIELDS positionally."""
+
+    __slots__ = ("segment", "variant", "subject", "body", "strategy")
+
+    def __init__(self, segment, variant, source):
+        self.segment = segment
+        self.variant = variant
+        self.subject = _compile(source["subject_line"]).format
+        self.body = _compile(source["email_body"]).format
+        self.strategy = source["strategy"]
+
+
+def _compile(text):
+    """Validates placeholders and rewrites {name} style fields to positional {0} ones."""
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(text):
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        if field not in FIELDS or spec or conversion:
+            raise ValueError(f"Unsupported template placeholder: {{{field}}}")
+        parts.append("{%d}" % FIELDS.index(field))
+    return "".join(parts)
+
+
+TEMPLATES = {key: CompiledTemplate(*key, source) for key, source in TEMPLATE_SOURCES.items()}
+
+
+# Variant for each of the 100 hash buckets
+_BUCKET_VARIANTS = tuple(next((v for v, c in zip(VARIANTS, _CUMULATIVE_WEIGHTS) if bucket < c), VARIANTS[-1])
+                         for bucket in range(100))
+
+
+def assign_variant(customer_id, experiment=EXPERIMENT):
+    """Deterministic A/B bucket: the same customer always gets the same variant within an experiment."""
+    return _BUCKET_VARIANTS[zlib.crc32(f"{experiment}:{customer_id}".encode()) % 100]
+
+
+def discount_code(risk_segment, customer_id=None):
+    """Segment offer code; with a customer_id, a per-customer suffix so redemptions can be attributed."""
+    base = DISCOUNT_CODES.get(risk_segment, DISCOUNT_CODES[DEFAULT_SEGMENT])
+    if customer_id is None:
+        return base
+    return f"{base}-{hashlib.blake2b(str(customer_id).encode(), digest_size=4).hexdigest().upper()}"
+
+
+def recommendations_block(titles):
+    if not titles:
+        return ""
+    return "Picked just for you:\n" + "".join(f"👉 {title}\n" for title in titles) + "\n"
+
+
+def get_template(risk_segment, variant):
+    return TEMPLATES.get((risk_segment, variant)) or TEMPLATES[(DEFAULT_SEGMENT, variant)]
+
+
+def fill(template, customer_name, recommended_titles, code):
+    """Subject and body of one email from a resolved template and discount code."""
+    args = (customer_name or DEFAULT_NAME, recommendations_block(recommended_titles), code)
+    return template.subject(*args), template.body(*args)
+
+
+def render(risk_segment, customer_id=None, customer_name=None, recommended_titles=None,
+           variant=None, experiment=EXPERIMENT, unique_code=True):
+    """Renders one email; returns subject_line, email_body, strategy, template_variant, discount_code."""
+    if variant is None:
+        variant = assign_variant(customer_id, experiment) if customer_id is not None else VARIANTS[0]
+    template = get_template(risk_segment, variant)
+    code = discount_code(template.segment, customer_id if unique_code else None)
+    subject, body = fill(template, customer_name, recommended_titles, code)
+    return {
+        "subject_line": subject,
+        "email_body": body,
+        "strategy": template.strategy,
+        "template_variant": variant,
+        "discount_code": code,
+    }
+
+
+def render_bulk(customer_ids, risk_segments, customer_names=None, recommended_titles=None,
+                experiment=EXPERIMENT, unique_codes=True):
+    """
+    Renders one email per customer for offline campaigns, column by column with
+    the same helpers as render(): variants, templates and discount codes are
+    resolved in one pass each, then every email is filled. Inputs are parallel
+    sequences (names / title lists may be None). Returns a dict of equal-length
+    columns: customer_id, risk_segment, template_variant, discount_code,
+    subject_line, email_body, strategy.
+    """
+    n = len(customer_ids)
+    customer_ids = [str(c) for c in customer_ids]
+    names = customer_names if customer_names is not None else [None] * n
+    titles = recommended_titles if recommended_titles is not None else [None] * n
+
+    variants = [assign_variant(cid, experiment) for cid in customer_ids]
+    templates = [get_template(risk, variant) for risk, variant in zip(risk_segments, variants)]
+    if unique_codes:
+        codes = [discount_code(t.segment, cid) for t, cid in zip(templates, customer_ids)]
+    else:
+        codes = [DISCOUNT_CODES[t.segment] for t in templates]
+    emails = list(map(fill, templates, names, titles, codes))
+    return {
+        "customer_id": customer_ids,
+        "risk_segment": list(risk_segments),
+        "template_variant": variants,
+        "discount_code": codes,
+        "subject_line": [subject for subject, _ in emails],
+        "email_body": [body for _, body in emails],
+        "strategy": [t.strategy for t in templates],
+    }
@@ -0,0 +1,220 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from src.features.feature_transformer import CATEGORICAL_FEATURE
+
+# Population stability index bands (industry rule of thumb)
+PSI_WARN = 0.1
+PSI_ALERT = 0.25
+PSI_EPSILON = 1e-4
+DEFAULT_BINS = 10
+FORMAT_VERSION = 1
+
+
+def reference_path_for(model_path):
+    """churn_model.pkl -> churn_model.drift.json (training reference saved next to the model)."""
+    return os.path.splitext(model_path)[0] + '.drift.json'
+
+
+def psi(reference_counts, current_counts):
+    """Population stability index between two aligned count vectors."""
+    ref = np.asarray(reference_counts, dtype=np.float64) + PSI_EPSILON
+    cur = np.asarray(current_counts, dtype=np.float64) + PSI_EPSILON
+    ref /= ref.sum()
+    cur /= cur.sum()
+    return float(np.sum((cur - ref) * np.log(cur / ref)))
+
+
+def drift_status(value):
+    if value >= PSI_ALERT:
+        return 'ALERT'
+    if value >= PSI_WARN:
+        return 'WARN'
+    return 'OK'
+
+
+class NumericSketch:
+    """
+    Fixed-edge histogram: interior edges come from reference quantiles, plus an
+    open bin on each side and a missing-value bin. Counts are additive, so
+    sketches merge and individual rows can be added or retracted.
+    """
+
+    def __init__(self, edges, counts=None):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = (np.zeros(len(self.edges) + 2, dtype=np.int64) if counts is None
+                       else np.asarray(counts, dtype=np.int64))
+
+    @classmethod
+    def from_values(cls, values, bins=DEFAULT_BINS):
+        values = np.asarray(values, dtype=np.float64)
+        finite = values[np.isfinite(values)]
+        edges = np.unique(np.quantile(finite, np.linspace(0, 1, bins + 1)[1:-1])) if len(finite) else []
+        return cls(edges)
+
+    def bin(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        codes = np.searchsorted(self.edges, values, side='right')
+        codes[np.isnan(values)] = len(self.edges) + 1
+        return codes
+
+    def add_codes(self, codes, sign=1):
+        self.counts += sign * np.bincount(codes, minlength=len(self.counts))
+
+    def add(self, values):
+        self.add_codes(self.bin(values))
+
+    def empty_like(self):
+        return NumericSketch(self.edges)
+
+
+class DriftReference:
+    """Training-time feature distribution, saved next to the model."""
+
+    def __init__(self, numeric, categorical, n_rows=0, created_at=None):
+        self.numeric = numeric            # feature -> NumericSketch
+        self.categorical = categorical    # feature -> {value: count}
+        self.n_rows = n_rows
+        self.created_at = created_at or datetime.utcnow().isoformat()
+
+    @classmethod
+    def from_sample(cls, frame, numeric_features, categorical_features, bins=DEFAULT_BINS):
+        """Empty reference whose bin edges are `frame`'s quantiles (counts come from update())."""
+        return cls({f: NumericSketch.from_values(frame[f], bins) for f in numeric_features},
+                   {f: {} for f in categorical_features})
+
+    @classmethod
+    def fit(cls, frame, numeric_features, categorical_features, bins=DEFAULT_BINS):
+        reference = cls.from_sample(frame, numeric_features, categorical_features, bins)
+        reference.update(frame)
+        return reference
+
+    def update(self, frame):
+        """Adds more training rows (e.g. further chunks) to the reference counts."""
+        for feature, sketch in self.numeric.items():
+            sketch.add(frame[feature].to_numpy(np.float64))
+        for feature, counts in self.categorical.items():
+            for value, count in frame[feature].fillna('').astype(str).value_counts().items():
+                counts[value] = counts.get(value, 0) + int(count)
+        self.n_rows += len(frame)
+
+    def to_dict(self):
+        return {
+            'version': FORMAT_VERSION,
+            'created_at': self.created_at,
+            'n_rows': self.n_rows,
+            'numeric': {f: {'edges': s.edges.tolist(), 'counts': s.counts.tolist()} for f, s in self.numeric.items()},
+            'categorical': self.categorical,
+        }
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            spec = json.load(f)
+        if spec.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported drift reference version: {spec.get('version')}")
+        numeric = {f: NumericSketch(s['edges'], s['counts']) for f, s in spec['numeric'].items()}
+        return cls(numeric, spec['categorical'], spec['n_rows'], spec['created_at'])
+
+
+class DriftMonitor:
+    """
+    Live feature distribution of the scored population versus the training reference.
+
+    Fed with recomputed feature rows (EventIngestionService feature listener). The
+    bin code and category of each customer's previous row are remembered, so a
+    rescore retracts the old row and adds the new one: the sketches always
+    describe the current population without rescanning it.
+    """
+
+    def __init__(self, reference):
+        self.reference = reference
+        self.numeric_features = list(reference.numeric)
+        self.categorical_features = list(reference.categorical)
+        self.numeric = {f: s.empty_like() for f, s in reference.numeric.items()}
+        self.categorical = {f: {} for f in self.categorical_features}
+        self._state = {}    # customer_id -> (numeric bin codes, categorical values)
+        self._lock = threading.Lock()
+        self.updated_at = None
+
+    def update(self, rows):
+        """Applies recomputed feature dicts (must contain customer_id)."""
+        if not rows:
+            return
+        codes = np.column_stack([
+            self.numeric[f].bin(np.array([np.nan if r.get(f) is None else r[f] for r in rows], dtype=np.float64))
+            for f in self.numeric_features
+        ]) if self.numeric_features else np.empty((len(rows), 0), dtype=np.int64)
+        categories = [tuple('' if r.get(f) is None else str(r[f]) for f in self.categorical_features) for r in rows]
+
+        with self._lock:
+            old_rows = []
+            for i, row in enumerate(rows):
+                previous = self._state.get(row['customer_id'])
+                if previous is not None:
+                    old_rows.append(previous)
+                self._state[row['customer_id']] = (codes[i], categories[i])
+            for j, feature in enumerate(self.numeric_features):
+                sketch = self.numeric[feature]
+                sketch.add_codes(codes[:, j])
+                if old_rows:
+                    sketch.add_codes(np.array([old[0][j] for old in old_rows], dtype=np.int64), sign=-1)
+            for j, feature in enumerate(self.categorical_features):
+                counts = self.categorical[feature]
+                for values in categories:
+                    counts[values[j]] = counts.get(values[j], 0) + 1
+                for old in old_rows:
+                    counts[old[1][j]] -= 1
+            self.updated_at = datetime.utcnow().isoformat()
+
+    def report(self):
+        with self._lock:
+            features = {}
+            for feature in self.numeric_features:
+                value = psi(self.reference.numeric[feature].counts, self.numeric[feature].counts)
+                features[feature] = {'type': 'numeric', 'psi': value, 'status': drift_status(value),
+                                     'bin_edges': self.numeric[feature].edges.tolist(),
+                                     'reference_counts': self.reference.numeric[feature].counts.tolist(),
+                                     'current_counts': self.numeric[feature].counts.tolist()}
+            for feature in self.categorical_features:
+                reference = self.reference.categorical[feature]
+                current = {k: v for k, v in self.categorical[feature].items() if v > 0}
+                values = sorted(set(reference) | set(current))
+                value = psi([reference.get(v, 0) for v in values], [current.get(v, 0) for v in values])
+                unseen = {v: n for v, n in current.items() if v not in reference}
+                total = sum(current.values())
+                features[feature] = {'type': 'categorical', 'psi': value, 'status': drift_status(value),
+                                     'unseen_values': unseen,
+                                     'unseen_share': sum(unseen.values()) / total if total else 0.0,
+                                     'current_frequencies': current}
+            return {
+                'reference_rows': self.reference.n_rows,
+                'reference_created_at': self.reference.created_at,
+                'current_rows': len(self._state),
+                'updated_at': self.updated_at,
+                'features': features,
+            }
+
+    def alerts(self):
+        report = self.report()
+        return [{'feature': name, 'psi': f['psi'], 'status': f['status']}
+                for name, f in report['features'].items() if f['status'] != 'OK']
+
+
+def fit_reference(frame, transformer, bins=DEFAULT_BINS, count=True):
+    """
+    Reference over the model's raw inputs: numeric features + the categorical column.
+    With count=False only the bin edges are taken from `frame` (chunked training).
+    """
+    build = DriftReference.fit if count else DriftReference.from_sample
+    return build(frame, transformer.numeric_features, [CATEGORICAL_FEATURE], bins)
@@ -0,0 +1,155 @@
+import queue
+import threading
+import time
+from datetime import datetime
+
+
+class InProcessEventQueue:
+    """
+    Local stand-in for a message broker topic (Kafka/PubSub).
+    Producers publish event dicts, a single consumer drains them in batches.
+    """
+
+    def __init__(self, maxsize=100_000):
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def publish(self, events):
+        """Enqueues events; raises queue.Full when the consumer is falling behind."""
+        for event in events:
+            self._queue.put_nowait(event)
+
+    def consume(self, max_batch=500, timeout=0.5):
+        """Blocks up to `timeout` for the first event, then drains what is already queued."""
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def qsize(self):
+        return self._queue.qsize()
+
+
+class EventIngestionService:
+    """
+    Consumes transaction/login/interaction events, updates the rolling feature
+    store and re-scores only the customers whose features changed.
+
+    `scorer` takes a list of feature dicts and returns churn probabilities;
+    `risk_segmenter` maps a probability to LOW/MEDIUM/HIGH.
+    """
+
+    def __init__(self, feature_store, scorer, risk_segmenter, event_queue=None):
+        self.feature_store = feature_store
+        self.scorer = scorer
+        self.risk_segmenter = risk_segmenter
+        self.queue = event_queue or InProcessEventQueue()
+        self.scores = {}
+        self.interaction_listeners = []
+        self.score_listeners = []
+        self.feature_listeners = []
+        self.stats = {'events_processed': 0, 'customers_rescored': 0, 'batches': 0}
+        self._scores_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_interaction_listener(self, callback):
+        """Registers callback(list_of_interaction_events), e.g. for recsys updates."""
+        self.interaction_listeners.append(callback)
+
+    def add_score_listener(self, callback):
+        """Registers callback(list_of_score_dicts), called after every rescore."""
+        self.score_listeners.append(callback)
+
+    def add_feature_listener(self, callback):
+        """Registers callback(list_of_feature_dicts) with the recomputed rows of every rescore."""
+        self.feature_listeners.append(callback)
+
+    def submit(self, events):
+        self.queue.publish(events)
+
+    def process_batch(self, events):
+        """Synchronously applies events and re-scores the affected customers."""
+        if not events:
+            return set()
+        affected, day_rolled = self.feature_store.apply_events(events)
+        if day_rolled:
+            # recency_days moved for everybody - fall back to a single vectorized full rescore
+            affected = set(self.feature_store.customer_ids())
+
+        interactions = [e for e in events if e['event_type'] == 'interaction']
+        if interactions:
+            for listener in self.interaction_listeners:
+                try:
+                    listener(interactions)
+                except Exception as e:
+                    print(f"Interaction listener failed: {e}")
+
+        self.rescore(affected)
+        self.stats['events_processed'] += len(events)
+        self.stats['batches'] += 1
+        return affected
+
+    def rescore(self, customer_ids=None):
+        rows = self.feature_store.feature_rows(customer_ids)
+        if not rows:
+            return
+        for listener in self.feature_listeners:
+            try:
+                listener(rows)
+            except Exception as e:
+                print(f"Feature listener failed: {e}")
+        probs = self.scorer(rows)
+        scored_at = datetime.utcnow().isoformat()
+        updated = [{
+            'customer_id': row['customer_id'],
+            'churn_probability': float(prob),
+            'risk_segment': self.risk_segmenter(float(prob)),
+            'scored_at': scored_at,
+        } for row, prob in zip(rows, probs)]
+        with self._scores_lock:
+            for score in updated:
+                self.scores[score['customer_id']] = score
+        self.stats['customers_rescored'] += len(rows)
+        for listener in self.score_listeners:
+            listener(updated)
+
+    def get_score(self, customer_id):
+        with self._scores_lock:
+            return self.scores.get(customer_id)
+
+    def customers_in_segment(self, risk_segment):
+        with self._scores_lock:
+            return [cid for cid, score in self.scores.items() if score['risk_segment'] == risk_segment]
+
+    # --- Background consumer ---
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="event-ingestion", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self.queue.consume()
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                affected = self.process_batch(batch)
+                self.stats['last_batch_ms'] = (time.perf_counter() - started) * 1000
+                self.stats['last_batch_customers'] = len(affected)
+            except Exception as e:
+                print(f"Event batch failed: {e}")
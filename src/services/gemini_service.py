@@ -1,11 +1,147 @@
 import os
+import re
+import time
 from google import genai
 
+from src.services import campaign_templates
+
 # You will need to set this env var: set/export GEMINI_API_KEY=...
 # Or pass it in directly for now if testing
 
+GEMINI_MODEL = "gemini-2.0-flash"
+
+# Streaming completions put the email body first and these trailer lines last,
+# so the body can be forwarded token by token before subject/strategy exist
+TRAILER_MARKER = "\n###"
+TRAILER_PATTERN = re.compile(r'^###\s*(SUBJECT|STRATEGY)\s*:\s*(.*)$', re.MULTILINE | re.IGNORECASE)
+
+# Output instructions for the two ways the prompt is answered
+JSON_OUTPUT = """Return ONLY a valid JSON object (no markdown, no code blocks) with these exact keys:
+        {
+            "subject_line": "email subject here",
+            "email_body": "full email body here with proper formatting",
+            "strategy": "brief explanation of the retention strategy used"
+        }"""
+STREAM_OUTPUT = """Output format (plain text, no JSON, no markdown code blocks):
+        the full email body first, then exactly these two lines at the very end:
+        ### SUBJECT: <email subject>
+        ### STRATEGY: <brief explanation of the retention strategy used>"""
+
+
+def retention_prompt(risk_segment, context, output_format):
+    """Copywriter prompt shared by the one-shot (JSON_OUTPUT) and streaming (STREAM_OUTPUT) calls."""
+    return f"""
+        You are an expert retention marketing copywriter.
+        
+        Task: Write a personalized retention email for a customer.
+        
+        Risk Level: {risk_segment}
+        Context: {context}
+        
+        Guidelines:
+        - HIGH risk: Offer significant discount (25-30%), urgent but not desperate tone
+        - MEDIUM risk: Highlight new features/products, moderate incentive (10-15% off)
+        - LOW risk: Focus on personalized recommendations, loyalty appreciation
+        
+        {output_format}
+        """
+
+
+class CampaignStreamParser:
+    """
+    Incremental parser for streamed campaign completions.
+
+    feed() returns the part of the body that is safe to emit: text is held back
+    while it could still be the start of the trailer marker. After the marker
+    everything is buffered for result(), which parses SUBJECT/STRATEGY.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.emitted = 0
+        self.body_end = None
+
+    def _find_marker(self):
+        if self.text.startswith(TRAILER_MARKER[1:]):
+            return 0
+        pos = self.text.find(TRAILER_MARKER, max(0, self.emitted - len(TRAILER_MARKER)))
+        return pos if pos >= 0 else None
+
+    def feed(self, chunk):
+        self.text += chunk
+        if self.body_end is not None:
+            return ""
+        marker = self._find_marker()
+        if marker is not None:
+            self.body_end = marker
+            safe = marker
+        else:
+            safe = max(self.emitted, len(self.text) - len(TRAILER_MARKER) + 1)
+        out = self.text[self.emitted:safe]
+        self.emitted = safe
+        return out
+
+    def flush(self):
+        """Body text still held back when the stream ends without trailers."""
+        if self.body_end is not None:
+            return ""
+        out = self.text[self.emitted:]
+        self.emitted = len(self.text)
+        return out
+
+    def result(self):
+        body_end = len(self.text) if self.body_end is None else self.body_end
+        trailers = {key.lower(): value.strip() for key, value in TRAILER_PATTERN.findall(self.text[body_end:])}
+        return {
+            "subject_line": trailers.get("subject") or "Special Offer",
+            "email_body": self.text[:body_end].strip(),
+            "strategy": trailers.get("strategy") or "AI-generated retention strategy",
+            "template_variant": None,
+        }
+
+
+class FakeStreamingLLM:
+    """
+    Local stand-in for the Gemini streaming API (LLM_BACKEND=fake): replays a
+    canned completion in the streaming format word by word, after a simulated
+    time-to-first-token. Lets the streaming path be run and timed without a key.
+    """
+
+    def __init__(self, first_token_delay=None, token_delay=None):
+        self.first_token_delay = (float(os.getenv("FAKE_LLM_FIRST_TOKEN_MS", 150)) / 1000
+                                  if first_token_delay is None else first_token_delay)
+        self.token_delay = (float(os.getenv("FAKE_LLM_TOKEN_MS", 25)) / 1000
+                            if token_delay is None else token_delay)
+
+    def completion(self, prompt):
+        recommended = re.search(r"Recommended for you: (.*)", prompt)
+        picks = f"We picked these with you in mind: {recommended.group(1).strip()}.\n\n" if recommended else ""
+        return (
+            "Hi there,\n\n"
+            "It's been a little while, and we wanted to check in. "
+            "A lot has changed since your last visit, and we think you'll like what's new.\n\n"
+            f"{picks}"
+            "As a thank you for being with us, here's 20% off your next order with code WELCOME20.\n\n"
+            "Warm regards,\nThe GrowthAI Team\n"
+            "### SUBJECT: We saved something for you\n"
+            "### STRATEGY: Personalized win-back with recommended items and a time-limited 20% incentive\n"
+        )
+
+    def stream(self, prompt):
+        time.sleep(self.first_token_delay)
+        for token in re.findall(r"\S+\s*|\s+", self.completion(prompt)):
+            yield token
+            time.sleep(self.token_delay)
+
+
 class GeminiRetentionService:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, llm=None):
+        """`llm`: object with stream(prompt) -> text chunks, used instead of Gemini (e.g. FakeStreamingLLM)."""
+        self.llm = llm
+        if self.llm is None and os.getenv("LLM_BACKEND") == "fake":
+            self.llm = FakeStreamingLLM()
+        if self.llm is not None:
+            print("Using local fake streaming LLM for campaign generation.")
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             print("WARNING: GEMINI_API_KEY not found. AI features will be disabled.")
@@ -19,133 +155,32 @@ class GeminiRetentionService:
             print(f"Failed to initialize Gemini: {e}")
             self.client = None
 
-    def generate_retention_content(self, risk_segment: str, context: str) -> dict:
+    def generate_retention_content(self, risk_segment: str, context: str, customer_id: str = None,
+                                   customer_name: str = None, recommended_titles: list = None,
+                                   experiment: str = campaign_templates.EXPERIMENT) -> dict:
         """
         Generates retention email content using Gemini AI.
-        Returns dict with subject_line, email_body, strategy
+        Returns dict with subject_line, email_body, strategy and template_variant
+        (None for LLM-written copy). The customer fields personalize the
+        fallback template; customer_id and experiment pick its A/B variant.
         """
-        if not self.client:
-            # Fallback when Gemini is not available - Professional marketing emails
-            fallback_emails = {
-                "HIGH": {
-                    "subject_line": "🎁 Wait! Here's 30% OFF Just For You - Don't Miss Out!",
-                    "email_body": """Dear Valued Customer,
-
-We've noticed it's been a while since your last visit, and honestly? We miss you!
-
-As one of our special customers, we want to offer you an EXCLUSIVE deal:
-
-🔥 **30% OFF Your Entire Order** 🔥
-Use code: COMEBACK30
-
-But hurry - this offer expires in 48 hours!
-
-Here's what's waiting for you:
-✨ New arrivals handpicked based on your preferences
-✨ Free shipping on orders over $50
-✨ Priority customer support
-
-We value your loyalty and would love to have you back. This is our way of saying "thank you" for being part of our community.
-
-👉 [Shop Now and Save 30%]
-
-Questions? Reply to this email - we're here to help!
-
-Warm regards,
-The GrowthAI Team
-
-P.S. This exclusive offer is only available to select customers like you. Don't let it slip away!""",
-                    "strategy": "Urgency-driven retention with significant discount (30%) and scarcity tactics for high-risk churning customers"
-                },
-                "MEDIUM": {
-                    "subject_line": "✨ Something Special is Waiting For You Inside...",
-                    "email_body": """Hey there!
-
-We've been thinking about you! 💭
-
-While you were away, we've been busy adding some amazing new products and content that we think you'll absolutely LOVE.
-
-Here's what's new:
-🆕 Fresh arrivals in your favorite categories
-🎯 Personalized picks based on your taste
-⭐ Exclusive early access to upcoming releases
-
-And because you're awesome, here's a little something:
-
-💫 **15% OFF Your Next Purchase** 💫
-Use code: EXPLORE15
-
-What are you waiting for? Come see what's new!
-
-👉 [Explore New Arrivals]
-
-We can't wait to show you what we've got!
-
-Cheers,
-The GrowthAI Team
-
-P.S. Your personalized recommendations are ready and waiting. Trust us, you don't want to miss these!""",
-                    "strategy": "Curiosity-driven engagement with moderate incentive (15%) and personalization emphasis for medium-risk customers"
-                },
-                "LOW": {
-                    "subject_line": "💫 Your VIP Picks Are Ready! Plus a Special Thank You Gift",
-                    "email_body": """Hello!
-
-Just wanted to drop by and say THANK YOU for being such an amazing customer! 🙏
-
-Because you've been with us, we wanted to share some exclusive picks we think you'll love:
+        personalization = {"customer_id": customer_id, "customer_name": customer_name,
+                           "recommended_titles": recommended_titles, "experiment": experiment}
+        if self.llm is not None:
+            # Same completion as the streaming variant, collected
+            for event, payload in self.stream_retention_content(risk_segment, context, **personalization):
+                if event == "done":
+                    return payload
 
-🎯 **Curated Just For You:**
-Based on your unique taste, our AI has handpicked items we know you'll enjoy. These aren't random suggestions - they're personalized matches made just for you!
-
-As a token of our appreciation:
-
-🎁 **Enjoy 10% OFF** on your next order
-Use code: THANKYOU10
-
-Plus, here's what else you get as a valued member:
-✅ Early access to sales
-✅ Free shipping on all orders
-✅ Exclusive member-only deals
-
-👉 [See Your Personalized Picks]
-
-Thanks for being part of our community. We truly appreciate you!
-
-Best wishes,
-The GrowthAI Team
-
-P.S. Keep an eye on your inbox - we've got some exciting surprises coming your way soon! 🎉""",
-                    "strategy": "Appreciation-focused retention with loyalty recognition and light incentive (10%) to maintain engagement with low-risk customers"
-                }
-            }
-            return fallback_emails.get(risk_segment, fallback_emails["MEDIUM"])
+        if not self.client:
+            return self._fallback_content(risk_segment, personalization)
 
         # Use Gemini for AI-generated content
-        prompt = f"""
-        You are an expert retention marketing copywriter.
-        
-        Task: Write a personalized retention email for a customer.
-        
-        Risk Level: {risk_segment}
-        Context: {context}
-        
-        Guidelines:
-        - HIGH risk: Offer significant discount (25-30%), urgent but not desperate tone
-        - MEDIUM risk: Highlight new features/products, moderate incentive (10-15% off)
-        - LOW risk: Focus on personalized recommendations, loyalty appreciation
-        
-        Return ONLY a valid JSON object (no markdown, no code blocks) with these exact keys:
-        {{
-            "subject_line": "email subject here",
-            "email_body": "full email body here with proper formatting",
-            "strategy": "brief explanation of the retention strategy used"
-        }}
-        """
+        prompt = retention_prompt(risk_segment, context, JSON_OUTPUT)
 
         try:
             response = self.client.models.generate_content(
-                model="gemini-2.0-flash",
+                model=GEMINI_MODEL,
                 contents=prompt
             )
             clean_text = response.text.strip()
@@ -161,71 +196,53 @@ P.S. Keep an eye on your inbox - we've got some exciting surprises coming your w
             return {
                 "subject_line": result.get("subject_line", "Special Offer"),
                 "email_body": result.get("email_body", "Check out our latest offers!"),
-                "strategy": result.get("strategy", "AI-generated retention strategy")
+                "strategy": result.get("strategy", "AI-generated retention strategy"),
+                "template_variant": None,
             }
         except Exception as e:
             print(f"Gemini Error: {e}")
-            # Return professional fallback templates
-            fallback_emails = {
-                "HIGH": {
-                    "subject_line": "🎁 Wait! Here's 30% OFF Just For You - Don't Miss Out!",
-                    "email_body": """Dear Valued Customer,
-
-We've noticed it's been a while since your last visit, and honestly? We miss you!
-
-As one of our special customers, we want to offer you an EXCLUSIVE deal:
-
-🔥 **30% OFF Your Entire Order** 🔥
-Use code: COMEBACK30
-
-But hurry - this offer expires in 48 hours!
-
-Here's what's waiting for you:
-✨ New arrivals handpicked based on your preferences
-✨ Free shipping on orders over $50
-✨ Priority customer support
-
-We value your loyalty and would love to have you back.
-
-👉 [Shop Now and Save 30%]
-
-Warm regards,
-The GrowthAI Team
-
-P.S. This exclusive offer is only available to select customers like you!""",
-                    "strategy": "Urgency-driven retention with significant discount (30%) and scarcity tactics"
-                },
-                "MEDIUM": {
-                    "subject_line": "✨ Something Special is Waiting For You Inside...",
-                    "email_body": """Hey there!
-
-We've been thinking about you! 💭
-
-While you were away, we've added amazing new products we think you'll LOVE.
+            return self._fallback_content(risk_segment, personalization)
 
-💫 **15% OFF Your Next Purchase** 💫
-Use code: EXPLORE15
+    def _fallback_content(self, risk_segment, personalization):
+        """Precompiled template email (see campaign_templates.py) when Gemini is not available."""
+        return campaign_templates.render(risk_segment, **personalization)
 
-👉 [Explore New Arrivals]
-
-Cheers,
-The GrowthAI Team""",
-                    "strategy": "Curiosity-driven engagement with moderate incentive (15%)"
-                },
-                "LOW": {
-                    "subject_line": "💫 Your VIP Picks Are Ready!",
-                    "email_body": """Hello!
-
-Thank you for being an amazing customer! 🙏
-
-🎁 **Enjoy 10% OFF** on your next order
-Use code: THANKYOU10
+    def _stream_completion(self, prompt):
+        if self.llm is not None:
+            yield from self.llm.stream(prompt)
+            return
+        for chunk in self.client.models.generate_content_stream(model=GEMINI_MODEL, contents=prompt):
+            if chunk.text:
+                yield chunk.text
 
-👉 [See Your Personalized Picks]
+    def stream_retention_content(self, risk_segment: str, context: str, customer_id: str = None,
+                                 customer_name: str = None, recommended_titles: list = None,
+                                 experiment: str = campaign_templates.EXPERIMENT):
+        """
+        Streaming variant of generate_retention_content. Yields ("token", text)
+        events as the email body arrives, then one ("done", result) event with
+        subject_line, email_body and strategy parsed from the full completion.
+        On failure the fallback template is sent as the final result.
+        """
+        personalization = {"customer_id": customer_id, "customer_name": customer_name,
+                           "recommended_titles": recommended_titles, "experiment": experiment}
+        if self.llm is None and not self.client:
+            result = self._fallback_content(risk_segment, personalization)
+            yield "token", result["email_body"]
+            yield "done", result
+            return
 
-Best wishes,
-The GrowthAI Team""",
-                    "strategy": "Appreciation-focused retention with loyalty recognition"
-                }
-            }
-            return fallback_emails.get(risk_segment, fallback_emails["MEDIUM"])
+        parser = CampaignStreamParser()
+        try:
+            for chunk in self._stream_completion(retention_prompt(risk_segment, context, STREAM_OUTPUT)):
+                text = parser.feed(chunk)
+                if text:
+                    yield "token", text
+            tail = parser.flush()
+            if tail:
+                yield "token", tail
+            yield "done", parser.result()
+        except Exception as e:
+            print(f"Gemini Error: {e}")
+            yield "error", str(e)
+            yield "done", self._fallback_content(risk_segment, personalization)
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# Latency samples kept per task kind for the percentile metrics
+METRICS_WINDOW = 4096
+
+
+class ExecutorOverloaded(Exception):
+    """Raised when the inference queue is full or a task waited past its deadline."""
+
+
+def plan_threads(workers=None, cores=None, processes=None):
+    """
+    Splits this process's share of the machine into (executor workers, intra-op threads
+    per worker). `processes` defaults to WEB_CONCURRENCY, so N gunicorn workers x
+    executor workers x intra-op threads never exceeds the core count.
+    """
+    cores = cores or os.cpu_count() or 1
+    processes = processes or int(os.environ.get('WEB_CONCURRENCY', 1))
+    per_process = max(1, cores // max(1, processes))
+    workers = workers or per_process
+    return workers, max(1, per_process // workers)
+
+
+class _KindMetrics:
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.queue_wait_ms = deque(maxlen=METRICS_WINDOW)
+        self.service_ms = deque(maxlen=METRICS_WINDOW)
+
+    def summary(self):
+        out = {k: getattr(self, k) for k in ('submitted', 'completed', 'failed', 'rejected', 'expired')}
+        for name in ('queue_wait_ms', 'service_ms'):
+            samples = np.fromiter(getattr(self, name), dtype=np.float64)
+            for p in (50, 95, 99):
+                out[f"{name[:-3]}_p{p}_ms"] = float(np.percentile(samples, p)) if len(samples) else 0.0
+        return out
+
+
+class InferenceExecutor:
+    """
+    Fixed pool of inference threads in front of the CPU-bound model calls
+    (recommendation scoring, churn predict_proba, SHAP).
+
+    Handlers submit work instead of running it on the event loop or on
+    Starlette's 40-thread default pool. The queue in front of the workers is
+    bounded: when it is full, submit() raises ExecutorOverloaded straight away
+    (the API answers 503), and a task that already waited longer than
+    `max_queue_wait` seconds is dropped instead of run, so latency under
+    overload stays bounded instead of growing with the backlog.
+
+    Threads rather than processes: the catalogue, embeddings and models are
+    shared in-process, and NumPy/BLAS, torch and XGBoost release the GIL
+    while they compute. Their intra-op pools are capped with configure_threads()
+    so workers x intra-op threads matches the cores this process owns.
+    """
+
+    def __init__(self, workers=None, intra_op_threads=None, max_queue=64, max_queue_wait=None, cores=None):
+        planned_workers, planned_threads = plan_threads(workers, cores)
+        self.workers = planned_workers
+        self.intra_op_threads = intra_op_threads or planned_threads
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._metrics = {}
+        self._metrics_lock = threading.Lock()
+        self._busy = 0
+
+    def configure_threads(self):
+        """Caps BLAS (NumPy) and torch intra-op pools for the whole process."""
+        try:
+            from threadpoolctl import threadpool_limits
+            threadpool_limits(limits=self.intra_op_threads)
+        except ImportError:
+            pass
+        # Only when a torch embedding backend is in use; don't import torch for ONNX serving
+        if 'torch' in sys.modules:
+            sys.modules['torch'].set_num_threads(self.intra_op_threads)
+
+    def budget_xgboost(self, model):
+        """Sets the XGBoost predict thread count on a loaded (sklearn API) model."""
+        if model is not None and hasattr(model, 'set_params'):
+            model.set_params(n_jobs=self.intra_op_threads)
+        return model
+
+    def start(self):
+        # Threads don't survive fork: start per (gunicorn) worker process, not at import
+        if self._threads:
+            return
+        self.configure_threads()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"inference-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5.0):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def _kind(self, kind):
+        metrics = self._metrics.get(kind)
+        if metrics is None:
+            metrics = self._metrics.setdefault(kind, _KindMetrics())
+        return metrics
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """Queues fn(*args, **kwargs); returns a concurrent Future or raises ExecutorOverloaded."""
+        if not self._threads:
+            self.start()
+        future = Future()
+        with self._metrics_lock:
+            metrics = self._kind(kind)
+            metrics.submitted += 1
+        try:
+            self._queue.put_nowait((kind, fn, args, kwargs, future, time.perf_counter()))
+        except queue.Full:
+            with self._metrics_lock:
+                metrics.rejected += 1
+            raise ExecutorOverloaded(f"Inference queue full ({self.max_queue} pending)")
+        return future
+
+    async def run(self, kind, fn, *args, **kwargs):
+        """Awaitable submit() for async handlers."""
+        return await asyncio.wrap_future(self.submit(kind, fn, *args, **kwargs))
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            kind, fn, args, kwargs, future, enqueued = task
+            started = time.perf_counter()
+            waited = started - enqueued
+            if self.max_queue_wait is not None and waited > self.max_queue_wait:
+                with self._metrics_lock:
+                    self._kind(kind).expired += 1
+                future.set_exception(ExecutorOverloaded(f"Queued {waited * 1000:.0f}ms, deadline exceeded"))
+                continue
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._metrics_lock:
+                self._busy += 1
+            result = error = None
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                error = e
+            finished = time.perf_counter()
+            # Metrics first, so they already include this task when the caller wakes up
+            with self._metrics_lock:
+                self._busy -= 1
+                metrics = self._kind(kind)
+                metrics.queue_wait_ms.append(waited * 1000)
+                metrics.service_ms.append((finished - started) * 1000)
+                if error is None:
+                    metrics.completed += 1
+                else:
+                    metrics.failed += 1
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def stats(self):
+        with self._metrics_lock:
+            kinds = {kind: m.summary() for kind, m in self._metrics.items()}
+            busy = self._busy
+        return {
+            'workers': self.workers,
+            'intra_op_threads': self.intra_op_threads,
+            'max_queue': self.max_queue,
+            'max_queue_wait_ms': self.max_queue_wait * 1000 if self.max_queue_wait is not None else None,
+            'queue_depth': self._queue.qsize(),
+            'busy_workers': busy,
+            'kinds': kinds,
+        }
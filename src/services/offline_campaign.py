@@ -0,0 +1,130 @@
+"""
+Offline retention campaign: renders the precompiled fallback templates
+(campaign_templates.py) for every customer in one pass and logs each email,
+with its A/B variant and discount code, to MarketingInteraction.
+
+Risk segments come from the cached churn scores in the customers table
+(customers never scored get --default-risk), names from the customer CSV and
+the two recommended titles from PersonalizationEngine.recommend_batch.
+Variants are assigned for CAMPAIGN_EXPERIMENT (or --experiment), the same
+experiment the API's fallback emails use.
+
+    python -m src.services.offline_campaign --dry-run
+    python -m src.services.offline_campaign --output campaign.parquet --no-record
+"""
+import argparse
+import time
+
+import numpy as np
+from sqlalchemy import insert, select
+
+from src.data.models import Customer, MarketingInteraction
+from src.services import campaign_templates
+
+# Rows per INSERT executemany batch
+INSERT_CHUNK = 10_000
+
+
+def interaction_rows(campaign):
+    """MarketingInteraction rows for a render_bulk() result."""
+    return [
+        {
+            "customer_id": cid,
+            "risk_level_at_time": risk,
+            "ai_generated_subject": subject,
+            "ai_generated_body": body,
+            "ai_explanation_reasoning": strategy,
+            "template_variant": variant,
+            "discount_code": code,
+        }
+        for cid, risk, subject, body, strategy, variant, code in zip(
+            campaign["customer_id"], campaign["risk_segment"], campaign["subject_line"], campaign["email_body"],
+            campaign["strategy"], campaign["template_variant"], campaign["discount_code"])
+    ]
+
+
+def record_campaigns(db, rows):
+    """
+    Bulk-inserts MarketingInteraction rows (dicts keyed by column name) and
+    commits. Rows for customers missing from the customers table are skipped
+    (foreign key); returns the number of rows written.
+    """
+    written = 0
+    for start in range(0, len(rows), INSERT_CHUNK):
+        chunk = rows[start:start + INSERT_CHUNK]
+        known = set(db.execute(
+            select(Customer.customer_id).where(Customer.customer_id.in_({r["customer_id"] for r in chunk}))
+        ).scalars())
+        chunk = [r for r in chunk if r["customer_id"] in known]
+        if chunk:
+            db.execute(insert(MarketingInteraction), chunk)
+            written += len(chunk)
+    db.commit()
+    return written
+
+
+def cached_risk_segments(db, customer_ids, default_risk):
+    cached = dict(db.execute(
+        select(Customer.customer_id, Customer.risk_segment).where(Customer.risk_segment.is_not(None))
+    ).all())
+    return [cached.get(cid, default_risk) for cid in customer_ids]
+
+
+def recommended_titles(engine, customer_ids, top_k=2):
+    if engine.store is None:
+        # No embedding model: emails go out without the recommendations block
+        return None
+    rows, snapshot = engine.recommend_batch(customer_ids, top_k=top_k)
+    titles = snapshot.catalogue.titles
+    return [[titles[int(i)] for i in r if i >= 0] for r in rows]
+
+
+def main():
+    from src.data.database import SessionLocal
+    from src.models.personalization import PersonalizationEngine
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--default-risk', default=campaign_templates.DEFAULT_SEGMENT)
+    parser.add_argument('--experiment', default=campaign_templates.EXPERIMENT)
+    parser.add_argument('--recommendations', type=int, default=2)
+    parser.add_argument('--output', default=None, help="Also write the emails to a .csv or .parquet file")
+    parser.add_argument('--no-record', action='store_true', help="Don't log to MarketingInteraction")
+    parser.add_argument('--dry-run', action='store_true', help="Render and report only")
+    args = parser.parse_args()
+
+    engine = PersonalizationEngine()
+    customers = engine.customers
+    customer_ids = customers['customer_id'].astype(str).tolist()
+    names = customers['name'].tolist() if 'name' in customers else None
+
+    db = SessionLocal()
+    try:
+        risks = cached_risk_segments(db, customer_ids, args.default_risk)
+        titles = recommended_titles(engine, customer_ids, args.recommendations) if args.recommendations else None
+
+        start = time.perf_counter()
+        campaign = campaign_templates.render_bulk(customer_ids, risks, names, titles, experiment=args.experiment)
+        elapsed = time.perf_counter() - start
+        variants, counts = np.unique(campaign['template_variant'], return_counts=True)
+        print(f"Rendered {len(customer_ids)} emails in {elapsed * 1000:.0f}ms "
+              f"({len(customer_ids) / max(elapsed, 1e-9):,.0f}/s); variants: {dict(zip(variants.tolist(), counts.tolist()))}")
+
+        if args.dry_run:
+            return
+        if args.output:
+            import pandas as pd
+            frame = pd.DataFrame(campaign)
+            if args.output.endswith('.parquet'):
+                frame.to_parquet(args.output, index=False)
+            else:
+                frame.to_csv(args.output, index=False)
+            print(f"Wrote {args.output}")
+        if not args.no_record:
+            written = record_campaigns(db, interaction_rows(campaign))
+            print(f"Logged {written} interactions ({len(customer_ids) - written} customers not in the database)")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
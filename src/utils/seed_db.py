@@ -1,54 +1,81 @@
 import pandas as pd
+from sqlalchemy import insert, select, update
 from src.data.database import SessionLocal, init_db
 from src.data.models import Customer, Transaction
 from datetime import datetime
 import os
 
-def seed_database():
+# Rows per INSERT/UPDATE executemany batch
+WRITE_CHUNK = 10_000
+
+def _write(db, statement, rows):
+    for start in range(0, len(rows), WRITE_CHUNK):
+        db.execute(statement, rows[start:start + WRITE_CHUNK])
+
+def seed_database(customers_df=None, transactions_df=None, upsert=False):
+    """
+    Loads customers and transactions into the database (frames default to the raw CSVs).
+    By default only an empty database is seeded; with upsert=True (the offline
+    pipeline) new customers and transactions are added to an existing one and
+    known customers get their profile columns refreshed.
+    """
+    init_db()
+    db = SessionLocal()
+    try:
+        # Check if empty
+        if db.query(Customer).count() > 0 and not upsert:
+            print("Database already seeded.")
+            return
+
+        print("Seeding database...")
+
+        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+        if customers_df is None:
+            customers_df = pd.read_csv(os.path.join(base_dir, 'data/raw/customers.csv'))
+        if transactions_df is None:
+            transactions_df = pd.read_csv(os.path.join(base_dir, 'data/raw/transactions.csv'))
+
+        # Load Customers
+        customers = pd.DataFrame({
+            'customer_id': customers_df['customer_id'].astype(str),
+            'age': customers_df['age'],
+            'country': customers_df['country'],
+            'signup_date': pd.to_datetime(customers_df['signup_date']),
+        })
+        customers['email'] = customers['customer_id'].str.lower() + "@example.com"
+        rows = customers.to_dict('records')
+        known = set(db.execute(select(Customer.customer_id)).scalars())
+        new_rows = [r for r in rows if r['customer_id'] not in known]
+        _write(db, insert(Customer), new_rows)
+        # Bulk UPDATE by primary key; the cached churn score columns are left alone
+        _write(db, update(Customer), [r for r in rows if r['customer_id'] in known])
+        db.commit()
+        print(f"Added {len(new_rows)} customers, refreshed {len(rows) - len(new_rows)}.")
+
+        # Load Transactions (new transaction ids only; existing ones are immutable)
+        transactions = pd.DataFrame({
+            'transaction_id': transactions_df['order_id'].astype(str),
+            'customer_id': transactions_df['customer_id'].astype(str),
+            'amount': transactions_df['amount'],
+            'category': transactions_df['category'],
+            'order_date': pd.to_datetime(transactions_df['order_date']),
+        })
+        known = set(db.execute(select(Transaction.transaction_id)).scalars())
+        new_rows = [r for r in transactions.to_dict('records') if r['transaction_id'] not in known]
+        _write(db, insert(Transaction), new_rows)
+        db.commit()
+        print(f"Added {len(new_rows)} transactions.")
+    finally:
+        db.close()
+
+def row_counts():
+    """Customers and transactions in the database (the pipeline's check that seeding still holds)."""
     init_db()
     db = SessionLocal()
-    
-    # Check if empty
-    if db.query(Customer).count() > 0:
-        print("Database already seeded.")
-        return
-
-    print("Seeding database from CSVs...")
-    
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    customers_df = pd.read_csv(os.path.join(base_dir, 'data/raw/customers.csv'))
-    transactions_df = pd.read_csv(os.path.join(base_dir, 'data/raw/transactions.csv'))
-
-    # Load Customers
-    customers = []
-    for _, row in customers_df.iterrows():
-        customers.append(Customer(
-            customer_id=row['customer_id'],
-            age=row['age'],
-            country=row['country'],
-            signup_date=pd.to_datetime(row['signup_date']),
-            email=f"{row['customer_id'].lower()}@example.com"
-        ))
-    db.add_all(customers)
-    db.commit()
-    print(f"Added {len(customers)} customers.")
-
-    # Load Transactions
-    # (Performance: do bulk insert in chunks for real apps, here simple loop is fine for 5k rows)
-    transactions = []
-    for _, row in transactions_df.iterrows():
-        transactions.append(Transaction(
-            transaction_id=row['order_id'],
-            customer_id=row['customer_id'],
-            amount=row['amount'],
-            category=row['category'],
-            order_date=pd.to_datetime(row['order_date'])
-        ))
-    db.add_all(transactions)
-    db.commit()
-    print(f"Added {len(transactions)} transactions.")
-    
-    db.close()
+    try:
+        return {'customers': db.query(Customer).count(), 'transactions': db.query(Transaction).count()}
+    finally:
+        db.close()
 
 if __name__ == "__main__":
     seed_database()
@@ -0,0 +1,70 @@
+import numpy as np
+
+from src.models.catalogue_store import CatalogueStore
+from src.models.item_catalogue import ItemCatalogue
+
+DIM = 4
+
+
+class TitleEncoder:
+    """Deterministic stand-in for the embedding model: every component is the number in the title."""
+
+    def encode(self, texts):
+        return np.array([[float(text.split('#')[1].split()[0])] * DIM for text in texts], dtype=np.float32)
+
+
+def item(i, title_number=None):
+    return {'item_id': f"I{i}", 'type': 'Product', 'title': f"Item #{title_number if title_number is not None else i}",
+            'category': 'Books', 'description': '', 'price': 1.0}
+
+
+def make_store(n=10, compact_ratio=0.2):
+    catalogue = ItemCatalogue.from_records([item(i) for i in range(n)])
+    embeddings = np.repeat(np.arange(n, dtype=np.float32)[:, None], DIM, axis=1)
+    return CatalogueStore(catalogue, embeddings, encoder=TitleEncoder(), compact_ratio=compact_ratio)
+
+
+def embedding_by_id(snapshot):
+    return {snapshot.catalogue.item_id(r): float(snapshot.embeddings[r, 0]) for r in np.flatnonzero(snapshot.alive)}
+
+
+def test_compaction_preserves_live_rows_and_ids():
+    store = make_store(compact_ratio=1.0)
+    store.upsert([item(2, 102), item(5, 105), item(10)])
+    store.delete(['I0', 'I7'])
+    before = store.snapshot
+    assert len(before) - before.live_count == 4
+    expected = {f"I{i}": float(i) for i in (1, 3, 4, 6, 8, 9, 10)}
+    expected.update({'I2': 102.0, 'I5': 105.0})
+    assert embedding_by_id(before) == expected
+
+    after = store.compact()
+    assert after.version == before.version + 1
+    assert after.live_count == len(after) == len(expected)
+    assert embedding_by_id(after) == expected
+    # Ids resolve to the rows holding their embeddings, and dropped ids resolve to nothing
+    rows, found = after.catalogue.indices_for(sorted(expected) + ['I0', 'I7'], return_mask=True)
+    assert found.tolist() == [True] * len(expected) + [False, False]
+    assert [after.catalogue.item_id(r) for r in rows] == sorted(expected)
+    assert store.stats()['tombstones'] == 0
+    # The snapshot taken before compaction is untouched (copy-on-write)
+    assert embedding_by_id(before) == expected
+    assert len(before) - before.live_count == 4
+
+
+def test_tombstones_trigger_compaction_past_ratio():
+    store = make_store(compact_ratio=0.2)
+    store.delete(['I0'])
+    assert store.stats()['tombstones'] == 1
+    store.delete(['I1'])
+    snapshot = store.snapshot
+    assert store.stats()['tombstones'] == 0
+    assert embedding_by_id(snapshot) == {f"I{i}": float(i) for i in range(2, 10)}
+
+
+def test_upsert_does_not_change_older_snapshots():
+    store = make_store()
+    old = store.snapshot
+    store.upsert([item(3, 300)])
+    assert embedding_by_id(old)['I3'] == 3.0
+    assert embedding_by_id(store.snapshot)['I3'] == 300.0
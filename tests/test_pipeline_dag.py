@@ -0,0 +1,95 @@
+import sqlite3
+
+from src.pipeline.dag import Pipeline, Stage
+
+
+def build_pipeline(tmp_path, calls):
+    """raw file -> copied file -> seed_db -> publish_scores, the DB stages tracked with row-count probes."""
+    raw_path = tmp_path / 'customers.csv'
+    copy_path = tmp_path / 'customers.copy'
+    db_path = tmp_path / 'app.db'
+
+    def query(sql, *params):
+        with sqlite3.connect(db_path) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def run_raw(artifacts):
+        calls.append('raw')
+        copy_path.write_text(raw_path.read_text())
+        return copy_path.read_text().split()
+
+    def run_seed_db(artifacts):
+        calls.append('seed_db')
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS customers (id TEXT PRIMARY KEY, score REAL)")
+            conn.executemany("INSERT OR IGNORE INTO customers (id) VALUES (?)", [(c,) for c in artifacts['raw']])
+
+    def run_publish_scores(artifacts):
+        calls.append('publish_scores')
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("UPDATE customers SET score = 0.5")
+
+    stages = [
+        Stage('raw', run_raw, inputs=[str(raw_path)], outputs=[str(copy_path)],
+              load=lambda: copy_path.read_text().split()),
+        Stage('seed_db', run_seed_db, deps=['raw'],
+              probe=lambda: query("SELECT COUNT(*) FROM customers")[0][0]),
+        Stage('publish_scores', run_publish_scores, deps=['seed_db'],
+              probe=lambda: query("SELECT COUNT(*) FROM customers WHERE score IS NOT NULL")[0][0]),
+    ]
+    return Pipeline(stages, str(tmp_path / 'state')), raw_path, db_path, query
+
+
+def statuses(results):
+    return {name: result['status'] for name, result in results.items()}
+
+
+def test_unchanged_rerun_skips_every_stage(tmp_path):
+    calls = []
+    pipeline, raw_path, _, _ = build_pipeline(tmp_path, calls)
+    raw_path.write_text("C1\nC2\n")
+    assert set(statuses(pipeline.run()).values()) == {'ran'}
+
+    calls.clear()
+    assert set(statuses(pipeline.run()).values()) == {'skipped'}
+    assert calls == []
+
+
+def test_database_reset_reruns_database_stages(tmp_path):
+    calls = []
+    pipeline, raw_path, db_path, query = build_pipeline(tmp_path, calls)
+    raw_path.write_text("C1\nC2\n")
+    pipeline.run()
+
+    db_path.unlink()
+    calls.clear()
+    results = statuses(pipeline.run())
+    assert results == {'raw': 'skipped', 'seed_db': 'ran', 'publish_scores': 'ran'}
+    assert calls == ['seed_db', 'publish_scores']
+    assert query("SELECT COUNT(*) FROM customers WHERE score IS NOT NULL")[0][0] == 2
+
+    calls.clear()
+    assert set(statuses(pipeline.run()).values()) == {'skipped'}
+
+
+def test_cleared_scores_rerun_only_publish(tmp_path):
+    calls = []
+    pipeline, raw_path, _, query = build_pipeline(tmp_path, calls)
+    raw_path.write_text("C1\nC2\n")
+    pipeline.run()
+
+    query("UPDATE customers SET score = NULL")
+    calls.clear()
+    assert statuses(pipeline.run()) == {'raw': 'skipped', 'seed_db': 'skipped', 'publish_scores': 'ran'}
+
+
+def test_new_raw_rows_flow_through(tmp_path):
+    calls = []
+    pipeline, raw_path, _, query = build_pipeline(tmp_path, calls)
+    raw_path.write_text("C1\nC2\n")
+    pipeline.run()
+
+    raw_path.write_text("C1\nC2\nC3\n")
+    calls.clear()
+    assert set(statuses(pipeline.run()).values()) == {'ran'}
+    assert query("SELECT COUNT(*) FROM customers WHERE score IS NOT NULL")[0][0] == 3
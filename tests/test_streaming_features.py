@@ -0,0 +1,100 @@
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from src.features.streaming_features import RollingFeatureStore, to_naive_utc
+from src.models.popularity import PopularityModel
+from src.services.event_ingestion import EventIngestionService
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_to_naive_utc_converts_offsets():
+    assert to_naive_utc("2024-07-02T10:00:00Z") == pd.Timestamp("2024-07-02 10:00:00")
+    assert to_naive_utc("2024-07-02T12:00:00+02:00") == pd.Timestamp("2024-07-02 10:00:00")
+    assert to_naive_utc(datetime(2024, 7, 2, 10)) == pd.Timestamp("2024-07-02 10:00:00")
+    series = to_naive_utc(pd.Series(["2024-07-02T10:00:00Z", "2024-07-02 11:00:00"]))
+    assert series.dt.tz is None
+    assert series.tolist() == [pd.Timestamp("2024-07-02 10:00"), pd.Timestamp("2024-07-02 11:00")]
+
+
+def test_utc_suffixed_event_updates_features_through_queue():
+    store = RollingFeatureStore(reference_date="2024-07-01")
+    store.register_customer("C1", age=40, country="US")
+    service = EventIngestionService(store, lambda rows: [0.5] * len(rows), lambda p: "MEDIUM")
+    service.start()
+    try:
+        service.submit([
+            {"customer_id": "C1", "event_type": "transaction", "timestamp": "2024-07-02T10:00:00Z",
+             "amount": 20.0, "category": "Books"},
+            {"customer_id": "C1", "event_type": "login",
+             "timestamp": datetime(2024, 7, 2, 11, tzinfo=timezone.utc)},
+        ])
+        assert wait_for(lambda: service.stats['events_processed'] == 2)
+    finally:
+        service.stop()
+
+    row = store.feature_row("C1")
+    assert row['frequency_total'] == 1
+    assert row['recency_days'] == 0
+    assert row['login_count_14d'] == 1
+    assert service.get_score("C1") is not None
+
+
+def test_popularity_accepts_utc_suffixed_live_interactions():
+    model = PopularityModel()
+    model.update_frame(pd.DataFrame({
+        'customer_id': ['C1'], 'item_id': ['I1'], 'action': ['view'], 'category': ['Books'],
+        'timestamp': ['2024-07-01 09:00:00'],
+    }))
+    model.update([{'customer_id': 'C2', 'item_id': 'I2', 'action': 'purchase', 'timestamp': '2024-07-02T10:00:00Z'}])
+    assert [item for item, _ in model.top_items(k=2)] == ['I2', 'I1']
+
+
+def test_window_expiry_drops_old_events():
+    store = RollingFeatureStore(reference_date="2024-06-01")
+    store.register_customer("C1")
+    store.apply_events([
+        {"customer_id": "C1", "event_type": "transaction", "timestamp": "2024-06-01 09:00", "amount": 10.0},
+        {"customer_id": "C1", "event_type": "transaction", "timestamp": "2024-06-20 09:00", "amount": 30.0},
+        {"customer_id": "C1", "event_type": "login", "timestamp": "2024-06-01 09:00"},
+        {"customer_id": "C1", "event_type": "login", "timestamp": "2024-06-20 09:00"},
+    ])
+    row = store.feature_row("C1")
+    assert (row['frequency_30d'], row['login_count_14d']) == (2, 1)
+
+    # Another customer's event moves the watermark to 2024-07-02: the 06-01 order
+    # is now 31 days old, the 06-20 login 12 days old
+    affected, day_rolled = store.apply_events([
+        {"customer_id": "C2", "event_type": "login", "timestamp": "2024-07-02 08:00"},
+    ])
+    assert day_rolled
+    assert "C1" in affected
+    row = store.feature_row("C1")
+    assert row['frequency_30d'] == 1
+    assert row['login_count_14d'] == 1
+    # All-time aggregates are not windowed
+    assert row['frequency_total'] == 2
+    assert row['avg_order_value'] == 20.0
+    assert row['recency_days'] == 12
+
+    store.apply_events([{"customer_id": "C2", "event_type": "login", "timestamp": "2024-07-25 08:00"}])
+    row = store.feature_row("C1")
+    assert (row['frequency_30d'], row['login_count_14d']) == (0, 0)
+
+
+def test_window_keeps_events_on_the_boundary():
+    store = RollingFeatureStore(reference_date="2024-07-01")
+    store.apply_events([
+        {"customer_id": "C1", "event_type": "transaction", "timestamp": "2024-06-01 00:00", "amount": 5.0},
+        {"customer_id": "C1", "event_type": "transaction", "timestamp": "2024-05-31 23:00", "amount": 5.0},
+    ])
+    assert store.feature_row("C1")['frequency_30d'] == 1